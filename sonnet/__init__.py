@@ -66,10 +66,16 @@ _ensure_dependency_available_at_version('tensorflow_probability', '0.4.0')
 # Check some version of TF is available.
 from sonnet.python import custom_getters
 from sonnet.python.modules import nets
+from sonnet.python.modules.async_saver import AsyncSaver
 from sonnet.python.modules.attention import AttentiveRead
 from sonnet.python.modules.base import AbstractModule
+from sonnet.python.modules.base import connected_subgraph_tracking
+from sonnet.python.modules.base import DefunStats
 from sonnet.python.modules.base import Module
+from sonnet.python.modules.base import observe_connection_starts
 from sonnet.python.modules.base import observe_connections
+from sonnet.python.modules.base import SUBGRAPH_TRACKING_FULL
+from sonnet.python.modules.base import SUBGRAPH_TRACKING_NONE
 from sonnet.python.modules.base import Transposable
 from sonnet.python.modules.base_errors import DifferentGraphError
 from sonnet.python.modules.base_errors import Error
@@ -138,6 +144,8 @@ from sonnet.python.modules.moving_average import MovingAverage
 from sonnet.python.modules.optimization_constraints import get_lagrange_multiplier
 from sonnet.python.modules.optimization_constraints import OptimizationConstraints
 from sonnet.python.modules.pondering_rnn import ACTCore
+from sonnet.python.modules.profiling import ConnectionProfiler
+from sonnet.python.modules.profiling import profile_connections
 from sonnet.python.modules.relational_memory import RelationalMemory
 from sonnet.python.modules.residual import Residual
 from sonnet.python.modules.residual import ResidualCore
@@ -146,6 +154,11 @@ from sonnet.python.modules.rnn_core import RNNCellWrapper
 from sonnet.python.modules.rnn_core import RNNCore
 from sonnet.python.modules.rnn_core import trainable_initial_state
 from sonnet.python.modules.rnn_core import TrainableInitialState
+from sonnet.python.modules.rnn_sampler import BEAM_SEARCH
+from sonnet.python.modules.rnn_sampler import MULTINOMIAL
+from sonnet.python.modules.rnn_sampler import RNNSampler
+from sonnet.python.modules.rnn_sampler import SamplerOutput
+from sonnet.python.modules.rnn_sampler import TOP_K
 from sonnet.python.modules.scale_gradient import scale_gradient
 from sonnet.python.modules.sequential import Sequential
 from sonnet.python.modules.spatial_transformer import AffineGridWarper
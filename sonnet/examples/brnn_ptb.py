@@ -46,6 +46,9 @@ FLAGS = tf.flags.FLAGS
 
 # Data settings.
 tf.flags.DEFINE_string("data_path", "/tmp/ptb_data/data", "path to PTB data.")
+tf.flags.DEFINE_string(
+    "cache_path", None,
+    "local path to the PTB token cache, defaults to data_path if it is local.")
 
 # Deep LSTM settings.
 tf.flags.DEFINE_integer("embedding_size", 650, "embedding size.")
@@ -92,12 +95,12 @@ def _get_raw_data(subset):
   if raw_data is not None:
     return raw_data, _LOADED["vocab"]
   else:
-    train_data, valid_data, test_data, vocab = ptb_reader.ptb_raw_data(
-        FLAGS.data_path)
+    train_data, valid_data, test_data, vocab = ptb_reader.ptb_cached_data(
+        FLAGS.data_path, FLAGS.cache_path)
     _LOADED.update({
-        "train": np.array(train_data),
-        "valid": np.array(valid_data),
-        "test": np.array(test_data),
+        "train": train_data,
+        "valid": valid_data,
+        "test": test_data,
         "vocab": vocab
     })
     return _LOADED[subset], vocab
@@ -122,8 +125,10 @@ class PTB(object):
     return tf.py_func(p_func, [time_major_idx_seq_batch[:, 0]], tf.string)
 
   def __call__(self):
-    x_bm, y_bm = ptb_reader.ptb_producer(
-        self.raw_data, self.batch_size, self.seq_len, name=self.name)
+    with tf.name_scope(self.name):
+      dataset = ptb_reader.ptb_dataset(
+          self.raw_data, self.batch_size, self.seq_len)
+      x_bm, y_bm = tf.data.make_one_shot_iterator(dataset).get_next()
     x_tm = tf.transpose(x_bm, [1, 0])
     y_tm = tf.transpose(y_bm, [1, 0])
     return DataOps(sparse_obs=x_tm, sparse_target=y_tm)
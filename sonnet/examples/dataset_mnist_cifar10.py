@@ -25,19 +25,113 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
+
 # Dependency imports
 
 import numpy as np
 import tensorflow.compat.v1 as tf
 
 
-def get_data(name, train_batch_size, test_batch_size):
+_SPLITS = ('train', 'test')
+
+
+def _cache_path(cache_dir, name, split, field):
+  return os.path.join(cache_dir, '%s_%s_%s.npy' % (name, split, field))
+
+
+def _write_cache(name, cache_dir):
+  """Writes the raw uint8 images and int32 labels to `.npy` files."""
+  raw_data = getattr(tf.keras.datasets, name).load_data()
+  if not os.path.isdir(cache_dir):
+    os.makedirs(cache_dir)
+  for split, (images, labels) in zip(_SPLITS, raw_data):
+    # Add a dummy 'color channel' dimension if it is not present.
+    if images.ndim == 3:
+      images = np.expand_dims(images, -1)
+    fields = (('images', images.astype(np.uint8)),
+              ('labels', labels.astype(np.int32).reshape([-1])))
+    for field, array in fields:
+      # Write to a temporary file first, so that an interrupted run never
+      # leaves a partial cache behind.
+      path = _cache_path(cache_dir, name, split, field)
+      temp_path = '%s.tmp%d' % (path, os.getpid())
+      with open(temp_path, 'wb') as f:
+        np.save(f, array)
+      os.rename(temp_path, path)
+
+
+def _load_cache(name, cache_dir):
+  """Memory-maps the cached data, writing the cache first if needed."""
+  paths = [_cache_path(cache_dir, name, split, field)
+           for split in _SPLITS for field in ('images', 'labels')]
+  if not all(os.path.exists(path) for path in paths):
+    _write_cache(name, cache_dir)
+  arrays = [np.load(path, mmap_mode='r') for path in paths]
+  return (arrays[0], arrays[1]), (arrays[2], arrays[3])
+
+
+def _mapped_dataset(images, labels, batch_size, shuffle_buffer_size,
+                    num_parallel_calls):
+  """Dataset of normalized batches gathered from memory-mapped arrays.
+
+  Only indices go through the shuffle buffer. Each batch of indices is then
+  gathered from the arrays as uint8 and normalized to float32 in the
+  pipeline.
+
+  Args:
+    images: uint8 array of shape [N, height, width, channels].
+    labels: int32 array of shape [N].
+    batch_size: Integer. Batch size.
+    shuffle_buffer_size: Integer or None. If not None, size of the buffer the
+      indices are shuffled with.
+    num_parallel_calls: Integer. Number of batches gathered in parallel.
+
+  Returns:
+    A tf.data.Dataset of (images, labels) batches.
+  """
+  def gather(indices):
+    # Sorted indices read the memory-mapped file in order.
+    indices = np.sort(indices)
+    return images[indices], labels[indices]
+
+  def load_batch(indices):
+    batch_images, batch_labels = tf.py_func(
+        gather, [indices], [tf.uint8, tf.int32], stateful=False)
+    batch_images.set_shape([None] + list(images.shape[1:]))
+    batch_labels.set_shape([None])
+    return tf.cast(batch_images, tf.float32) / 255., batch_labels
+
+  dataset = tf.data.Dataset.range(len(labels))
+  if shuffle_buffer_size is not None:
+    dataset = dataset.shuffle(buffer_size=shuffle_buffer_size)
+  dataset = dataset.batch(batch_size)
+  return dataset.map(load_batch, num_parallel_calls=num_parallel_calls)
+
+
+def get_data(name, train_batch_size, test_batch_size, cache_dir=None,
+             shuffle_buffer_size=None, num_parallel_calls=4, prefetch_size=2):
   """Gets training and testing dataset iterators.
 
+  By default the datasets are converted to float32 and put onto the graph as
+  constants. If `cache_dir` is given, the datasets are instead stored as uint8
+  in memory-mapped `.npy` files, read in batches by the input pipeline and
+  normalized on the fly, so neither the host memory nor the graph holds the
+  whole datasets.
+
   Args:
     name: String. Name of dataset, either 'mnist' or 'cifar10'.
     train_batch_size: Integer. Batch size for training.
     test_batch_size: Integer. Batch size for testing.
+    cache_dir: String or None. Directory of the memory-mapped data. It is
+      written from `tf.keras.datasets` the first time it is used.
+    shuffle_buffer_size: Integer or None. Size of the training shuffle buffer.
+      Defaults to the size of the training set. Only used with `cache_dir`,
+      where indices rather than images are shuffled.
+    num_parallel_calls: Integer. Number of batches read in parallel. Only used
+      with `cache_dir`.
+    prefetch_size: Integer. Number of training batches to prefetch. Only used
+      with `cache_dir`.
 
   Returns:
     Dict containing:
@@ -51,6 +145,25 @@ def get_data(name, train_batch_size, test_batch_size):
   dataset = getattr(tf.keras.datasets, name)
   num_classes = 10
 
+  if cache_dir is not None:
+    (images_train, labels_train), (images_test, labels_test) = _load_cache(
+        name, cache_dir)
+    train_iterator = (
+        _mapped_dataset(images_train, labels_train, train_batch_size,
+                        shuffle_buffer_size or len(labels_train),
+                        num_parallel_calls)
+        .repeat()
+        .prefetch(prefetch_size)
+        .make_one_shot_iterator()
+    )
+    test_iterator = _mapped_dataset(
+        images_test, labels_test, test_batch_size, None,
+        num_parallel_calls).make_initializable_iterator()
+    return dict(
+        train_iterator=train_iterator,
+        test_iterator=test_iterator,
+        num_classes=num_classes)
+
   # Extract the raw data.
   raw_data = dataset.load_data()
   (images_train, labels_train), (images_test, labels_test) = raw_data
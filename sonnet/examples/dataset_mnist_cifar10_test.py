@@ -0,0 +1,103 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.examples.dataset_mnist_cifar10."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+# Dependency imports
+from absl.testing import parameterized
+import mock
+import numpy as np
+from sonnet.examples import dataset_mnist_cifar10
+import tensorflow.compat.v1 as tf
+
+
+_NUM_EXAMPLES = 12
+_BATCH_SIZE = 4
+
+
+def _fake_load_data(image_shape, label_shape):
+  """Returns a `load_data` function serving small random uint8 datasets."""
+  random_state = np.random.RandomState(0)
+
+  def make_split():
+    images = random_state.randint(
+        0, 256, size=(_NUM_EXAMPLES,) + image_shape).astype(np.uint8)
+    # Makes the images unique, so that shuffled batches can be sorted back.
+    images.reshape([_NUM_EXAMPLES, -1])[:, 0] = np.arange(_NUM_EXAMPLES)
+    labels = random_state.randint(
+        0, 10, size=(_NUM_EXAMPLES,) + label_shape).astype(np.uint8)
+    return images, labels
+
+  data = (make_split(), make_split())
+  return lambda: data
+
+
+class GetDataTest(parameterized.TestCase, tf.test.TestCase):
+
+  def _run_epoch(self, sess, batch):
+    """Returns the images and labels of `_NUM_EXAMPLES` examples."""
+    batches = [sess.run(batch) for _ in range(_NUM_EXAMPLES // _BATCH_SIZE)]
+    images, labels = [np.concatenate(arrays) for arrays in zip(*batches)]
+    # Sorts the examples by their first pixel, which is unique.
+    order = np.argsort(images.reshape([_NUM_EXAMPLES, -1])[:, 0])
+    return images[order], labels[order]
+
+  def _get_epochs(self, name, **kwargs):
+    """Returns one epoch of the train and test sets read with `get_data`."""
+    with tf.Graph().as_default() as graph:
+      data = dataset_mnist_cifar10.get_data(
+          name, _BATCH_SIZE, _BATCH_SIZE, **kwargs)
+      train_batch = data['train_iterator'].get_next()
+      test_batch = data['test_iterator'].get_next()
+      with self.test_session(graph=graph) as sess:
+        sess.run(data['test_iterator'].initializer)
+        return (self._run_epoch(sess, train_batch),
+                self._run_epoch(sess, test_batch))
+
+  @parameterized.parameters(
+      ('mnist', (28, 28), ()),
+      ('cifar10', (32, 32, 3), (1,)))
+  def testCacheMatchesInMemory(self, name, image_shape, label_shape):
+    load_data = _fake_load_data(image_shape, label_shape)
+    cache_dir = os.path.join(self.get_temp_dir(), name)
+    with mock.patch.object(getattr(tf.keras.datasets, name), 'load_data',
+                           side_effect=load_data):
+      in_memory_epochs = self._get_epochs(name)
+      # The first call writes the cache, the second one only maps it.
+      self._get_epochs(name, cache_dir=cache_dir)
+      cached_epochs = self._get_epochs(name, cache_dir=cache_dir)
+
+    # pylint: disable=protected-access
+    cached_train_images = np.load(dataset_mnist_cifar10._cache_path(
+        cache_dir, name, 'train', 'images'))
+    # pylint: enable=protected-access
+    self.assertEqual(cached_train_images.dtype, np.uint8)
+    for in_memory_epoch, cached_epoch in zip(in_memory_epochs, cached_epochs):
+      in_memory_images, in_memory_labels = in_memory_epoch
+      cached_images, cached_labels = cached_epoch
+      self.assertEqual(cached_images.dtype, np.float32)
+      self.assertEqual(cached_images.shape, in_memory_images.shape)
+      self.assertAllEqual(cached_images, in_memory_images)
+      self.assertEqual(cached_labels.dtype, np.int32)
+      self.assertAllEqual(cached_labels, in_memory_labels)
+
+
+if __name__ == '__main__':
+  tf.test.main()
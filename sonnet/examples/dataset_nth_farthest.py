@@ -32,6 +32,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import multiprocessing
+
 # Dependency imports
 
 import numpy as np
@@ -40,13 +43,84 @@ import six
 import tensorflow.compat.v1 as tf
 
 
+def _nth_farthest_batch(random_state, batch_size, num_objects, num_features):
+  """Generates a batch of input sequences and output labels at once.
+
+  Equivalent to stacking `batch_size` calls of `NthFarthest._get_single_set`,
+  but computes the distances to the reference objects, the n-th farthest
+  selection and the features for the whole batch with array operations.
+
+  Args:
+    random_state: `np.random.RandomState` (or the `np.random` module) to sample
+      with.
+    batch_size: int. number of sequence batches.
+    num_objects: int. number of objects in the sequence.
+    num_features: int. feature size of each object.
+
+  Returns:
+    1. np.ndarray (`batch_size`, `num_objects`,
+                   (`num_features` + 3 * `num_objects`)).
+    2. np.ndarray (`batch_size`). Output object reference label.
+  """
+  data = random_state.uniform(
+      -1, 1, size=(batch_size, num_objects, num_features))
+  nth = random_state.randint(0, num_objects, size=batch_size)
+  reference = random_state.randint(0, num_objects, size=batch_size)
+  batch_range = np.arange(batch_size)
+
+  # Only the distances from the reference object determine the label.
+  distances = np.linalg.norm(
+      data - data[batch_range, reference][:, np.newaxis], axis=-1)
+  # Partitioning around every requested `nth` puts the right object at
+  # position `nth` of each row, without sorting the rows.
+  distance_idx = np.argpartition(distances, np.unique(nth), axis=-1)
+  labels = distance_idx[batch_range, nth]
+
+  identity = np.identity(num_objects, dtype=np.float32)
+  shape = (batch_size, num_objects, num_objects)
+  object_ids = np.broadcast_to(identity, shape)
+  reference_object = np.broadcast_to(identity[reference][:, np.newaxis], shape)
+  nth_matrix = np.broadcast_to(identity[nth][:, np.newaxis], shape)
+
+  inputs = np.concatenate(
+      [data.astype(np.float32), object_ids, reference_object, nth_matrix],
+      axis=-1)
+  permutation = np.argsort(
+      random_state.uniform(size=(batch_size, num_objects)), axis=-1)
+  inputs = inputs[batch_range[:, np.newaxis], permutation]
+  return inputs, labels.astype(np.float32)
+
+
+def _seeded_nth_farthest_batch(args):
+  """Generates a batch with a seeded random state, in a worker process."""
+  seed, batch_size, num_objects, num_features = args
+  return _nth_farthest_batch(
+      np.random.RandomState(seed), batch_size, num_objects, num_features)
+
+
 class NthFarthest(object):
   """Choose the nth furthest object from the reference."""
 
-  def __init__(self, batch_size, num_objects, num_features):
+  def __init__(self, batch_size, num_objects, num_features, num_workers=0,
+               num_prefetch_batches=None):
+    """Initializes the n-th farthest dataset.
+
+    Args:
+      batch_size: int. number of sequence batches.
+      num_objects: int. number of objects in the sequence.
+      num_features: int. feature size of each object.
+      num_workers: int. number of processes generating batches in the
+        background. If 0, batches are generated when requested.
+      num_prefetch_batches: int. maximum number of batches generated ahead by
+        the worker processes. Defaults to twice `num_workers`.
+    """
     self._batch_size = batch_size
     self._num_objects = num_objects
     self._num_features = num_features
+    self._num_workers = num_workers
+    self._num_prefetch_batches = num_prefetch_batches or 2 * num_workers
+    self._pool = None
+    self._pending_batches = collections.deque()
 
   def _get_single_set(self, num_objects, num_features):
     """Generate one input sequence and output label.
@@ -109,6 +183,11 @@ class NthFarthest(object):
                      (`num_features` + 3 * `num_objects`)).
       2. np.ndarray (`batch_size`). Output object reference label.
     """
+    return _nth_farthest_batch(np.random, batch_size, num_objects, num_features)
+
+  def _get_batch_data_per_example(self, batch_size, num_objects,
+                                  num_features):
+    """Assembles a batch one example at a time, see `_get_batch_data`."""
     all_inputs = []
     all_labels = []
     for _ in six.moves.range(batch_size):
@@ -119,6 +198,28 @@ class NthFarthest(object):
     label_data = np.concatenate(all_labels, axis=0)
     return input_data, label_data
 
+  def _request_batch(self):
+    params = (np.random.randint(np.iinfo(np.int32).max), self._batch_size,
+              self._num_objects, self._num_features)
+    self._pending_batches.append(
+        self._pool.apply_async(_seeded_nth_farthest_batch, (params,)))
+
+  def _get_prefetched_batch_data(self):
+    """Returns the oldest batch generated by the worker processes."""
+    while len(self._pending_batches) < self._num_prefetch_batches:
+      self._request_batch()
+    inputs, labels = self._pending_batches.popleft().get()
+    self._request_batch()
+    return inputs, labels
+
+  def close(self):
+    """Terminates the worker processes, if any."""
+    if self._pool is not None:
+      self._pool.terminate()
+      self._pool.join()
+      self._pool = None
+      self._pending_batches.clear()
+
   def get_batch(self):
     """Returns set of nth-farthest input tensors and labels.
 
@@ -127,9 +228,17 @@ class NthFarthest(object):
                      (`num_features` + 3 * `num_objects`)).
       2. tf.Tensor (`batch_size`). Output object reference label.
     """
-    params = [self._batch_size, self._num_objects, self._num_features]
-    inputs, labels = tf.py_func(self._get_batch_data, params,
-                                [tf.float32, tf.float32])
+    if self._num_workers:
+      if self._pool is None:
+        # Started before any session is run, so that the workers are not forked
+        # from a process running TensorFlow threads.
+        self._pool = multiprocessing.Pool(self._num_workers)
+      inputs, labels = tf.py_func(self._get_prefetched_batch_data, [],
+                                  [tf.float32, tf.float32])
+    else:
+      params = [self._batch_size, self._num_objects, self._num_features]
+      inputs, labels = tf.py_func(self._get_batch_data, params,
+                                  [tf.float32, tf.float32])
     inputs = tf.reshape(inputs, [self._batch_size, self._num_objects,
                                  self._num_features + self._num_objects * 3])
     labels = tf.reshape(labels, [-1])
@@ -0,0 +1,90 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Benchmarks batch generation of the n-th farthest dataset.
+
+Run with `python dataset_nth_farthest_benchmark.py --benchmarks=.`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+# Dependency imports
+from sonnet.examples import dataset_nth_farthest
+import tensorflow.compat.v1 as tf
+
+
+# Defaults of rmc_nth_farthest.
+_BATCH_SIZE = 1600
+_NUM_OBJECTS = 4
+_NUM_FEATURES = 4
+_NUM_BATCHES = 20
+
+
+class NthFarthestBenchmark(tf.test.Benchmark):
+  """Batches per second generated by the n-th farthest dataset."""
+
+  def _report(self, name, wall_time):
+    self.report_benchmark(
+        name=name,
+        iters=_NUM_BATCHES,
+        wall_time=wall_time / _NUM_BATCHES,
+        extras={"batches_per_second": _NUM_BATCHES / wall_time,
+                "batch_size": _BATCH_SIZE})
+
+  def _benchmark_numpy(self, name, get_batch_data):
+    start_time = time.time()
+    for _ in range(_NUM_BATCHES):
+      get_batch_data(_BATCH_SIZE, _NUM_OBJECTS, _NUM_FEATURES)
+    self._report(name, time.time() - start_time)
+
+  def benchmark_numpy_per_example(self):
+    dataset = dataset_nth_farthest.NthFarthest(
+        _BATCH_SIZE, _NUM_OBJECTS, _NUM_FEATURES)
+    self._benchmark_numpy("numpy_per_example",
+                          dataset._get_batch_data_per_example)  # pylint: disable=protected-access
+
+  def benchmark_numpy_vectorised(self):
+    dataset = dataset_nth_farthest.NthFarthest(
+        _BATCH_SIZE, _NUM_OBJECTS, _NUM_FEATURES)
+    self._benchmark_numpy("numpy_vectorised",
+                          dataset._get_batch_data)  # pylint: disable=protected-access
+
+  def _benchmark_get_batch(self, name, num_workers):
+    with tf.Graph().as_default():
+      dataset = dataset_nth_farthest.NthFarthest(
+          _BATCH_SIZE, _NUM_OBJECTS, _NUM_FEATURES, num_workers=num_workers)
+      batch = dataset.get_batch()
+      with tf.Session() as sess:
+        sess.run(batch)
+        start_time = time.time()
+        for _ in range(_NUM_BATCHES):
+          sess.run(batch)
+        wall_time = time.time() - start_time
+      dataset.close()
+    self._report(name, wall_time)
+
+  def benchmark_get_batch(self):
+    self._benchmark_get_batch("get_batch", num_workers=0)
+
+  def benchmark_get_batch_4_workers(self):
+    self._benchmark_get_batch("get_batch_4_workers", num_workers=4)
+
+
+if __name__ == "__main__":
+  tf.test.main()
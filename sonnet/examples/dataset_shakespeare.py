@@ -99,7 +99,7 @@ class TinyShakespeareDataset(snt.AbstractModule):
 
   def __init__(self, num_steps=1, batch_size=1,
                subset="train", random=False, dtype=tf.float32,
-               name="tiny_shakespeare_dataset"):
+               name="tiny_shakespeare_dataset", use_tf_data=False):
     """Initializes a TinyShakespeare sequence data object.
 
     Args:
@@ -110,6 +110,10 @@ class TinyShakespeareDataset(snt.AbstractModule):
         Default is false (sequential sampling).
       dtype: type of generated tensors (both observations and targets).
       name: object name.
+      use_tf_data: boolean indicating whether to read batches from the
+        `tf.data` pipeline returned by `dataset` instead of a queue fed by a
+        `tf.py_func`. Default is false. The iterator must then be initialized
+        with `initialize` before the first batch is read.
 
     Raises:
       ValueError: if subset is not train, valid or test.
@@ -128,6 +132,7 @@ class TinyShakespeareDataset(snt.AbstractModule):
     self._batch_size = batch_size
     self._random_sampling = random
     self._dtype = dtype
+    self._use_tf_data = use_tf_data
 
     self._data_source = TokenDataSource(
         data_file=self._data_file,
@@ -141,11 +146,40 @@ class TinyShakespeareDataset(snt.AbstractModule):
     self._reset_head_indices()
 
     self._queue_capacity = 10
+    self._flat_data_placeholders = {}
+    self._iterator_initializer = None
 
   @property
   def vocab_size(self):
     return self._vocab_size
 
+  @property
+  def feed_dict(self):
+    """Feeds the data to the placeholder of `dataset` in the default graph."""
+    return {self._flat_data_placeholder(): self._flat_data}
+
+  def _flat_data_placeholder(self):
+    graph = tf.get_default_graph()
+    if graph not in self._flat_data_placeholders:
+      self._flat_data_placeholders[graph] = tf.placeholder(
+          tf.as_dtype(self._flat_data.dtype), [self._n_flat_elements],
+          name="flat_data")
+    return self._flat_data_placeholders[graph]
+
+  def initialize(self, session):
+    """Initializes the `tf.data` iterator created when connecting the module.
+
+    Args:
+      session: `tf.Session` in which to initialize the iterator.
+
+    Raises:
+      ValueError: if the module was not connected with `use_tf_data`.
+    """
+    if self._iterator_initializer is None:
+      raise ValueError("initialize requires the module to be connected with "
+                       "use_tf_data=True.")
+    session.run(self._iterator_initializer, feed_dict=self.feed_dict)
+
   def _reset_head_indices(self):
     self._head_indices = np.random.randint(
         low=0, high=self._n_flat_elements, size=[self._batch_size])
@@ -161,17 +195,12 @@ class TinyShakespeareDataset(snt.AbstractModule):
       target: np.int32 array of size [Time, Batch]
     """
     batch_indices = np.mod(
-        np.array([
-            np.arange(head_index, head_index + self._num_steps + 1) for
-            head_index in self._head_indices]),
+        self._head_indices + np.arange(self._num_steps + 1)[:, np.newaxis],
         self._n_flat_elements)
 
-    obs = np.array([
-        self._flat_data[indices[:self._num_steps]]
-        for indices in batch_indices]).T
-    target = np.array([
-        self._flat_data[indices[1:self._num_steps + 1]]
-        for indices in batch_indices]).T
+    sequences = self._flat_data[batch_indices]
+    obs = sequences[:self._num_steps]
+    target = sequences[1:]
 
     if self._random_sampling:
       self._reset_head_indices()
@@ -180,8 +209,54 @@ class TinyShakespeareDataset(snt.AbstractModule):
           self._head_indices + self._num_steps, self._n_flat_elements)
     return obs, target
 
+  def dataset(self):
+    """Returns a `tf.data.Dataset` of batches of one-hot sequences.
+
+    Batches are sampled as in `_build`, but entirely in TensorFlow: the
+    sequences of a batch are gathered from the data with a single index
+    tensor of size [Time + 1, Batch], converted to one-hot in parallel and
+    prefetched.
+
+    The data is fed through a placeholder rather than embedded in the graph,
+    so the dataset must be read with an initializable iterator whose
+    initializer is run with `feed_dict`.
+
+    Returns:
+      An infinite `tf.data.Dataset` of `SequenceDataOpsNoMask` tuples of
+      observation and target tensors of size [Time, Batch, Vocab].
+    """
+    flat_data = self._flat_data_placeholder()
+    offsets = tf.range(self._num_steps + 1, dtype=tf.int64)[:, tf.newaxis]
+
+    if self._random_sampling:
+      def head_indices(unused_step):
+        return tf.random.uniform(
+            [self._batch_size], maxval=self._n_flat_elements, dtype=tf.int64)
+    else:
+      initial_head_indices = tf.constant(self._head_indices, dtype=tf.int64)
+      def head_indices(step):
+        return initial_head_indices + step * self._num_steps
+
+    def get_batch(step):
+      batch_indices = tf.floormod(head_indices(step) + offsets,
+                                  self._n_flat_elements)
+      sequences = tf.gather(flat_data, batch_indices)
+      return SequenceDataOpsNoMask(self._one_hot(sequences[:self._num_steps]),
+                                   self._one_hot(sequences[1:]))
+
+    dataset = tf.data.Dataset.range(np.iinfo(np.int64).max)
+    dataset = dataset.map(get_batch,
+                          num_parallel_calls=tf.data.experimental.AUTOTUNE)
+    return dataset.prefetch(self._queue_capacity)
+
   def _build(self):
     """Returns a tuple containing observation and target one-hot tensors."""
+    if self._use_tf_data:
+      iterator = tf.data.make_initializable_iterator(self.dataset())
+      self._iterator_initializer = iterator.initializer
+      obs, target = iterator.get_next()
+      return SequenceDataOpsNoMask(obs, target)
+
     q = tf.FIFOQueue(
         self._queue_capacity, [self._dtype, self._dtype],
         shapes=[[self._num_steps, self._batch_size, self._vocab_size]]*2)
@@ -0,0 +1,136 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Benchmarks the input pipelines of TinyShakespeareDataset.
+
+Run with `python dataset_shakespeare_benchmark.py --benchmarks=.`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+# Dependency imports
+import numpy as np
+from sonnet.examples import dataset_shakespeare
+import tensorflow.compat.v1 as tf
+
+
+_NUM_STEPS = 64
+_BATCH_SIZE = 32
+_NUM_WARMUP_BATCHES = 10
+_NUM_BATCHES = 500
+
+
+class _PerSequenceTinyShakespeareDataset(
+    dataset_shakespeare.TinyShakespeareDataset):
+  """Queue pipeline gathering the sequences of a batch one at a time.
+
+  This is how `_get_batch` sampled batches before it gathered them with a
+  single index array, kept as the baseline of the benchmarks.
+  """
+
+  def _get_batch(self):
+    batch_indices = np.mod(
+        np.array([
+            np.arange(head_index, head_index + self._num_steps + 1) for
+            head_index in self._head_indices]),
+        self._n_flat_elements)
+
+    obs = np.array([
+        self._flat_data[indices[:self._num_steps]]
+        for indices in batch_indices]).T
+    target = np.array([
+        self._flat_data[indices[1:self._num_steps + 1]]
+        for indices in batch_indices]).T
+
+    if self._random_sampling:
+      self._reset_head_indices()
+    else:
+      self._head_indices = np.mod(
+          self._head_indices + self._num_steps, self._n_flat_elements)
+    return obs, target
+
+
+class TinyShakespeareDatasetBenchmark(tf.test.Benchmark):
+  """Batches per second of the queue and tf.data pipelines.
+
+  The per-sequence queue pipeline is the baseline the others are compared to.
+  """
+
+  def _benchmark_pipeline(self, name, dataset_class, use_tf_data, random):
+    with tf.Graph().as_default():
+      dataset = dataset_class(
+          num_steps=_NUM_STEPS,
+          batch_size=_BATCH_SIZE,
+          random=random,
+          use_tf_data=use_tf_data)
+      batch = dataset()
+
+      with tf.Session() as sess:
+        if use_tf_data:
+          dataset.initialize(sess)
+        coord = tf.train.Coordinator()
+        threads = tf.train.start_queue_runners(sess=sess, coord=coord)
+        for _ in range(_NUM_WARMUP_BATCHES):
+          sess.run(batch)
+        start_time = time.time()
+        for _ in range(_NUM_BATCHES):
+          sess.run(batch)
+        wall_time = time.time() - start_time
+        coord.request_stop()
+        coord.join(threads)
+
+    self.report_benchmark(
+        name=name,
+        iters=_NUM_BATCHES,
+        wall_time=wall_time / _NUM_BATCHES,
+        extras={"batches_per_second": _NUM_BATCHES / wall_time})
+
+  def benchmark_per_sequence_queue_sequential(self):
+    self._benchmark_pipeline(
+        "per_sequence_queue_sequential", _PerSequenceTinyShakespeareDataset,
+        use_tf_data=False, random=False)
+
+  def benchmark_per_sequence_queue_random(self):
+    self._benchmark_pipeline(
+        "per_sequence_queue_random", _PerSequenceTinyShakespeareDataset,
+        use_tf_data=False, random=True)
+
+  def benchmark_queue_sequential(self):
+    self._benchmark_pipeline(
+        "queue_sequential", dataset_shakespeare.TinyShakespeareDataset,
+        use_tf_data=False, random=False)
+
+  def benchmark_queue_random(self):
+    self._benchmark_pipeline(
+        "queue_random", dataset_shakespeare.TinyShakespeareDataset,
+        use_tf_data=False, random=True)
+
+  def benchmark_tf_data_sequential(self):
+    self._benchmark_pipeline(
+        "tf_data_sequential", dataset_shakespeare.TinyShakespeareDataset,
+        use_tf_data=True, random=False)
+
+  def benchmark_tf_data_random(self):
+    self._benchmark_pipeline(
+        "tf_data_random", dataset_shakespeare.TinyShakespeareDataset,
+        use_tf_data=True, random=True)
+
+
+if __name__ == "__main__":
+  tf.test.main()
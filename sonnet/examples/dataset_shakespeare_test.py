@@ -0,0 +1,93 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.examples.dataset_shakespeare."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+# Dependency imports
+import numpy as np
+from sonnet.examples import dataset_shakespeare
+import tensorflow.compat.v1 as tf
+
+
+class TinyShakespeareDatasetTest(tf.test.TestCase):
+
+  def _run_batches(self, batches, num_batches, initializer, feed_dict):
+    """Runs `batches` `num_batches` times, with the queue runners started."""
+    with self.test_session() as sess:
+      sess.run(initializer, feed_dict=feed_dict)
+      coord = tf.train.Coordinator()
+      threads = tf.train.start_queue_runners(sess=sess, coord=coord)
+      try:
+        return [sess.run(batches) for _ in range(num_batches)]
+      finally:
+        coord.request_stop()
+        coord.join(threads)
+
+  def testDatasetMatchesQueueSequential(self):
+    np.random.seed(0)
+    dataset = dataset_shakespeare.TinyShakespeareDataset(
+        num_steps=7, batch_size=3, subset="valid")
+    iterator = tf.data.make_initializable_iterator(dataset.dataset())
+    tf_data_batch = iterator.get_next()
+    queue_batch = dataset()
+
+    for queue_values, tf_data_values in self._run_batches(
+        [queue_batch, tf_data_batch], num_batches=20,
+        initializer=iterator.initializer, feed_dict=dataset.feed_dict):
+      self.assertAllEqual(queue_values.obs, tf_data_values.obs)
+      self.assertAllEqual(queue_values.target, tf_data_values.target)
+
+  def testDatasetRandomSequences(self):
+    num_steps = 7
+    dataset = dataset_shakespeare.TinyShakespeareDataset(
+        num_steps=num_steps, batch_size=3, subset="valid", random=True)
+    iterator = tf.data.make_initializable_iterator(dataset.dataset())
+    tf_data_batch = iterator.get_next()
+    flat_data = dataset._flat_data  # pylint: disable=protected-access
+    offsets = np.arange(num_steps + 1)
+
+    for batch in self._run_batches(
+        tf_data_batch, num_batches=5, initializer=iterator.initializer,
+        feed_dict=dataset.feed_dict):
+      self.assertEqual(batch.obs.shape,
+                       (num_steps, 3, dataset.vocab_size))
+      obs = np.argmax(batch.obs, axis=-1)
+      target = np.argmax(batch.target, axis=-1)
+      self.assertAllEqual(obs[1:], target[:-1])
+      # Each sequence is a window of the data, wrapping around its end.
+      for sequence in np.concatenate([obs, target[-1:]]).T:
+        heads = np.flatnonzero(flat_data == sequence[0])
+        windows = flat_data[np.mod(heads[:, np.newaxis] + offsets,
+                                   len(flat_data))]
+        self.assertTrue(np.any(np.all(windows == sequence, axis=-1)))
+
+  def testDataNotEmbeddedInGraph(self):
+    dataset = dataset_shakespeare.TinyShakespeareDataset(
+        num_steps=7, batch_size=3, subset="valid", use_tf_data=True)
+    batch = dataset()
+    graph_def = tf.get_default_graph().as_graph_def()
+    self.assertLess(graph_def.ByteSize(), dataset._flat_data.nbytes)  # pylint: disable=protected-access
+
+    with self.test_session() as sess:
+      dataset.initialize(sess)
+      obs = sess.run(batch.obs)
+    self.assertEqual(obs.shape, (7, 3, dataset.vocab_size))
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -56,7 +56,11 @@ from __future__ import print_function
 
 import abc
 import collections
+import ctypes
+import multiprocessing
+import os
 import random
+import traceback
 from enum import Enum
 import numpy as np
 import six
@@ -637,6 +641,9 @@ class TokenDataSource(object):
     self._ops = ops
     self._token_by_char = token_by_char
     self._batch_size = batch_size
+    # If set to a `LevelSampleCache`, samples are drawn from it instead of
+    # being generated.
+    self.sample_cache = None
 
     # Construct the vocabulary.
     num_token_digits = 1 if token_by_char else curriculum_obj.max_length
@@ -653,6 +660,39 @@ class TokenDataSource(object):
     """List of strings, dataset vocabulary."""
     return self._vocab_dict.keys()
 
+  def generate_sample(self, length, nest):
+    """Generates a single tokenized sample.
+
+    Args:
+      length: (int) literal length of the sample.
+      nest: (int) nesting level of the sample.
+
+    Returns:
+      Tuple of the padded input tokens, the input sequence size, the padded
+      target tokens and the target sequence size.
+
+    Raises:
+      ValueError: When too many generate calls are required.
+    """
+    seq_size_in = self._max_seq_length
+    # Generate sample within max length.
+    is_valid_sample = False
+    tries_remaining = 10
+    while not is_valid_sample:
+      value, code = generate_code(length, nest, self._ops)
+      tokens_in, seq_size_in = self.tokenize(
+          code, self._max_seq_length, self._token_by_char)
+      tokens_out, seq_size_out = self.tokenize(
+          value, self._max_seq_length, self._token_by_char)
+      is_valid_sample = self._max_seq_length >= seq_size_in
+      if tries_remaining == 0:
+        raise ValueError("Could not generate a sample below the allowable "
+                         "maximum, consider reducing either max_length or "
+                         "max_nest.")
+      else:
+        tries_remaining -= 1
+    return tokens_in, seq_size_in, tokens_out, seq_size_out
+
   def generate_flat_data(self):
     """Generates batched data in flat numpy arrays.
 
@@ -666,28 +706,15 @@ class TokenDataSource(object):
     self.sequence_sizes_out = []
     for _ in six.moves.range(self._batch_size):
       length, nest = self.curriculum_obj.fetch()
-      seq_size_in = self._max_seq_length
-      # Generate batch within max length.
-      is_valid_sample = False
-      tries_remaining = 10
-      while not is_valid_sample:
-        value, code = generate_code(length, nest, self._ops)
-        tokens_in, seq_size_in = self.tokenize(
-            code, self._max_seq_length, self._token_by_char)
-        tokens_out, seq_size_out = self.tokenize(
-            value, self._max_seq_length, self._token_by_char)
-        is_valid_sample = self._max_seq_length >= seq_size_in
-        if is_valid_sample:
-          self.sequence_sizes_in.append(seq_size_in)
-          self.sequence_sizes_out.append(seq_size_out)
-        if tries_remaining == 0:
-          raise ValueError("Could not generate a sample below the allowable "
-                           "maximum, consider reducing either max_length or "
-                           "max_nest.")
-        else:
-          tries_remaining -= 1
-      all_statements += tokens_in
-      all_targets += tokens_out
+      if self.sample_cache is not None:
+        sample = self.sample_cache.sample(length, nest)
+      else:
+        sample = self.generate_sample(length, nest)
+      tokens_in, seq_size_in, tokens_out, seq_size_out = sample
+      self.sequence_sizes_in.append(seq_size_in)
+      self.sequence_sizes_out.append(seq_size_out)
+      all_statements.extend(tokens_in)
+      all_targets.extend(tokens_out)
     # Store the flattened data.
     self.flat_data = np.array(all_statements, dtype=np.int64)
     self.num_tokens = self.flat_data.shape[0]
@@ -755,6 +782,201 @@ class TokenDataSource(object):
     return [self._inv_vocab_dict[token] for token in token_list]
 
 
+class LevelSampleCache(object):
+  """On-disk cache of tokenized samples, keyed by curriculum level.
+
+  The first time a level (literal length and nesting) is requested,
+  `num_samples` samples of that level are generated and saved as a `.npz` file
+  in `cache_dir`. Samples of a cached level, in this or any later run, are
+  then drawn uniformly at random from the saved ones instead of being
+  generated.
+  """
+
+  def __init__(self, cache_dir, name, generate_fn, num_samples=10000):
+    """Creates a LevelSampleCache instance.
+
+    Args:
+      cache_dir: (str) Directory to store the cached samples in.
+      name: (str) Prefix of the cache files, which must identify the task,
+          tokenization and maximum sequence size of the samples.
+      generate_fn: Function taking the literal length and nesting level and
+          returning a sample, see `TokenDataSource.generate_sample`.
+      num_samples: (int) Number of samples to cache per level.
+    """
+    self._cache_dir = cache_dir
+    self._name = name
+    self._generate_fn = generate_fn
+    self._num_samples = num_samples
+    self._levels = {}
+
+  def _path(self, length, nest):
+    return os.path.join(
+        self._cache_dir, "{}-length{}-nesting{}-samples{}.npz".format(
+            self._name, length, nest, self._num_samples))
+
+  def _load_level(self, length, nest):
+    """Loads the samples of a level, generating and saving them if needed."""
+    path = self._path(length, nest)
+    if os.path.exists(path):
+      with open(path, "rb") as f:
+        return dict(np.load(f))
+
+    samples = [self._generate_fn(length, nest)
+               for _ in six.moves.range(self._num_samples)]
+    tokens_in, sizes_in, tokens_out, sizes_out = zip(*samples)
+    level = {
+        "tokens_in": np.array(tokens_in, dtype=np.int64),
+        "sizes_in": np.array(sizes_in, dtype=np.int64),
+        "tokens_out": np.array(tokens_out, dtype=np.int64),
+        "sizes_out": np.array(sizes_out, dtype=np.int64),
+    }
+    if not os.path.isdir(self._cache_dir):
+      os.makedirs(self._cache_dir)
+    # Write to a temporary file first so that concurrent readers, e.g. other
+    # worker processes, never see a partially written level.
+    temp_path = "{}.tmp{}".format(path, os.getpid())
+    with open(temp_path, "wb") as f:
+      np.savez(f, **level)
+    os.rename(temp_path, path)
+    return level
+
+  def sample(self, length, nest):
+    """Returns a random cached sample of the given level.
+
+    Args:
+      length: (int) literal length of the sample.
+      nest: (int) nesting level of the sample.
+
+    Returns:
+      Tuple of the padded input tokens, the input sequence size, the padded
+      target tokens and the target sequence size.
+    """
+    level = self._levels.get((length, nest))
+    if level is None:
+      level = self._load_level(length, nest)
+      self._levels[(length, nest)] = level
+    index = random.randrange(len(level["sizes_in"]))
+    return (level["tokens_in"][index], level["sizes_in"][index],
+            level["tokens_out"][index], level["sizes_out"][index])
+
+
+def _make_token_data_source(curriculum, batch_size, max_len, ops,
+                            token_by_char, cache_dir, cache_name,
+                            num_cached_samples):
+  """Creates a `TokenDataSource`, with a `LevelSampleCache` if requested."""
+  data_source = TokenDataSource(curriculum, batch_size, max_len, ops,
+                                token_by_char)
+  if cache_dir is not None:
+    data_source.sample_cache = LevelSampleCache(
+        cache_dir, cache_name, data_source.generate_sample,
+        num_samples=num_cached_samples)
+  return data_source
+
+
+def _fill_batches(data_source_args, buffers, free_slots, ready_slots, seed):
+  """Worker process loop filling the slots of a `_SharedBatchRing`."""
+  # Forked workers inherit the random states of the parent, and the curricula
+  # draw from numpy's.
+  random.seed(seed)
+  np.random.seed(seed)
+  data_source = _make_token_data_source(*data_source_args)
+  tokens_in, tokens_out, sizes_in, sizes_out = buffers.arrays()
+  while True:
+    item = free_slots.get()
+    if item is None:
+      return
+    slot, curriculum = item
+    try:
+      data_source.curriculum_obj = curriculum
+      data_source.generate_flat_data()
+      tokens_in[slot] = data_source.flat_data.reshape(tokens_in[slot].shape)
+      tokens_out[slot] = data_source.flat_targets.reshape(
+          tokens_out[slot].shape)
+      sizes_in[slot] = data_source.sequence_sizes_in
+      sizes_out[slot] = data_source.sequence_sizes_out
+    except Exception:  # pylint: disable=broad-except
+      ready_slots.put((None, traceback.format_exc()))
+      return
+    ready_slots.put((slot, None))
+
+
+class _SharedBuffers(object):
+  """Shared memory arrays backing the slots of a `_SharedBatchRing`."""
+
+  def __init__(self, num_slots, batch_size, max_len):
+    self._token_shape = (num_slots, batch_size, max_len)
+    self._size_shape = (num_slots, batch_size)
+    self._buffers = [
+        multiprocessing.RawArray(ctypes.c_int64, int(np.prod(shape)))
+        for shape in (self._token_shape, self._token_shape,
+                      self._size_shape, self._size_shape)]
+
+  def arrays(self):
+    """Returns numpy views of the input/target tokens and sizes buffers."""
+    shapes = (self._token_shape, self._token_shape,
+              self._size_shape, self._size_shape)
+    return [np.frombuffer(buf, dtype=np.int64).reshape(shape)
+            for buf, shape in zip(self._buffers, shapes)]
+
+
+class _SharedBatchRing(object):
+  """Ring buffer of tokenized batches filled by worker processes.
+
+  The batches are written into a fixed number of slots in shared memory, so
+  only slot indices go through the inter-process queues. A slot is handed
+  back to the workers, along with a snapshot of the current curriculum, as
+  soon as its batch has been read, so batches are generated with a curriculum
+  at most `num_slots` batches old.
+  """
+
+  def __init__(self, data_source_args, curriculum, batch_size, max_len,
+               num_workers, num_slots):
+    self._buffers = _SharedBuffers(num_slots, batch_size, max_len)
+    self._arrays = self._buffers.arrays()
+    self._free_slots = multiprocessing.Queue()
+    self._ready_slots = multiprocessing.Queue()
+    for slot in six.moves.range(num_slots):
+      self._free_slots.put((slot, curriculum))
+    self._workers = []
+    for _ in six.moves.range(num_workers):
+      worker = multiprocessing.Process(
+          target=_fill_batches,
+          args=(data_source_args, self._buffers, self._free_slots,
+                self._ready_slots, random.randint(0, 2 ** 31 - 1)))
+      worker.daemon = True
+      worker.start()
+      self._workers.append(worker)
+
+  def get(self, curriculum):
+    """Returns the next batch and recycles its slot.
+
+    Args:
+      curriculum: (LTECurriculum) Curriculum to generate the next batch in the
+          slot with.
+
+    Returns:
+      Tuple of copies of the input tokens, target tokens, input sizes and
+      target sizes of the batch.
+
+    Raises:
+      RuntimeError: If a worker failed to generate a batch.
+    """
+    slot, error = self._ready_slots.get()
+    if slot is None:
+      raise RuntimeError("Batch generation failed:\n{}".format(error))
+    batch = tuple(array[slot].copy() for array in self._arrays)
+    self._free_slots.put((slot, curriculum))
+    return batch
+
+  def close(self):
+    """Stops the worker processes."""
+    for _ in self._workers:
+      self._free_slots.put(None)
+    for worker in self._workers:
+      worker.join()
+    self._workers = []
+
+
 # Task Types.
 class TaskType(Enum):
   ALGEBRA = 1
@@ -805,7 +1027,8 @@ class LearnToExecuteState(object):
   }
 
   def __init__(self, batch_size, max_length, max_nesting, curriculum,
-               token_by_char=True, task_type="alg-ctrl"):
+               token_by_char=True, task_type="alg-ctrl", num_workers=0,
+               num_slots=None, cache_dir=None, num_cached_samples=10000):
     """Creates a LearnToExecute Dataset.
 
     Initializes the dataset task set and input annd target sequence shapes.
@@ -819,12 +1042,25 @@ class LearnToExecuteState(object):
       max_nesting: (int). Maximum level of statement nesting.
       curriculum: (LTECurriculum). Curriculum strategy to use.
       token_by_char: (bool). Tokenize by character or words?
-      task_type: (string) defines the task by allowable ops (see TASK_TYPE_OPS).
+      task_type: (TaskType or string) defines the task by allowable ops (see
+          TASK_TYPE_OPS). A string names the `TaskType`, e.g. "alg-ctrl".
+      num_workers: (int). Number of processes generating batches in the
+          background. If 0, batches are generated when requested.
+      num_slots: (int). Number of batches buffered in shared memory when using
+          worker processes. Defaults to twice `num_workers`.
+      cache_dir: (string). If set, directory of the on-disk cache of generated
+          samples, see `LevelSampleCache`.
+      num_cached_samples: (int). Number of samples cached per curriculum level.
 
     Raises:
       ValueError: If task is invalid.
     """
     super(LearnToExecuteState, self).__init__()
+    if isinstance(task_type, six.string_types):
+      try:
+        task_type = TaskType[task_type.upper().replace("-", "_")]
+      except KeyError:
+        raise ValueError("Unknown task: {}.".format(task_type))
     self._token_by_char = token_by_char
     # Compute the max number of steps possible to take.
     if task_type in self.TASK_GROUPS[TaskGroups.PROG_TASKS]:
@@ -854,11 +1090,20 @@ class LearnToExecuteState(object):
     self._ops = LearnToExecuteState.get_task_ops(task_type)
     self._curriculum = curriculum
     num_steps = max(self._num_steps, self._num_steps_out)
-    self._data_source = TokenDataSource(
-        self._curriculum, self._batch_size, num_steps, self._ops,
-        self._token_by_char)
+    cache_name = "{}-{}-{}".format(
+        task_type.name, "char" if self._token_by_char else "word", num_steps)
+    data_source_args = (self._curriculum, self._batch_size, num_steps,
+                        self._ops, self._token_by_char, cache_dir, cache_name,
+                        num_cached_samples)
+    self._data_source = _make_token_data_source(*data_source_args)
     self.reset_data_source()
 
+    self._batch_ring = None
+    if num_workers:
+      self._batch_ring = _SharedBatchRing(
+          data_source_args, self._curriculum, self._batch_size, num_steps,
+          num_workers, num_slots or 2 * num_workers)
+
   @staticmethod
   def get_task_ops(task_type=TaskType.ALG_CTRL):
     """Returns an operations list based on the specified task index.
@@ -884,10 +1129,9 @@ class LearnToExecuteState(object):
     return self._data_source.vocab_size
 
   def _np_one_hot(self, tensor, num_steps):
-    tensor_oh = np.zeros((tensor.size, self.vocab_size))
+    tensor_oh = np.zeros((tensor.size, self.vocab_size), dtype=np.float32)
     tensor_oh[np.arange(tensor.size), tensor.flat] = 1
-    return tensor_oh.reshape(
-        num_steps, self.batch_size, self.vocab_size).astype(np.float32)
+    return tensor_oh.reshape(num_steps, self.batch_size, self.vocab_size)
 
   def reset_data_source(self):
     """Build the data source given the current curriculum state."""
@@ -941,20 +1185,32 @@ class LearnToExecuteState(object):
         5. batch size tensor containing integer output sequence lengths.
     """
     while True:
-      self.reset_data_source()
-      obs = np.reshape(self._data_source.flat_data,
-                       [self.batch_size, -1])[:, :self._num_steps].T
+      if self._batch_ring is not None:
+        flat_data, flat_targets, seq_sizes_in, seq_sizes_out = (
+            self._batch_ring.get(self._curriculum))
+      else:
+        self.reset_data_source()
+        flat_data = self._data_source.flat_data
+        flat_targets = self._data_source.flat_targets
+        seq_sizes_in = self.seq_sizes_in
+        seq_sizes_out = self.seq_sizes_out
+      obs = np.reshape(flat_data, [self.batch_size, -1])[:, :self._num_steps].T
       target = np.reshape(
-          self._data_source.flat_targets,
-          [self.batch_size, -1])[:, :self._num_steps_out].T
+          flat_targets, [self.batch_size, -1])[:, :self._num_steps_out].T
       start_tokens = np.ndarray([1, self.batch_size], dtype=np.int32)
       start_tokens.fill(self._data_source.start_token[0])
       target_in = np.concatenate((start_tokens, target[:-1, :]), axis=0)
       yield (self._np_one_hot(obs, self._num_steps),
              self._np_one_hot(target, self._num_steps_out),
              self._np_one_hot(target_in, self._num_steps_out),
-             self.seq_sizes_in,
-             self.seq_sizes_out)
+             seq_sizes_in,
+             seq_sizes_out)
+
+  def close(self):
+    """Stops the worker processes generating batches, if any."""
+    if self._batch_ring is not None:
+      self._batch_ring.close()
+      self._batch_ring = None
 
   def to_human_readable(self, data, label_batch_entries=True, indices=None,
                         sep="\n"):
@@ -994,7 +1250,8 @@ class Mode(Enum):
 def LearnToExecute(   # pylint: disable=invalid-name
     batch_size, max_length=1, max_nesting=1, token_by_char=True,
     mode=Mode.TRAIN_COMBINE, loss_threshold=0.1,
-    min_tries=DEFAULT_MIN_CURRICULUM_EVAL_TRIES, task_type=TaskType.ALG_CTRL):
+    min_tries=DEFAULT_MIN_CURRICULUM_EVAL_TRIES, task_type=TaskType.ALG_CTRL,
+    num_workers=0, num_slots=None, cache_dir=None, num_cached_samples=10000):
   """Factory method for LearnToExecute Dataset module.
 
   Args:
@@ -1007,6 +1264,13 @@ def LearnToExecute(   # pylint: disable=invalid-name
         the task difficulty.
     min_tries: (int) minimum update tries for curriculum difficulty level.
     task_type: (string) defines the task by allowable ops (see TASK_TYPE_OPS).
+    num_workers: (int). Number of processes generating batches into a shared
+        memory ring buffer. If 0, batches are generated when requested.
+    num_slots: (int). Number of batches in the ring buffer. Defaults to twice
+        `num_workers`.
+    cache_dir: (string). If set, directory of an on-disk cache of generated
+        samples keyed by curriculum level, see `LevelSampleCache`.
+    num_cached_samples: (int). Number of samples cached per curriculum level.
 
   Returns:
     tf.Data.Dataset for LearnToExecute sample generator with the
@@ -1031,7 +1295,10 @@ def LearnToExecute(   # pylint: disable=invalid-name
   else:
     raise ValueError("Invalid mode.")
   lte = LearnToExecuteState(batch_size, max_length, max_nesting,
-                            curriculum, token_by_char, task_type=task_type)
+                            curriculum, token_by_char, task_type=task_type,
+                            num_workers=num_workers, num_slots=num_slots,
+                            cache_dir=cache_dir,
+                            num_cached_samples=num_cached_samples)
   types_ = (tf.float32, tf.float32, tf.float32, tf.int64, tf.int64)
   shapes_ = (tf.TensorShape([lte.num_steps, batch_size, lte.vocab_size]),
              tf.TensorShape([lte.num_steps_out, batch_size, lte.vocab_size]),
@@ -0,0 +1,159 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.examples.learn_to_execute."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import os
+
+import numpy as np
+from sonnet.examples import learn_to_execute
+import tensorflow.compat.v1 as tf
+
+
+class BatchWorkerTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(BatchWorkerTest, self).setUp()
+    self._batch_size = 4
+    self._curriculum = learn_to_execute.MixCurriculum(3, 2, 0.1)
+    state = learn_to_execute.LearnToExecuteState(
+        self._batch_size, 3, 2, self._curriculum)
+    self._max_len = max(state.num_steps, state.num_steps_out)
+    self._data_source_args = (
+        self._curriculum, self._batch_size, self._max_len,
+        learn_to_execute.LearnToExecuteState.get_task_ops(), True, None,
+        "alg-ctrl", 0)
+
+  def _fill_batch(self, seed):
+    """Runs the worker loop in process to fill a single batch."""
+    # pylint: disable=protected-access
+    buffers = learn_to_execute._SharedBuffers(1, self._batch_size,
+                                              self._max_len)
+    free_slots = multiprocessing.Queue()
+    ready_slots = multiprocessing.Queue()
+    free_slots.put((0, self._curriculum))
+    free_slots.put(None)
+    learn_to_execute._fill_batches(self._data_source_args, buffers,
+                                   free_slots, ready_slots, seed)
+    # pylint: enable=protected-access
+    slot, error = ready_slots.get()
+    self.assertIsNone(error)
+    return [array[slot].copy() for array in buffers.arrays()]
+
+  def test_seed_reproduces_batch(self):
+    # The seed of the worker alone determines its batches, whatever the random
+    # states inherited from the parent process.
+    np.random.seed(1)
+    batch = self._fill_batch(seed=7)
+    np.random.seed(2)
+    same_seed_batch = self._fill_batch(seed=7)
+    for array, same_seed_array in zip(batch, same_seed_batch):
+      self.assertAllEqual(array, same_seed_array)
+
+  def test_seeds_give_different_batches(self):
+    np.random.seed(1)
+    batch = self._fill_batch(seed=7)
+    np.random.seed(1)
+    other_batch = self._fill_batch(seed=8)
+    self.assertFalse(all(np.array_equal(array, other_array)
+                         for array, other_array in zip(batch, other_batch)))
+
+  def test_workers_give_different_batches(self):
+    state = learn_to_execute.LearnToExecuteState(
+        self._batch_size, 3, 2, self._curriculum, num_workers=2, num_slots=2)
+    try:
+      batches = state.make_batch()
+      first_batch = next(batches)
+      second_batch = next(batches)
+    finally:
+      state.close()
+    self.assertFalse(np.array_equal(first_batch[0], second_batch[0]))
+
+
+class LearnToExecuteStateTest(tf.test.TestCase):
+
+  def test_task_type_string_and_enum_share_cache(self):
+    cache_dir = os.path.join(self.get_temp_dir(), "task_cache")
+    for task_type in ("alg-ctrl", learn_to_execute.TaskType.ALG_CTRL):
+      learn_to_execute.LearnToExecuteState(
+          4, 3, 2, learn_to_execute.MixCurriculum(3, 2, 0.1),
+          task_type=task_type, cache_dir=cache_dir, num_cached_samples=3)
+    # Both states wrote their samples under the same name.
+    names = {filename.split("-length")[0]
+             for filename in os.listdir(cache_dir)}
+    self.assertLen(names, 1)
+    self.assertStartsWith(names.pop(), "ALG_CTRL-char-")
+
+  def test_unknown_task_type(self):
+    with self.assertRaisesRegexp(ValueError, "Unknown task"):
+      learn_to_execute.LearnToExecuteState(
+          4, 3, 2, learn_to_execute.MixCurriculum(3, 2, 0.1),
+          task_type="unknown")
+
+
+class LevelSampleCacheTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(LevelSampleCacheTest, self).setUp()
+    self._cache_dir = os.path.join(self.get_temp_dir(), "cache")
+    self._num_generated = 0
+
+  def _generate(self, length, nest):
+    """Returns a distinct sample encoding the level and generation index."""
+    index = self._num_generated
+    self._num_generated += 1
+    return ([length, nest, index], 3, [index, 0], 2)
+
+  def _cache(self, num_samples=5):
+    return learn_to_execute.LevelSampleCache(
+        self._cache_dir, "test", self._generate, num_samples=num_samples)
+
+  def test_first_sample_writes_level(self):
+    self._cache().sample(3, 2)
+    self.assertEqual(self._num_generated, 5)
+    # The level was written atomically, without leaving a temporary file.
+    self.assertEqual(os.listdir(self._cache_dir),
+                     ["test-length3-nesting2-samples5.npz"])
+
+  def test_cached_level_is_read_back(self):
+    self._cache().sample(3, 2)
+    self._num_generated = 0
+    cache = self._cache()
+    for _ in range(20):
+      tokens_in, size_in, tokens_out, size_out = cache.sample(3, 2)
+      self.assertEqual(tokens_in[:2].tolist(), [3, 2])
+      self.assertIn(tokens_in[2], range(5))
+      self.assertEqual(tokens_out.tolist(), [tokens_in[2], 0])
+      self.assertEqual((size_in, size_out), (3, 2))
+    self.assertEqual(self._num_generated, 0)
+
+  def test_levels_are_cached_separately(self):
+    cache = self._cache()
+    self.assertEqual(cache.sample(3, 2)[0][:2].tolist(), [3, 2])
+    self.assertEqual(cache.sample(4, 1)[0][:2].tolist(), [4, 1])
+    self.assertEqual(self._num_generated, 10)
+
+  def test_num_samples_change_regenerates_level(self):
+    self._cache(num_samples=5).sample(3, 2)
+    self._cache(num_samples=8).sample(3, 2)
+    self.assertEqual(self._num_generated, 13)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -41,14 +41,18 @@ tf.flags.DEFINE_integer("test_every", 200,
 tf.flags.DEFINE_integer("train_batch_size", 200, "Batch size for training.")
 tf.flags.DEFINE_boolean("gpu_auto_mixed_precision", False,
                         "Enable GPU automatic mixed precision training")
+tf.flags.DEFINE_string("data_cache_dir", None,
+                       "If set, directory of memory-mapped uint8 data to read "
+                       "batches from instead of in-graph constants.")
 
 
 def train_and_eval(train_batch_size, test_batch_size, num_hidden, learning_rate,
                    num_train_steps, report_every, test_every,
-                   gpu_auto_mixed_precision=False):
+                   gpu_auto_mixed_precision=False, data_cache_dir=None):
   """Creates a basic MNIST model using Sonnet, then trains and evaluates it."""
 
-  data_dict = dataset_mnist.get_data("mnist", train_batch_size, test_batch_size)
+  data_dict = dataset_mnist.get_data("mnist", train_batch_size, test_batch_size,
+                                     cache_dir=data_cache_dir)
   train_data = data_dict["train_iterator"]
   test_data = data_dict["test_iterator"]
 
@@ -115,7 +119,7 @@ def main(unused_argv):
   train_and_eval(FLAGS.train_batch_size, FLAGS.test_batch_size,
                  FLAGS.num_hidden, FLAGS.learning_rate, FLAGS.num_train_steps,
                  FLAGS.report_every, FLAGS.test_every,
-                 FLAGS.gpu_auto_mixed_precision)
+                 FLAGS.gpu_auto_mixed_precision, FLAGS.data_cache_dir)
 
 
 if __name__ == "__main__":
@@ -23,10 +23,15 @@ import collections
 import os
 
 # Dependency imports
+import numpy as np
 import six
 import tensorflow.compat.v1 as tf
 
 
+_SUBSETS = ("train", "valid", "test")
+_VOCAB_FILENAME = "ptb.vocab.txt"
+
+
 def _read_words(filename):
   with tf.gfile.GFile(filename, "r") as f:
     if six.PY3:
@@ -82,6 +87,145 @@ def ptb_raw_data(data_path):
   return train_data, valid_data, test_data, word_to_id
 
 
+def _ids_filename(subset):
+  return "ptb.{}.ids.npy".format(subset)
+
+
+def _is_local(path):
+  """Whether `path` is on the local file system, so it can be memory mapped."""
+  return "://" not in path
+
+
+def _is_cache_valid(data_path, cache_dir):
+  """Whether all cache files exist and are newer than the text files."""
+  cache_paths = [os.path.join(cache_dir, _VOCAB_FILENAME)]
+  cache_paths += [os.path.join(cache_dir, _ids_filename(subset))
+                  for subset in _SUBSETS]
+  if not all(tf.gfile.Exists(path) for path in cache_paths):
+    return False
+  cache_time = min(tf.gfile.Stat(path).mtime_nsec for path in cache_paths)
+  text_paths = [os.path.join(data_path, "ptb.{}.txt".format(subset))
+                for subset in _SUBSETS]
+  return all(tf.gfile.Stat(path).mtime_nsec <= cache_time
+             for path in text_paths if tf.gfile.Exists(path))
+
+
+def _write_cache(data_path, cache_dir):
+  """Tokenizes the text files into the cache."""
+  train_data, valid_data, test_data, word_to_id = ptb_raw_data(data_path)
+  tf.gfile.MakeDirs(cache_dir)
+
+  # Files are written under a temporary name and then renamed, so that an
+  # interrupted run never leaves a partial cache behind.
+  def write(filename, write_fn):
+    path = os.path.join(cache_dir, filename)
+    temp_path = "{}.tmp{}".format(path, os.getpid())
+    with tf.gfile.GFile(temp_path, "wb") as f:
+      write_fn(f)
+    tf.gfile.Rename(temp_path, path, overwrite=True)
+
+  for subset, data in zip(_SUBSETS, (train_data, valid_data, test_data)):
+    write(_ids_filename(subset),
+          lambda f, data=data: np.save(f, np.array(data, dtype=np.int32)))
+  # The vocabulary is written last, as the cache is valid once all the files
+  # are newer than the text files.
+  words = sorted(word_to_id, key=word_to_id.get)
+  write(_VOCAB_FILENAME,
+        lambda f: f.write("\n".join(words).encode("utf-8")))
+
+
+def ptb_cached_data(data_path, cache_dir=None):
+  """Loads PTB data from a memory-mapped cache of token ids.
+
+  The first time it is called, tokenizes the text files with `ptb_raw_data`
+  and writes the ids of each subset to an int32 `.npy` file, and the
+  vocabulary to a sidecar text file with one word per line, in id order.
+  Later calls only read the vocabulary and memory-map the ids, so they are
+  almost instantaneous. The cache is rebuilt if any text file is newer.
+
+  Only a local cache can be memory mapped. If `cache_dir` is not given and
+  `data_path` is not local (e.g. on GCS), the data are read with
+  `ptb_raw_data` instead.
+
+  Args:
+    data_path: string path to the directory where simple-examples.tgz has
+      been extracted.
+    cache_dir: string path to the local directory to write the cache to.
+      Defaults to `data_path` if it is local.
+
+  Returns:
+    tuple (train_data, valid_data, test_data, vocabulary) as returned by
+    `ptb_raw_data`, except that the data are read-only int32 arrays mapped
+    from the cache.
+
+  Raises:
+    ValueError: if `cache_dir` is not on the local file system.
+  """
+  if cache_dir is None:
+    if not _is_local(data_path):
+      tf.logging.info("Not caching PTB data from non-local path %s, set "
+                      "cache_dir to a local directory to cache it.", data_path)
+      return ptb_raw_data(data_path)
+    cache_dir = data_path
+  elif not _is_local(cache_dir):
+    raise ValueError(
+        "cache_dir must be a local directory, got {}.".format(cache_dir))
+
+  if not _is_cache_valid(data_path, cache_dir):
+    _write_cache(data_path, cache_dir)
+
+  with tf.gfile.GFile(os.path.join(cache_dir, _VOCAB_FILENAME), "rb") as f:
+    words = f.read().decode("utf-8").split("\n")
+  word_to_id = dict(zip(words, range(len(words))))
+  train_data, valid_data, test_data = [
+      np.load(os.path.join(cache_dir, _ids_filename(subset)), mmap_mode="r")
+      for subset in _SUBSETS]
+  return train_data, valid_data, test_data, word_to_id
+
+
+def ptb_dataset(raw_data, batch_size, num_steps, prefetch_size=2):
+  """Iterates on the raw PTB data with `tf.data`.
+
+  Serves the same batches as `ptb_producer`, repeated indefinitely, but reads
+  them from `raw_data` in Python instead of embedding it in the graph. Only
+  the window of the current batch is copied, so `raw_data` can be memory
+  mapped, see `ptb_cached_data`.
+
+  Args:
+    raw_data: one of the raw data outputs from ptb_raw_data or
+      ptb_cached_data.
+    batch_size: int, the batch size.
+    num_steps: int, the number of unrolls.
+    prefetch_size: int, the number of batches to prefetch.
+
+  Returns:
+    A `tf.data.Dataset` of pairs of int32 Tensors, each shaped
+    [batch_size, num_steps]. The second element of the tuple is the same data
+    time-shifted to the right by one.
+
+  Raises:
+    ValueError: if batch_size or num_steps are too high.
+  """
+  raw_data = np.asarray(raw_data)
+  batch_len = raw_data.shape[0] // batch_size
+  data = raw_data[:batch_size * batch_len].reshape([batch_size, batch_len])
+
+  epoch_size = (batch_len - 1) // num_steps
+  if epoch_size <= 0:
+    raise ValueError("epoch_size == 0, decrease batch_size or num_steps")
+
+  def generate_windows():
+    for i in six.moves.range(epoch_size):
+      window = np.array(data[:, i * num_steps:(i + 1) * num_steps + 1],
+                        dtype=np.int32)
+      yield window[:, :-1], window[:, 1:]
+
+  shape = tf.TensorShape([batch_size, num_steps])
+  dataset = tf.data.Dataset.from_generator(
+      generate_windows, (tf.int32, tf.int32), (shape, shape))
+  return dataset.repeat().prefetch(prefetch_size)
+
+
 def ptb_producer(raw_data, batch_size, num_steps, name=None):
   """Iterate on the raw PTB data.
 
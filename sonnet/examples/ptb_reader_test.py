@@ -0,0 +1,119 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.examples.ptb_reader."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+# Dependency imports
+import mock
+import numpy as np
+from sonnet.examples import ptb_reader
+import tensorflow.compat.v1 as tf
+
+
+class PtbReaderTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(PtbReaderTest, self).setUp()
+    self._data_path = self.get_temp_dir()
+    self._write_subsets(
+        train="hello there i am\nbob the builder\n",
+        valid="hello bob\nthe builder is there\n",
+        test="i am there\n")
+
+  def _write_subsets(self, **texts):
+    for subset, text in texts.items():
+      path = os.path.join(self._data_path, "ptb.{}.txt".format(subset))
+      with tf.gfile.GFile(path, "w") as f:
+        f.write(text)
+
+  def _assertSameData(self, cached_data, raw_data):
+    for cached_subset, raw_subset in zip(cached_data[:3], raw_data[:3]):
+      self.assertEqual(cached_subset.dtype, np.int32)
+      self.assertAllEqual(cached_subset, raw_subset)
+    self.assertEqual(cached_data[3], raw_data[3])
+
+  def testCachedDataMatchesRawData(self):
+    cache_dir = os.path.join(self.get_temp_dir(), "cache")
+    raw_data = ptb_reader.ptb_raw_data(self._data_path)
+    # The first call writes the cache, the second one only reads it.
+    self._assertSameData(
+        ptb_reader.ptb_cached_data(self._data_path, cache_dir), raw_data)
+    cached_data = ptb_reader.ptb_cached_data(self._data_path, cache_dir)
+    self.assertIsInstance(cached_data[0], np.memmap)
+    self._assertSameData(cached_data, raw_data)
+
+  def testStaleCacheRebuilt(self):
+    cache_dir = os.path.join(self.get_temp_dir(), "stale_cache")
+    old_valid_data = np.array(
+        ptb_reader.ptb_cached_data(self._data_path, cache_dir)[1])
+    cache_time = os.path.getmtime(os.path.join(cache_dir, "ptb.vocab.txt"))
+
+    # The text file is made newer than the cache, whatever the resolution of
+    # the file system timestamps.
+    self._write_subsets(valid="bob is there\nhello the builder\n")
+    valid_path = os.path.join(self._data_path, "ptb.valid.txt")
+    os.utime(valid_path, (cache_time + 10, cache_time + 10))
+
+    cached_data = ptb_reader.ptb_cached_data(self._data_path, cache_dir)
+    self.assertNotEqual(list(cached_data[1]), list(old_valid_data))
+    self._assertSameData(cached_data,
+                         ptb_reader.ptb_raw_data(self._data_path))
+
+  def testNonLocalDataPathNotCached(self):
+    data_path = "gs://bucket/ptb"
+    with mock.patch.object(ptb_reader, "ptb_raw_data") as mocked_raw_data:
+      data = ptb_reader.ptb_cached_data(data_path)
+    mocked_raw_data.assert_called_once_with(data_path)
+    self.assertIs(data, mocked_raw_data.return_value)
+
+  def testNonLocalCacheDir(self):
+    with self.assertRaisesRegexp(ValueError, "must be a local directory"):
+      ptb_reader.ptb_cached_data(self._data_path, "gs://bucket/cache")
+
+  def testDatasetMatchesProducer(self):
+    raw_data = np.arange(41, dtype=np.int32)
+    batch_size = 3
+    num_steps = 2
+    # Covers more than an epoch, to check the dataset is repeated.
+    num_batches = 2 * ((len(raw_data) // batch_size - 1) // num_steps) + 1
+
+    producer_batch = ptb_reader.ptb_producer(raw_data, batch_size, num_steps)
+    dataset_batch = tf.data.make_one_shot_iterator(
+        ptb_reader.ptb_dataset(raw_data, batch_size, num_steps)).get_next()
+    with self.test_session() as sess:
+      coord = tf.train.Coordinator()
+      threads = tf.train.start_queue_runners(sess=sess, coord=coord)
+      try:
+        for _ in range(num_batches):
+          (x, y), (dataset_x, dataset_y) = sess.run(
+              [producer_batch, dataset_batch])
+          self.assertAllEqual(dataset_x, x)
+          self.assertAllEqual(dataset_y, y)
+      finally:
+        coord.request_stop()
+        coord.join(threads)
+
+  def testDatasetTooShort(self):
+    with self.assertRaisesRegexp(ValueError, "epoch_size == 0"):
+      ptb_reader.ptb_dataset(np.arange(10, dtype=np.int32), 5, 2)
+
+
+if __name__ == "__main__":
+  tf.test.main()
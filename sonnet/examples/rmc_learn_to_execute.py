@@ -48,6 +48,10 @@ flags.DEFINE_integer("num_blocks", 1, "Number of attention blocks for RMC.")
 flags.DEFINE_string("gate_style", "unit", "Gating style for RMC.")
 flags.DEFINE_integer("max_length", 5, "LTE max literal length.")
 flags.DEFINE_integer("max_nest", 2, "LTE max nesting level.")
+flags.DEFINE_integer("num_data_workers", 0,
+                     "Processes generating training batches in the background.")
+flags.DEFINE_string("data_cache_dir", None,
+                    "Directory to cache generated training samples in.")
 flags.DEFINE_integer("epochs", 1000000, "Total training epochs.")
 flags.DEFINE_integer("log_stride", 500, "Iterations between reports.")
 
@@ -125,7 +129,9 @@ def build_and_train(iterations, log_stride, test=False):
 
     # Initialize the dataset.
     lte_train = learn_to_execute.LearnToExecute(
-        batch_size, max_length, max_nest)
+        batch_size, max_length, max_nest,
+        num_workers=0 if test else FLAGS.num_data_workers,
+        cache_dir=None if test else FLAGS.data_cache_dir)
     lte_test = learn_to_execute.LearnToExecute(
         batch_size, max_length, max_nest, mode=learn_to_execute.Mode.TEST)
     train_data_iter = lte_train.make_one_shot_iterator().get_next()
@@ -225,6 +231,7 @@ def build_and_train(iterations, log_stride, test=False):
               " train solved {:3f}; test solved {:3f}; ({:3f})".format(
                   it, loss_v, train_acc_v, test_acc_v, train_sol_v, test_sol_v,
                   elapsed))
+    lte_train.state.close()
 
 
 def main(unused_argv):
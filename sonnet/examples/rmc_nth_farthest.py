@@ -49,6 +49,8 @@ flags.DEFINE_integer("num_blocks", 1, "Number of attention blocks for RMC.")
 flags.DEFINE_string("gate_style", "unit", "Gating style for RMC.")
 flags.DEFINE_integer("num_objects", 4, "Number of objects per dataset sample.")
 flags.DEFINE_integer("num_features", 4, "Feature size per object.")
+flags.DEFINE_integer("num_data_workers", 0,
+                     "Processes generating batches in the background.")
 flags.DEFINE_integer("epochs", 1000000, "Total training epochs.")
 flags.DEFINE_integer("log_stride", 100, "Iterations between reports.")
 
@@ -108,7 +110,8 @@ def build_and_train(iterations, log_stride, test=False):
 
     # Initialize the dataset.
     dataset = dataset_nth_farthest.NthFarthest(
-        batch_size, num_objects, num_features)
+        batch_size, num_objects, num_features,
+        num_workers=0 if test else FLAGS.num_data_workers)
 
     # Create the model.
     core = snt.RelationalMemory(
@@ -200,6 +203,7 @@ def build_and_train(iterations, log_stride, test=False):
           train_losses.append(loss_v)
           steps.append(it)
         test_accs.append(acc_v)
+    dataset.close()
   return steps, train_losses, test_accs
 
 
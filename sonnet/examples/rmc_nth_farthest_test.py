@@ -18,12 +18,34 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
+from scipy.spatial import distance as spdistance
 import sonnet as snt
 from sonnet.examples import dataset_nth_farthest
 from sonnet.examples import rmc_nth_farthest
 import tensorflow.compat.v1 as tf
 
 
+class _ReplayRandomState(object):
+  """Random state returning the given arrays, in the order requested."""
+
+  def __init__(self, *arrays):
+    self._arrays = list(arrays)
+
+  def _next(self, size):
+    array = self._arrays.pop(0)
+    assert array.shape == tuple(np.atleast_1d(size)), (array.shape, size)
+    return array
+
+  def uniform(self, low=0.0, high=1.0, size=None):
+    del low, high  # Unused.
+    return self._next(size)
+
+  def randint(self, low, high=None, size=None):
+    del low, high  # Unused.
+    return self._next(size)
+
+
 class RMCNthFarthestTest(tf.test.TestCase):
 
   def setUp(self):
@@ -66,5 +88,89 @@ class RMCNthFarthestTest(tf.test.TestCase):
         inputs.shape,
         (self._batch_size, self._num_objects, final_feature_size))
 
+  def test_nth_farthest_batch_matches_per_example(self):
+    """Test the batched generation against the per-example one."""
+    batch_size, num_objects, num_features = 8, 5, 3
+    dataset = dataset_nth_farthest.NthFarthest(
+        batch_size, num_objects, num_features)
+    np.random.seed(0)
+    # pylint: disable=protected-access
+    inputs, labels = dataset._get_batch_data_per_example(
+        batch_size, num_objects, num_features)
+    inputs = np.reshape(inputs, [batch_size, num_objects, -1])
+
+    # Recovers the random draws of each example from its inputs, and replays
+    # them to the batched generation.
+    data, object_ids, reference, nth = np.split(
+        inputs, np.cumsum([num_features, num_objects, num_objects]), axis=-1)
+    permutation = np.argmax(object_ids, axis=-1)
+    batch_range = np.arange(batch_size)[:, np.newaxis]
+    unpermuted_data = np.empty_like(data)
+    unpermuted_data[batch_range, permutation] = data
+    random_state = _ReplayRandomState(
+        unpermuted_data,
+        np.argmax(nth[:, 0], axis=-1),
+        np.argmax(reference[:, 0], axis=-1),
+        np.argsort(permutation, axis=-1).astype(np.float64))
+    batch_inputs, batch_labels = dataset_nth_farthest._nth_farthest_batch(
+        random_state, batch_size, num_objects, num_features)
+    # pylint: enable=protected-access
+
+    self.assertAllEqual(batch_inputs, inputs)
+    self.assertAllEqual(batch_labels, labels)
+
+  def test_nth_farthest_batch_ties(self):
+    """Test the labels when several objects are as far from the reference."""
+    batch_size, num_objects, num_features = 64, 6, 1
+    random_state = np.random.RandomState(0)
+    # Few distinct feature values, so that most examples have ties.
+    data = random_state.randint(
+        -1, 2, size=(batch_size, num_objects, num_features)).astype(np.float64)
+    nth = random_state.randint(0, num_objects, size=batch_size)
+    reference = random_state.randint(0, num_objects, size=batch_size)
+    # pylint: disable=protected-access
+    _, labels = dataset_nth_farthest._nth_farthest_batch(
+        _ReplayRandomState(data, nth, reference,
+                           random_state.uniform(size=(batch_size,
+                                                      num_objects))),
+        batch_size, num_objects, num_features)
+    # pylint: enable=protected-access
+
+    labels = labels.astype(np.int64)
+    for i in range(batch_size):
+      distances = spdistance.squareform(spdistance.pdist(data[i]))
+      # The per-example generation may break ties differently, but must pick
+      # an object as far from the reference.
+      per_example_label = np.argsort(distances)[reference[i], nth[i]]
+      self.assertEqual(distances[reference[i], labels[i]],
+                       distances[reference[i], per_example_label])
+
+  def test_nth_farthest_prefetched_batches(self):
+    """Test the batches generated by worker processes."""
+    batch_size, num_objects, num_features = 4, 5, 3
+    dataset = dataset_nth_farthest.NthFarthest(
+        batch_size, num_objects, num_features, num_workers=2)
+    inputs, labels = dataset.get_batch()
+    np.random.seed(0)
+    try:
+      with self.test_session() as sess:
+        batches = [sess.run([inputs, labels]) for _ in range(3)]
+    finally:
+      dataset.close()
+    self.assertIsNone(dataset._pool)  # pylint: disable=protected-access
+
+    # Each batch is generated from the next seed drawn by the main process.
+    np.random.seed(0)
+    for batch_inputs, batch_labels in batches:
+      seed = np.random.randint(np.iinfo(np.int32).max)
+      # pylint: disable=protected-access
+      expected_inputs, expected_labels = (
+          dataset_nth_farthest._seeded_nth_farthest_batch(
+              (seed, batch_size, num_objects, num_features)))
+      # pylint: enable=protected-access
+      self.assertAllEqual(batch_inputs, expected_inputs)
+      self.assertAllEqual(batch_labels, expected_labels)
+
+
 if __name__ == "__main__":
   tf.test.main()
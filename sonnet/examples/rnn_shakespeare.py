@@ -277,6 +277,16 @@ class TextModel(snt.AbstractModule):
         self._subcores = skips
       self._core = snt.DeepRNN(self._subcores, skip_connections=False,
                                name="deep_lstm")
+      self._sampler = snt.RNNSampler(
+          core=self._core,
+          embed=self._embed_tokens,
+          output=self._output_module,
+          name="sampler")
+
+  def _embed_tokens(self, tokens):
+    """Embeds a batch of character indices, as fed to the core."""
+    char_one_hot = tf.one_hot(tokens, self._output_size, 1.0, 0.0)
+    return tf.nn.relu(self._embed_module(char_one_hot))
 
   def _build(self, one_hot_input_sequence):
     """Builds the deep LSTM model sub-graph.
@@ -334,23 +344,11 @@ class TextModel(snt.AbstractModule):
       output_size]`.
     """
 
-    current_logits = initial_logits
-    current_state = initial_state
-
-    generated_letters = []
-    for _ in range(sequence_length):
-      # Sample a character index from distribution.
-      char_index = tf.squeeze(tf.multinomial(current_logits, 1))
-      char_one_hot = tf.one_hot(char_index, self._output_size, 1.0, 0.0)
-      generated_letters.append(char_one_hot)
-
-      # Feed character back into the deep_lstm.
-      gen_out_seq, current_state = self._core(
-          tf.nn.relu(self._embed_module(char_one_hot)),
-          current_state)
-      current_logits = self._output_module(gen_out_seq)
-
-    generated_string = tf.stack(generated_letters)
+    # Characters are sampled and fed back into the deep_lstm in a while loop.
+    char_indices, _ = self._sampler(initial_logits, initial_state,
+                                    sequence_length)
+    generated_string = tf.one_hot(char_indices, self._output_size, 1.0, 0.0)
+    generated_string.set_shape([sequence_length, None, self._output_size])
 
     return generated_string
 
@@ -19,14 +19,138 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections as py_collections
+
+# Dependency imports
 import sonnet as snt
 import tensorflow.compat.v1 as tf
 
+from tensorflow.python.ops import io_ops  # pylint: disable=g-direct-tensorflow-import
+
+
+def _should_restore(collection, kwargs):
+  """Returns whether the variable requested with `kwargs` is restored."""
+  # Work out what collections this variable will go in.
+  collections = kwargs["collections"]
+  if collections is None:
+    collections = [tf.GraphKeys.GLOBAL_VARIABLES]
+
+  if (kwargs["trainable"]
+      and tf.GraphKeys.TRAINABLE_VARIABLES not in collections):
+    collections += [tf.GraphKeys.TRAINABLE_VARIABLES]
+
+  return collection is None or collection in collections
+
+
+class _BatchedRestore(object):
+  """Custom getter restoring all requested variables with a few RestoreV2 ops.
+
+  See `restore_initializer` with `batched=True`.
+  """
+
+  def __init__(self, filename, name_fn, collection):
+    self._filename = filename
+    self._name_fn = name_fn
+    self._collection = collection
+    # Maps variable (or partition) names to (variable, name in checkpoint,
+    # slice spec). The slice spec is empty for unpartitioned variables.
+    self._restores = py_collections.OrderedDict()
+
+  def __call__(self, getter, name, *args, **kwargs):
+    """Gets variable and records it to be restored by `restore_op`."""
+    restore = _should_restore(self._collection, kwargs)
+    variable = getter(name, *args, **kwargs)
+    if restore:
+      if self._name_fn is not None:
+        var_name_in_checkpoint = self._name_fn(name)
+      else:
+        var_name_in_checkpoint = name
+
+      tf.logging.info("Restoring '%s' from '%s' into variable '%s'",
+                      var_name_in_checkpoint,
+                      self._filename,
+                      name)
+
+      if isinstance(variable, tf.PartitionedVariable):
+        for partition in variable:
+          # pylint: disable=protected-access
+          spec = partition._get_save_slice_info().spec
+          # pylint: enable=protected-access
+          self._restores[partition.name] = (
+              partition, var_name_in_checkpoint, spec)
+      else:
+        self._restores[variable.name] = (variable, var_name_in_checkpoint, "")
+
+    return variable
+
+  @property
+  def variables(self):
+    """Variables (or partitions) restored by `restore_op`, in creation order."""
+    return [variable for variable, _, _ in self._restores.values()]
+
+  def restore_op(self, num_shards=1, name="batched_restore"):
+    """Returns an op restoring all the variables requested so far.
+
+    The values are read with `num_shards` RestoreV2 ops, each reading a
+    contiguous group of the variables, instead of one op per variable.
+
+    Args:
+      num_shards: Number of RestoreV2 ops to read the checkpoint with.
+      name: Name of the returned op.
+
+    Returns:
+      An op assigning the values in the checkpoint to the variables.
+
+    Raises:
+      ValueError: If `num_shards` is not positive.
+    """
+    if num_shards < 1:
+      raise ValueError("num_shards must be positive, got {}.".format(
+          num_shards))
+
+    restores = list(self._restores.values())
+    num_shards = min(num_shards, max(len(restores), 1))
+    shard_size = -(-len(restores) // num_shards)
+    assign_ops = []
+    with tf.name_scope(name):
+      for start in range(0, len(restores), shard_size):
+        shard = restores[start:start + shard_size]
+        with tf.device("/cpu:0"):
+          tensors = io_ops.restore_v2(
+              self._filename,
+              [tensor_name for _, tensor_name, _ in shard],
+              [spec for _, _, spec in shard],
+              [variable.dtype.base_dtype for variable, _, _ in shard])
+        for (variable, _, _), tensor in zip(shard, tensors):
+          tensor.set_shape(variable.shape)
+          assign_ops.append(variable.assign(tensor, read_value=False))
+      return tf.group(*assign_ops, name="restore")
+
 
 def restore_initializer(filename, name_fn=None,
-                        collection=tf.GraphKeys.GLOBAL_VARIABLES):
+                        collection=tf.GraphKeys.GLOBAL_VARIABLES,
+                        batched=False):
   """Custom getter to restore all variables with `snt.restore_initializer`.
 
+  By default every variable gets its own `snt.restore_initializer`, which reads
+  its value with a separate RestoreV2 op. When restoring many variables this is
+  much slower than reading them all at once, as each op opens and seeks the
+  checkpoint independently. With `batched=True` the variables keep their
+  initializers and the returned getter records them instead, and its
+  `restore_op` method returns an op reading them with one (or a few sharded)
+  RestoreV2 ops, to be run after the variables have been initialized:
+
+  ```python
+  custom_getter = snt.custom_getters.restore_initializer(
+      filename=checkpoint_path, batched=True)
+  with tf.variable_scope("", custom_getter=custom_getter):
+    outputs = model(inputs)
+  restore_op = custom_getter.restore_op()
+
+  sess.run(tf.global_variables_initializer())
+  sess.run(restore_op)
+  ```
+
   Args:
     filename: The filename of the checkpoint.
     name_fn: A function which can map the name of the variable requested. This
@@ -35,25 +159,21 @@ def restore_initializer(filename, name_fn=None,
     collection: Only set the restore initializer for variables in this
       collection. If `None`, it will attempt to restore all variables. By
       default `tf.GraphKeys.GLOBAL_VARIABLES`.
+    batched: If `True`, restore the variables with a single op returned by the
+      getter's `restore_op` method instead of their initializers.
 
   Returns:
     A restore_initializer custom getter, which is a function taking arguments
-    (getter, name, *args, **kwargs).
+    (getter, name, *args, **kwargs). If `batched` is `True` it also has the
+    `restore_op` method and `variables` property.
   """
+  if batched:
+    return _BatchedRestore(filename, name_fn, collection)
 
   def _restore_initializer(getter, name, *args, **kwargs):
     """Gets variable with restore initializer."""
 
-    # Work out what collections this variable will go in.
-    collections = kwargs["collections"]
-    if collections is None:
-      collections = [tf.GraphKeys.GLOBAL_VARIABLES]
-
-    if (kwargs["trainable"]
-        and tf.GraphKeys.TRAINABLE_VARIABLES not in collections):
-      collections += [tf.GraphKeys.TRAINABLE_VARIABLES]
-
-    if collection is None or collection in collections:
+    if _should_restore(collection, kwargs):
       # We don't make use of the 'scope' argument for restore_initializer as we
       # might want to change the name in more complex ways, such as removing the
       # scope prefix as well.
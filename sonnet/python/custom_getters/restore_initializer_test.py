@@ -21,12 +21,13 @@ from __future__ import print_function
 import os
 
 # Dependency imports
+from absl.testing import parameterized
 import numpy as np
 import sonnet as snt
 import tensorflow.compat.v1 as tf
 
 
-class RestoreInitializerTest(tf.test.TestCase):
+class RestoreInitializerTest(parameterized.TestCase, tf.test.TestCase):
 
   def _save_test_checkpoint(self):
 
@@ -127,6 +128,86 @@ class RestoreInitializerTest(tf.test.TestCase):
     self.assertFalse(np.allclose(expected_values["w"], w_value))
     # b is initialized to zero always.
 
+  @parameterized.parameters(1, 2, 5)
+  def testBatched(self, num_shards):
+    checkpoint_path, expected_values = self._save_test_checkpoint()
+    checkpoint_path = tf.train.latest_checkpoint(checkpoint_path)
+
+    def name_fn(name):
+      return name.replace("linear2", "linear1")
+
+    g = tf.Graph()
+    with g.as_default():
+      custom_getter = snt.custom_getters.restore_initializer(
+          filename=checkpoint_path,
+          name_fn=name_fn,
+          batched=True)
+
+      with tf.variable_scope("", custom_getter=custom_getter):
+        inputs = tf.placeholder(tf.float32, [10, 10])
+        lin1 = snt.Linear(10, name="linear2")
+        lin1(inputs)
+        # Connecting again does not restore the variables twice.
+        lin1(inputs)
+
+      self.assertEqual(custom_getter.variables, [lin1.w, lin1.b])
+      restore_op = custom_getter.restore_op(num_shards=num_shards)
+      num_restore_ops = len([op for op in g.get_operations()
+                             if op.type == "RestoreV2"])
+      self.assertEqual(num_restore_ops, min(num_shards, 2))
+      init = tf.global_variables_initializer()
+
+    with self.test_session(graph=g) as sess:
+      sess.run(init)
+      sess.run(restore_op)
+      w_value, b_value = sess.run([lin1.w, lin1.b])
+
+    self.assertAllClose(expected_values["w"], w_value)
+    self.assertAllClose(expected_values["b"], b_value)
+
+  def testBatchedPartitioned(self):
+    checkpoint_path, expected_values = self._save_test_checkpoint()
+    checkpoint_path = tf.train.latest_checkpoint(checkpoint_path)
+
+    g = tf.Graph()
+    with g.as_default():
+      custom_getter = snt.custom_getters.restore_initializer(
+          filename=checkpoint_path, batched=True)
+
+      with tf.variable_scope("", custom_getter=custom_getter):
+        inputs = tf.placeholder(tf.float32, [10, 10])
+        lin1 = snt.Linear(
+            10, name="linear1",
+            partitioners={"w": tf.fixed_size_partitioner(num_shards=2)})
+        lin1(inputs)
+
+      self.assertLen(custom_getter.variables, 3)
+      restore_op = custom_getter.restore_op()
+      init = tf.global_variables_initializer()
+
+    with self.test_session(graph=g) as sess:
+      sess.run(init)
+      sess.run(restore_op)
+      w_value, b_value = sess.run([tf.concat(list(lin1.w), axis=0), lin1.b])
+
+    self.assertAllClose(expected_values["w"], w_value)
+    self.assertAllClose(expected_values["b"], b_value)
+
+  def testBatchedCollections(self):
+    g = tf.Graph()
+    with g.as_default():
+      custom_getter = snt.custom_getters.restore_initializer(
+          filename="unused", collection="blah", batched=True)
+
+      with tf.variable_scope("", custom_getter=custom_getter):
+        inputs = tf.placeholder(tf.float32, [10, 10])
+        lin1 = snt.Linear(10, name="linear1")
+        lin1(inputs)
+
+      self.assertEmpty(custom_getter.variables)
+      with self.assertRaisesRegexp(ValueError, "num_shards must be positive"):
+        custom_getter.restore_op(num_shards=0)
+
 
 if __name__ == "__main__":
   tf.test.main()
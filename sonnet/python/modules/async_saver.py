@@ -0,0 +1,317 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Saver writing sharded checkpoints asynchronously from a host snapshot."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import threading
+import time
+import uuid
+
+# Dependency imports
+from absl import logging
+import six
+import tensorflow.compat.v1 as tf
+
+from tensorflow.python.ops import io_ops  # pylint: disable=g-direct-tensorflow-import
+from tensorflow.python.training.saving import saveable_object_util  # pylint: disable=g-direct-tensorflow-import
+
+
+# `tf.train.Saver` arguments which only affect how checkpoints are written, and
+# which the `AsyncSaver` does not support.
+_UNSUPPORTED_SAVER_KWARGS = ("sharded", "pad_step_number",
+                             "save_relative_paths", "write_version")
+
+
+def _assign_to_shards(sizes, num_shards):
+  """Greedily assigns items to shards, balancing the total size per shard.
+
+  Args:
+    sizes: List of the sizes of the items.
+    num_shards: Number of shards.
+
+  Returns:
+    A list of `num_shards` lists of item indices, some of which may be empty.
+  """
+  shards = [[] for _ in range(num_shards)]
+  shard_sizes = [0] * num_shards
+  for index in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+    shard = shard_sizes.index(min(shard_sizes))
+    shards[shard].append(index)
+    shard_sizes[shard] += sizes[index]
+  return shards
+
+
+class AsyncSaver(object):
+  """Saves checkpoints in the background, from a snapshot in host memory.
+
+  `save` fetches the values of all variables to host memory in a single
+  `session.run` and returns immediately. The checkpoint is then written in
+  background threads, one per shard, and the shards are merged into a regular
+  V2 checkpoint which can be restored with `restore` or a `tf.train.Saver`
+  built over the same `var_list`. Training steps can be run while the
+  checkpoint is being written:
+
+  ```python
+  saver = snt.get_saver(model, asynchronous=True, num_shards=8)
+  for step in range(num_steps):
+    sess.run(train_op)
+    if step % 1000 == 0:
+      saver.save(sess, "/tmp/model.ckpt", global_step=step)
+  saver.close()
+  ```
+
+  At most one checkpoint is written at a time: `save` waits for the previous
+  checkpoint to be written before taking a new snapshot, so at most one
+  snapshot is held in host memory.
+
+  Like `tf.train.Saver`, the saver keeps at most `max_to_keep` recent
+  checkpoints, deleting older ones once a new checkpoint has been written.
+
+  The saver owns a session used for writing, which is released by `close`. The
+  saver can also be used as a context manager, which closes it on exit.
+  """
+
+  def __init__(self, var_list, num_shards=4, max_to_keep=5,
+               keep_checkpoint_every_n_hours=10000.0, **kwargs):
+    """Constructs an `AsyncSaver`.
+
+    Args:
+      var_list: Dictionary mapping names to variables (or lists of variables for
+        partitioned variables), or a list of variables, as accepted by
+        `tf.train.Saver`.
+      num_shards: Maximum number of shards to write in parallel.
+      max_to_keep: Maximum number of recent checkpoints to keep, as in
+        `tf.train.Saver`. If `None` or 0, all checkpoints are kept.
+      keep_checkpoint_every_n_hours: Additionally keeps one checkpoint every
+        this many hours, as in `tf.train.Saver`.
+      **kwargs: Extra keyword arguments to pass to the `tf.train.Saver` used
+        for restoring.
+
+    Raises:
+      ValueError: If `num_shards` is not positive, or if `kwargs` contains an
+        argument only affecting how `tf.train.Saver` writes checkpoints.
+    """
+    if num_shards < 1:
+      raise ValueError("num_shards must be positive, got {}.".format(
+          num_shards))
+    unsupported = sorted(set(kwargs) & set(_UNSUPPORTED_SAVER_KWARGS))
+    if unsupported:
+      raise ValueError("AsyncSaver does not support the arguments {}.".format(
+          ", ".join(unsupported)))
+
+    self._restore_saver = tf.train.Saver(var_list=var_list, **kwargs)
+
+    saveables = saveable_object_util.validate_and_slice_inputs(var_list)
+    specs = [spec for saveable in saveables for spec in saveable.specs]
+    self._tensors = [spec.tensor for spec in specs]
+    self._names = [spec.name for spec in specs]
+    self._slices = [spec.slice_spec for spec in specs]
+    sizes = [(tensor.shape.num_elements() or 1) * tensor.dtype.size
+             for tensor in self._tensors]
+    self._shards = [shard for shard in _assign_to_shards(
+        sizes, min(num_shards, max(len(specs), 1))) if shard]
+    self._build_write_graph()
+
+    self._max_to_keep = max_to_keep
+    self._keep_checkpoint_every_n_hours = keep_checkpoint_every_n_hours
+    self._next_checkpoint_time = (
+        time.time() + keep_checkpoint_every_n_hours * 3600)
+
+    self._write_thread = None
+    self._write_error = None
+    # List of (checkpoint prefix, time written) of the checkpoints kept.
+    self._checkpoints = []
+
+  def _build_write_graph(self):
+    """Builds the graph writing host snapshots to a checkpoint."""
+    self._write_graph = tf.Graph()
+    with self._write_graph.as_default(), tf.device("/cpu:0"):
+      self._value_placeholders = [
+          tf.placeholder(tensor.dtype.base_dtype) for tensor in self._tensors]
+      self._shard_prefix_placeholders = []
+      self._shard_save_ops = []
+      for shard in self._shards:
+        prefix = tf.placeholder(tf.string, shape=[])
+        self._shard_prefix_placeholders.append(prefix)
+        self._shard_save_ops.append(io_ops.save_v2(
+            prefix,
+            [self._names[i] for i in shard],
+            [self._slices[i] for i in shard],
+            [self._value_placeholders[i] for i in shard]))
+      self._merge_prefix_placeholder = tf.placeholder(tf.string, shape=[])
+      self._merge_op = io_ops.merge_v2_checkpoints(
+          self._shard_prefix_placeholders,
+          self._merge_prefix_placeholder,
+          delete_old_dirs=True)
+    self._write_graph.finalize()
+    self._write_session = tf.Session(graph=self._write_graph)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  @property
+  def last_checkpoints(self):
+    """List of the checkpoints written by this saver which were not deleted."""
+    return [save_path for save_path, _ in self._checkpoints]
+
+  @property
+  def pending(self):
+    """Whether a checkpoint is currently being written."""
+    return self._write_thread is not None and self._write_thread.is_alive()
+
+  def save(self, sess, save_path, global_step=None, write_state=True):
+    """Snapshots the variables and starts writing them to a checkpoint.
+
+    Args:
+      sess: A `tf.Session` to fetch the variable values with.
+      save_path: Prefix of the checkpoint filenames.
+      global_step: If provided, the global step number (or a tensor or variable
+        holding it) appended to `save_path`.
+      write_state: Whether to update the checkpoint state file once the
+        checkpoint has been written, see `tf.train.latest_checkpoint`.
+
+    Returns:
+      The prefix of the checkpoint being written. It can only be restored once
+      the write completed, see `wait`.
+
+    Raises:
+      RuntimeError: If the saver has been closed.
+      Exception: Any error raised while writing the previous checkpoint.
+    """
+    if self._write_session is None:
+      raise RuntimeError("Cannot save with a closed AsyncSaver.")
+    self.wait()
+
+    if global_step is not None:
+      if not isinstance(global_step, six.integer_types):
+        global_step = sess.run(global_step)
+      save_path = "{}-{:d}".format(save_path, int(global_step))
+
+    values = sess.run(self._tensors)
+    self._write_thread = threading.Thread(
+        target=self._write, args=(values, save_path, write_state))
+    self._write_thread.daemon = True
+    self._write_thread.start()
+    return save_path
+
+  def _write(self, values, save_path, write_state):
+    """Writes `values` to a checkpoint with prefix `save_path`."""
+    try:
+      temp_prefix = "{}_temp_{}/part".format(save_path, uuid.uuid4().hex)
+      shard_prefixes = [
+          "{}-{:05d}-of-{:05d}".format(temp_prefix, i, len(self._shards))
+          for i in range(len(self._shards))]
+
+      # `Session.run` releases the GIL, so the shards are written in parallel.
+      shard_errors = []
+      def write_shard(shard_index):
+        shard = self._shards[shard_index]
+        feed_dict = {self._value_placeholders[i]: values[i] for i in shard}
+        feed_dict[self._shard_prefix_placeholders[shard_index]] = (
+            shard_prefixes[shard_index])
+        try:
+          self._write_session.run(self._shard_save_ops[shard_index],
+                                  feed_dict=feed_dict)
+        except Exception as e:  # pylint: disable=broad-except
+          shard_errors.append(e)
+      shard_threads = [threading.Thread(target=write_shard, args=(i,))
+                       for i in range(len(self._shards))]
+      for thread in shard_threads:
+        thread.start()
+      for thread in shard_threads:
+        thread.join()
+      if shard_errors:
+        raise shard_errors[0]
+
+      feed_dict = dict(zip(self._shard_prefix_placeholders, shard_prefixes))
+      feed_dict[self._merge_prefix_placeholder] = save_path
+      self._write_session.run(self._merge_op, feed_dict=feed_dict)
+      self._record_checkpoint(save_path)
+      if write_state:
+        tf.train.update_checkpoint_state(
+            os.path.dirname(save_path),
+            model_checkpoint_path=save_path,
+            all_model_checkpoint_paths=self.last_checkpoints)
+    except Exception as e:  # pylint: disable=broad-except
+      logging.error("Failed to write checkpoint %s: %s", save_path, e)
+      self._write_error = e
+
+  def _record_checkpoint(self, save_path):
+    """Records a written checkpoint and deletes the ones no longer kept."""
+    self._checkpoints = [
+        checkpoint for checkpoint in self._checkpoints
+        if checkpoint[0] != save_path]
+    self._checkpoints.append((save_path, time.time()))
+    if not self._max_to_keep:
+      return
+    while len(self._checkpoints) > self._max_to_keep:
+      old_path, old_time = self._checkpoints.pop(0)
+      # Same policy as `tf.train.Saver`: keep one checkpoint every
+      # `keep_checkpoint_every_n_hours`, delete the others.
+      if old_time > self._next_checkpoint_time:
+        self._next_checkpoint_time += (
+            self._keep_checkpoint_every_n_hours * 3600)
+      else:
+        tf.train.remove_checkpoint(old_path)
+
+  def wait(self):
+    """Blocks until the checkpoint being written, if any, has been written.
+
+    Raises:
+      Exception: Any error raised while writing the checkpoint.
+    """
+    if self._write_thread is not None:
+      self._write_thread.join()
+      self._write_thread = None
+    if self._write_error is not None:
+      error, self._write_error = self._write_error, None
+      raise error
+
+  def close(self):
+    """Waits for the checkpoint being written, then closes the write session.
+
+    Closing a saver which is already closed has no effect.
+
+    Raises:
+      Exception: Any error raised while writing the checkpoint. The write
+        session is closed regardless.
+    """
+    if self._write_session is None:
+      return
+    try:
+      self.wait()
+    finally:
+      self._write_session.close()
+      self._write_session = None
+
+  def restore(self, sess, save_path):
+    """Restores the variables from a checkpoint.
+
+    Waits for any checkpoint being written first.
+
+    Args:
+      sess: A `tf.Session` to run the restore ops with.
+      save_path: Prefix of the checkpoint to restore.
+    """
+    self.wait()
+    self._restore_saver.restore(sess, save_path)
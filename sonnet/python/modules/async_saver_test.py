@@ -0,0 +1,197 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for sonnet.python.modules.async_saver."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import tempfile
+
+# Dependency imports
+from absl.testing import parameterized
+import numpy as np
+import sonnet as snt
+from sonnet.python.modules import async_saver
+import tensorflow.compat.v1 as tf
+
+
+class AssignToShardsTest(parameterized.TestCase):
+
+  def testBalanced(self):
+    shards = async_saver._assign_to_shards([5, 1, 4, 2, 3, 3], num_shards=3)
+    self.assertLen(shards, 3)
+    self.assertCountEqual([i for shard in shards for i in shard], range(6))
+    sizes = [5, 1, 4, 2, 3, 3]
+    self.assertEqual([sum(sizes[i] for i in shard) for shard in shards],
+                     [6, 6, 6])
+
+  def testMoreShardsThanItems(self):
+    shards = async_saver._assign_to_shards([1, 2], num_shards=4)
+    self.assertEqual(sorted(len(shard) for shard in shards), [0, 0, 1, 1])
+
+
+class AsyncSaverTest(parameterized.TestCase, tf.test.TestCase):
+
+  def _create_variables(self):
+    with tf.variable_scope("model"):
+      a = tf.get_variable("a", initializer=np.arange(12.).reshape([3, 4]))
+      b = tf.get_variable("b", initializer=np.arange(5, dtype=np.int32))
+      c = tf.get_variable(
+          "c", shape=[8, 2],
+          partitioner=tf.fixed_size_partitioner(num_shards=4))
+    return {"a": a, "b": b, "c": list(c)}
+
+  @parameterized.parameters(1, 2, 3, 10)
+  def testSaveRestore(self, num_shards):
+    path = os.path.join(tempfile.mkdtemp(), "ckpt")
+    with self.test_session() as sess:
+      var_list = self._create_variables()
+      saver = async_saver.AsyncSaver(var_list, num_shards=num_shards)
+      sess.run(tf.global_variables_initializer())
+      expected = sess.run(var_list)
+      self.assertEqual(saver.save(sess, path), path)
+      saver.wait()
+      self.assertFalse(saver.pending)
+
+      sess.run([v.initializer for _, v in snt.variable_map_items(var_list)])
+      saver.restore(sess, path)
+      for name, values in sess.run(var_list).items():
+        self.assertAllClose(values, expected[name])
+
+    # The checkpoint can be read with a regular saver.
+    with tf.Graph().as_default():
+      var_list = self._create_variables()
+      with tf.Session() as sess:
+        tf.train.Saver(var_list).restore(sess, path)
+        self.assertAllClose(sess.run(var_list["a"]), expected["a"])
+
+  def testSnapshotIsTakenOnSave(self):
+    path = os.path.join(tempfile.mkdtemp(), "ckpt")
+    with self.test_session() as sess:
+      var_list = self._create_variables()
+      saver = async_saver.AsyncSaver(var_list)
+      sess.run(tf.global_variables_initializer())
+      saver.save(sess, path)
+      # Modifying the variable while the checkpoint is written has no effect.
+      sess.run(var_list["b"].assign_add(tf.ones([5], tf.int32)))
+      saver.wait()
+      saver.restore(sess, path)
+      self.assertAllEqual(sess.run(var_list["b"]), np.arange(5))
+
+  def testGlobalStepAndCheckpointState(self):
+    save_dir = tempfile.mkdtemp()
+    path = os.path.join(save_dir, "ckpt")
+    with self.test_session() as sess:
+      var_list = self._create_variables()
+      global_step = tf.train.get_or_create_global_step()
+      saver = async_saver.AsyncSaver(var_list)
+      sess.run(tf.global_variables_initializer())
+      self.assertEqual(saver.save(sess, path, global_step=3), path + "-3")
+      sess.run(global_step.assign(7))
+      self.assertEqual(saver.save(sess, path, global_step=global_step),
+                       path + "-7")
+      saver.wait()
+      self.assertEqual(saver.last_checkpoints, [path + "-3", path + "-7"])
+      self.assertEqual(tf.train.latest_checkpoint(save_dir), path + "-7")
+
+  def testMaxToKeep(self):
+    save_dir = tempfile.mkdtemp()
+    path = os.path.join(save_dir, "ckpt")
+    with self.test_session() as sess:
+      var_list = self._create_variables()
+      saver = async_saver.AsyncSaver(var_list, max_to_keep=2)
+      sess.run(tf.global_variables_initializer())
+      for step in range(4):
+        saver.save(sess, path, global_step=step)
+      saver.wait()
+      self.assertEqual(saver.last_checkpoints, [path + "-2", path + "-3"])
+      for step in range(4):
+        self.assertEqual(tf.train.checkpoint_exists(path + "-%d" % step),
+                         step >= 2)
+      self.assertEqual(
+          tf.train.get_checkpoint_state(save_dir).all_model_checkpoint_paths,
+          [path + "-2", path + "-3"])
+
+  def testFailedWriteNotRecorded(self):
+    save_dir = tempfile.mkdtemp()
+    path = os.path.join(save_dir, "ckpt")
+    with self.test_session() as sess:
+      var_list = self._create_variables()
+      saver = async_saver.AsyncSaver(var_list)
+      sess.run(tf.global_variables_initializer())
+      saver.save(sess, os.path.join(save_dir, "missing", "ckpt"))
+      with self.assertRaises(tf.errors.OpError):
+        saver.wait()
+      saver.save(sess, path)
+      saver.wait()
+      self.assertEqual(saver.last_checkpoints, [path])
+      self.assertEqual(
+          tf.train.get_checkpoint_state(save_dir).all_model_checkpoint_paths,
+          [path])
+
+  def testWriteErrorRaisedOnWait(self):
+    path = os.path.join(tempfile.mkdtemp(), "missing", "dir", "ckpt")
+    with self.test_session() as sess:
+      var_list = self._create_variables()
+      saver = async_saver.AsyncSaver(var_list)
+      sess.run(tf.global_variables_initializer())
+      saver.save(sess, path)
+      with self.assertRaises(tf.errors.OpError):
+        saver.wait()
+      # The error is only raised once.
+      saver.wait()
+
+  def testClose(self):
+    path = os.path.join(tempfile.mkdtemp(), "ckpt")
+    with self.test_session() as sess:
+      var_list = self._create_variables()
+      sess.run(tf.global_variables_initializer())
+      with async_saver.AsyncSaver(var_list) as saver:
+        write_session = saver._write_session
+        saver.save(sess, path)
+      # Exiting the context waited for the checkpoint and closed the session.
+      self.assertFalse(saver.pending)
+      self.assertTrue(write_session._closed)
+      saver.restore(sess, path)
+      with self.assertRaisesRegexp(RuntimeError, "closed AsyncSaver"):
+        saver.save(sess, path)
+      saver.close()
+
+  def testCloseAfterWriteError(self):
+    path = os.path.join(tempfile.mkdtemp(), "missing", "dir", "ckpt")
+    with self.test_session() as sess:
+      var_list = self._create_variables()
+      saver = async_saver.AsyncSaver(var_list)
+      write_session = saver._write_session
+      sess.run(tf.global_variables_initializer())
+      saver.save(sess, path)
+      with self.assertRaises(tf.errors.OpError):
+        saver.close()
+      self.assertTrue(write_session._closed)
+
+  def testUnsupportedSaverArguments(self):
+    with self.assertRaisesRegexp(ValueError, "does not support.*sharded"):
+      async_saver.AsyncSaver(self._create_variables(), sharded=True)
+
+  def testInvalidNumShards(self):
+    with self.assertRaisesRegexp(ValueError, "num_shards must be positive"):
+      async_saver.AsyncSaver(self._create_variables(), num_shards=0)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -30,6 +30,7 @@ import contextlib
 import inspect
 import threading
 import types
+import weakref
 
 # Dependency imports
 import contextlib2
@@ -50,10 +51,13 @@ from sonnet.python.modules.base_errors import NotSupportedError
 from sonnet.python.modules.base_errors import NotInitializedError
 from sonnet.python.modules.base_errors import DifferentGraphError
 from sonnet.python.modules.base_errors import ModuleInfoError
+from tensorflow.contrib import framework as contrib_framework
 from tensorflow.contrib.eager.python import tfe as contrib_eager
 # pylint: enable=g-bad-import-order
 # pylint: enable=unused-import
 
+nest = contrib_framework.nest
+
 
 _LOCAL_STACKS = threading.local()
 
@@ -68,6 +72,95 @@ def _get_or_create_stack(name):
 
 get_module_stack = lambda: _get_or_create_stack("modules")
 get_connection_stack = lambda: _get_or_create_stack("connections")
+get_connection_start_stack = lambda: _get_or_create_stack("connection_starts")
+get_subgraph_tracking_stack = lambda: _get_or_create_stack("subgraph_tracking")
+
+
+# Policies for keeping track of connected subgraphs. Alternatively, a positive
+# integer N can be used as policy to only keep the N most recent subgraphs.
+SUBGRAPH_TRACKING_FULL = "full"
+SUBGRAPH_TRACKING_NONE = "none"
+
+
+def _check_subgraph_tracking(policy):
+  """Raises a `ValueError` if `policy` is not a valid tracking policy."""
+  if policy in (SUBGRAPH_TRACKING_FULL, SUBGRAPH_TRACKING_NONE):
+    return
+  if (isinstance(policy, six.integer_types) and
+      not isinstance(policy, bool) and policy > 0):
+    return
+  raise ValueError(
+      "Invalid connected subgraph tracking policy {!r}, must be '{}', '{}' "
+      "or a positive integer.".format(
+          policy, SUBGRAPH_TRACKING_FULL, SUBGRAPH_TRACKING_NONE))
+
+
+# Cache of `__call__` functions with the signature of a given `_build` function,
+# such that they are created once per module class rather than per instance.
+# Values must not reference their key, otherwise entries are never collected.
+_CALL_WITH_BUILD_SIGNATURE_CACHE = weakref.WeakKeyDictionary()
+
+
+def _make_empty_cell():
+  value = None
+  return (lambda: value).__closure__[0]
+
+
+def _copy_signature_only(fn):
+  """Returns a function with the signature of `fn` which does not reference it.
+
+  The copy shares the code and defaults of `fn` but has its own globals and
+  closure cells, so it does not keep alive `fn` or, through the `__class__`
+  cell of methods calling `super()`, its class. It must not be called.
+
+  Args:
+    fn: Python function.
+
+  Returns:
+    A function with the same signature and docstring as `fn`.
+  """
+  closure = None
+  if fn.__closure__:
+    closure = tuple(_make_empty_cell() for _ in fn.__closure__)
+  copy = types.FunctionType(fn.__code__, {}, fn.__name__, fn.__defaults__,
+                            closure)
+  if six.PY3:
+    copy.__kwdefaults__ = fn.__kwdefaults__
+    copy.__annotations__ = fn.__annotations__
+  copy.__doc__ = fn.__doc__
+  return copy
+
+
+def _get_call_with_build_signature(build_fn):
+  """Returns a `__call__` function with the signature and doc of `build_fn`.
+
+  Args:
+    build_fn: Unbound `_build` function of a module.
+
+  Returns:
+    A function which forwards to `AbstractModule.__call__` and can be bound to
+    a module instance.
+  """
+  cacheable = inspect.isfunction(build_fn)
+  if cacheable:
+    call_fn = _CALL_WITH_BUILD_SIGNATURE_CACHE.get(build_fn)
+    if call_fn is not None:
+      return call_fn
+    adapter = _copy_signature_only(build_fn)
+  else:
+    adapter = build_fn
+
+  @wrapt.decorator(adapter=adapter)
+  def copy_signature(method, unused_instance, args, kwargs):
+    return method(*args, **kwargs)
+  @copy_signature
+  def __call__(instance, *args, **kwargs):  # pylint: disable=invalid-name
+    return AbstractModule.__call__(instance, *args, **kwargs)
+  __call__.__doc__ = build_fn.__doc__
+
+  if cacheable:
+    _CALL_WITH_BUILD_SIGNATURE_CACHE[build_fn] = __call__
+  return __call__
 
 
 @contextlib.contextmanager
@@ -102,6 +195,194 @@ def observe_connections(observer):
     connection_stack.pop()
 
 
+@contextlib.contextmanager
+def observe_connection_starts(observer):
+  """Notifies the observer whenever any Sonnet module starts being connected.
+
+  This is the counterpart of `observe_connections`: the observer is called with
+  the module instance before its `_build` method runs, so the two together
+  bracket the construction of each connected subgraph. Nested modules start
+  after (and finish before) the modules containing them.
+
+  Args:
+    observer: Callable accepting a single argument. Will be called with the
+    `AbstractModule` instance about to be connected to the graph.
+
+  Yields:
+    None: just yields control to the inner context.
+  """
+  connection_start_stack = get_connection_start_stack()
+  connection_start_stack.append(observer)
+  try:
+    yield
+  finally:
+    connection_start_stack.pop()
+
+
+@contextlib.contextmanager
+def connected_subgraph_tracking(policy):
+  """Sets how connected subgraphs are tracked for modules connected inside.
+
+  Every time a module is connected in graph mode, a `ConnectedSubGraph` holding
+  references to all of its inputs and outputs is stored on the module and
+  exported with the module info in the `MetaGraphDef`. When a module is
+  connected many times, e.g. an RNN core unrolled over thousands of steps, this
+  may add significant graph construction time and memory. For example:
+
+  ```python
+  with snt.connected_subgraph_tracking(1):
+    # Only the last connection of `core` is kept.
+    output_sequence, final_state = unroll(core, input_sequence)
+
+  with snt.connected_subgraph_tracking(snt.SUBGRAPH_TRACKING_NONE):
+    # No connections are kept.
+    output_sequence, final_state = unroll(core, input_sequence)
+  ```
+
+  Connection observers (see `observe_connections`) are always notified,
+  regardless of the policy. A policy set on a module using
+  `AbstractModule.set_connected_subgraph_tracking` takes precedence over this
+  context.
+
+  Args:
+    policy: `SUBGRAPH_TRACKING_FULL` to keep all connected subgraphs (the
+      default), `SUBGRAPH_TRACKING_NONE` to keep none of them, or a positive
+      integer `N` to keep only the `N` most recent ones.
+
+  Yields:
+    None: just yields control to the inner context.
+
+  Raises:
+    ValueError: If `policy` is not a valid tracking policy.
+  """
+  _check_subgraph_tracking(policy)
+  subgraph_tracking_stack = get_subgraph_tracking_stack()
+  subgraph_tracking_stack.append(policy)
+  try:
+    yield
+  finally:
+    subgraph_tracking_stack.pop()
+
+
+DefunStats = collections.namedtuple(
+    "DefunStats", ("num_traces", "num_hits", "num_evictions"))
+
+
+def _shape_key(shape):
+  """Returns a hashable representation of a `tf.TensorShape`."""
+  return None if shape.ndims is None else tuple(shape.as_list())
+
+
+class _SignatureKeyedDefun(object):
+  """Wraps a function in graph functions keyed by input signature.
+
+  Each distinct input signature (the structure of the arguments, the shapes and
+  dtypes of the `tf.Tensor`s and the values of all other arguments) gets its own
+  traced graph function, kept in a bounded least recently used cache.
+
+  After `relax_shapes_after` signatures differing only in tensor shapes have
+  been traced, the next trace uses the most specific shapes compatible with all
+  of them (dimensions which differed become `None`). The relaxed function is
+  then used for all calls with compatible shapes, instead of retracing.
+  """
+
+  def __init__(self, function, max_cached_functions, relax_shapes_after):
+    self._function = function
+    self._max_cached_functions = max_cached_functions
+    self._relax_shapes_after = relax_shapes_after
+    self._functions = collections.OrderedDict()
+    # Per structure key, the number of traces and the most specific shapes
+    # compatible with all traced shapes.
+    self._num_structure_traces = collections.defaultdict(int)
+    self._structure_shapes = {}
+    self._relaxed_shapes = {}
+    self._num_traces = 0
+    self._num_hits = 0
+    self._num_evictions = 0
+
+  @property
+  def stats(self):
+    return DefunStats(num_traces=self._num_traces,
+                      num_hits=self._num_hits,
+                      num_evictions=self._num_evictions)
+
+  def _make_flat_function(self, structure, flat_inputs):
+    """Returns a function taking only the tensor inputs as positional args."""
+    is_tensor = [isinstance(x, tf.Tensor) for x in flat_inputs]
+    # Don't keep references to the tensors of the call which triggered tracing.
+    static_inputs = [None if tensor else x
+                     for tensor, x in zip(is_tensor, flat_inputs)]
+
+    def flat_function(*tensors):
+      tensors = iter(tensors)
+      inputs = [next(tensors) if tensor else x
+                for tensor, x in zip(is_tensor, static_inputs)]
+      args, kwargs = nest.pack_sequence_as(structure, inputs)
+      return self._function(*args, **kwargs)
+
+    return flat_function
+
+  def _trace(self, key, structure, flat_inputs, tensors, shapes):
+    """Creates a graph function for `shapes`, adding it to the cache."""
+    input_signature = [tf.TensorSpec(shape, tensor.dtype)
+                       for shape, tensor in zip(shapes, tensors)]
+    function = contrib_eager.defun(
+        self._make_flat_function(structure, flat_inputs),
+        input_signature=input_signature)
+    self._functions[key] = function
+    self._num_traces += 1
+    if (self._max_cached_functions is not None and
+        len(self._functions) > self._max_cached_functions):
+      self._functions.popitem(last=False)
+      self._num_evictions += 1
+    return function
+
+  def __call__(self, *args, **kwargs):
+    flat_inputs = nest.flatten((args, kwargs))
+    structure = nest.map_structure(lambda _: None, (args, kwargs))
+    tensors = [x for x in flat_inputs if isinstance(x, tf.Tensor)]
+    shapes = [tensor.shape for tensor in tensors]
+    try:
+      structure_key = (
+          str(structure),
+          tuple((x.dtype, x.shape.ndims) if isinstance(x, tf.Tensor) else x
+                for x in flat_inputs))
+      hash(structure_key)
+    except TypeError:
+      raise TypeError(
+          "Non-tensor arguments of a defun-wrapped module must be hashable.")
+    key = (structure_key, tuple(_shape_key(shape) for shape in shapes))
+
+    function = self._functions.get(key)
+    if function is None:
+      relaxed_shapes = self._relaxed_shapes.get(structure_key)
+      if relaxed_shapes is not None and all(
+          relaxed.is_compatible_with(shape)
+          for relaxed, shape in zip(relaxed_shapes, shapes)):
+        key = (structure_key,
+               tuple(_shape_key(shape) for shape in relaxed_shapes))
+        function = self._functions.get(key)
+
+    if function is not None:
+      self._functions[key] = self._functions.pop(key)  # Most recently used.
+      self._num_hits += 1
+    else:
+      previous_shapes = self._structure_shapes.get(structure_key, shapes)
+      compatible_shapes = [
+          previous.most_specific_compatible_shape(shape)
+          for previous, shape in zip(previous_shapes, shapes)]
+      self._structure_shapes[structure_key] = compatible_shapes
+      self._num_structure_traces[structure_key] += 1
+      if (self._relax_shapes_after is not None and
+          self._num_structure_traces[structure_key] > self._relax_shapes_after):
+        shapes = compatible_shapes
+        self._relaxed_shapes[structure_key] = shapes
+        key = (structure_key, tuple(_shape_key(shape) for shape in shapes))
+      function = self._trace(key, structure, flat_inputs, tensors, shapes)
+
+    return function(*tensors)
+
+
 @six.add_metaclass(abc.ABCMeta)
 class AbstractModule(object):
   """Superclass for Sonnet Modules.
@@ -163,6 +444,7 @@ class AbstractModule(object):
 
     self._is_connected = False
     self._connected_subgraphs = []
+    self._subgraph_tracking = None
 
     # If the given custom getter is a dictionary with a per-variable custom
     # getter, wrap it into a single custom getter.
@@ -184,20 +466,15 @@ class AbstractModule(object):
     self._original_name = name
     self._unique_name = self._template.variable_scope.name.split("/")[-1]
 
-    # Copy signature of _build to __call__.
+    # Copy signature of _build to __call__. The adapted function is shared by
+    # all instances with the same _build, only binding it is per instance.
     adapter_fn = getattr(self._build, "__func__", self._build)
-    @wrapt.decorator(adapter=adapter_fn)
-    def copy_signature(method, unused_instance, args, kwargs):
-      return method(*args, **kwargs)
-    @copy_signature
-    def __call__(instance, *args, **kwargs):  # pylint: disable=invalid-name
-      return AbstractModule.__call__(instance, *args, **kwargs)
+    __call__ = _get_call_with_build_signature(adapter_fn)  # pylint: disable=invalid-name
     # use __dict__ instead of setting directly to avoid a Callable pytype error
     self.__dict__["__call__"] = types.MethodType(__call__, self)
 
-    # Update __call__ and the object docstrings to enable better introspection.
+    # Update the object docstring to enable better introspection.
     self.__doc__ = self._build.__doc__
-    self.__call__.__func__.__doc__ = self._build.__doc__
 
     # Keep track of which graph this module has been connected to. Sonnet
     # modules cannot be connected to multiple graphs, as transparent variable
@@ -206,6 +483,11 @@ class AbstractModule(object):
 
     # Container for all variables created in this module and its sub-modules.
     self._all_variables = set([])
+    # The variables in `self._all_variables` in the order they were added, and
+    # for each module this module has been connected inside of, the number of
+    # them which have already been added to that module.
+    self._ordered_variables = []
+    self._num_variables_propagated = weakref.WeakKeyDictionary()
 
     # Calling `.defun()` causes the module's call method to become wrapped as
     # a graph function.
@@ -315,8 +597,10 @@ class AbstractModule(object):
     of the call stack will be added to `self._all_variables`.
 
     Before exiting the context the module removes itself from the top of the
-    call stack, and adds all of the variables in `self._all_variables` to its
-    parent module (the new top) of the call stack.
+    call stack, and adds the variables in `self._all_variables` to its parent
+    module (the new top) of the call stack. Only variables which have not been
+    added to that parent before are propagated, so connecting deeply nested
+    modules repeatedly does not re-merge all of their variables at every level.
 
     Yields:
       Nothing, the yield just transfers focus back to the inner context.
@@ -336,12 +620,20 @@ class AbstractModule(object):
           stack.enter_context(template_store.as_default())
 
         stack.enter_context(
-            util.notify_about_new_variables(self._all_variables.add))
+            util.notify_about_new_variables(self._add_variable))
 
         yield
 
         if self._original_name:
-          self._all_variables.update(self._template.variables)
+          if template_store is not None:
+            self._add_variables(self._template.variables)
+          else:
+            # Equivalent to `self._template.variables`, but uses the scope index
+            # of the collections rather than scanning them.
+            for collection in (tf.GraphKeys.GLOBAL_VARIABLES,
+                               tf.GraphKeys.LOCAL_VARIABLES):
+              self._add_variables(util.get_variables_in_scope(
+                  self._template.variable_scope, collection=collection))
 
     finally:
       # Remove `self` from `module_stack`, this happens as part of cleanup
@@ -351,12 +643,30 @@ class AbstractModule(object):
     if module_stack:
       # Peek into the stack to add created variables to the parent
       parent_module = module_stack[-1]
-      parent_module._all_variables.update(self._all_variables)  # pylint: disable=protected-access
+      num_propagated = self._num_variables_propagated.get(parent_module, 0)
+      parent_module._add_variables(self._ordered_variables[num_propagated:])  # pylint: disable=protected-access
+      self._num_variables_propagated[parent_module] = len(
+          self._ordered_variables)
+
+  def _add_variable(self, variable):
+    """Adds `variable` to `self._all_variables`, if not already present."""
+    if variable not in self._all_variables:
+      self._all_variables.add(variable)
+      self._ordered_variables.append(variable)
+
+  def _add_variables(self, variables):
+    """Adds all of `variables` to `self._all_variables`."""
+    for variable in variables:
+      self._add_variable(variable)
 
   def _add_connected_subgraph(self, call_method, outputs, subgraph_name_scope,
                               inputs_args, inputs_kwargs):
     """Adds a newly connected subgraph.
 
+    Depending on the connected subgraph tracking policy, the subgraph may not be
+    stored (or older subgraphs may be discarded). Connection observers are
+    always notified.
+
     Args:
       call_method: the function used to connect this Sonnet module to the graph.
       outputs: `call_method` outputs.
@@ -364,6 +674,14 @@ class AbstractModule(object):
       inputs_args: `self._build` inputs `*args`.
       inputs_kwargs: `self._build` inputs `*kwargs`.
     """
+    policy = self.connected_subgraph_tracking
+    observers = get_connection_stack()
+    if policy == SUBGRAPH_TRACKING_NONE:
+      del self._connected_subgraphs[:]
+      if not observers:
+        # Skip the (costly) introspection of the call arguments.
+        return
+
     build_inputs = inspect.getcallargs(call_method,
                                        *inputs_args, **inputs_kwargs)
 
@@ -378,21 +696,102 @@ class AbstractModule(object):
         module=self, name_scope=subgraph_name_scope,
         inputs=build_inputs,
         outputs=outputs)
-    self._connected_subgraphs.append(connected_subgraph)
+    if policy != SUBGRAPH_TRACKING_NONE:
+      self._connected_subgraphs.append(connected_subgraph)
+      if policy != SUBGRAPH_TRACKING_FULL:
+        # Trim in place, `self._module_info` refers to the same list.
+        del self._connected_subgraphs[:-policy]
 
-    for observer in get_connection_stack():
+    for observer in observers:
       observer(connected_subgraph)
 
+  @property
+  def connected_subgraph_tracking(self):
+    """Returns the policy used to track connected subgraphs of this module.
+
+    This is the policy set with `set_connected_subgraph_tracking` if any,
+    otherwise the one of the innermost `snt.connected_subgraph_tracking`
+    context, or `SUBGRAPH_TRACKING_FULL` by default.
+    """
+    if self._subgraph_tracking is not None:
+      return self._subgraph_tracking
+    subgraph_tracking_stack = get_subgraph_tracking_stack()
+    if subgraph_tracking_stack:
+      return subgraph_tracking_stack[-1]
+    return SUBGRAPH_TRACKING_FULL
+
+  def set_connected_subgraph_tracking(self, policy):
+    """Sets the policy used to track connected subgraphs of this module.
+
+    See `snt.connected_subgraph_tracking` for details.
+
+    Args:
+      policy: `SUBGRAPH_TRACKING_FULL`, `SUBGRAPH_TRACKING_NONE`, a positive
+        integer `N` to keep only the `N` most recent subgraphs, or `None` to
+        defer to the enclosing `snt.connected_subgraph_tracking` context.
+
+    Raises:
+      ValueError: If `policy` is not a valid tracking policy.
+    """
+    if policy is not None:
+      _check_subgraph_tracking(policy)
+    self._subgraph_tracking = policy
+
   @property
   def defun_wrapped(self):
     """Returns boolean indicating whether this module is defun wrapped."""
     return self._defun_wrapped
 
-  def defun(self):
-    """Wraps this modules call method in a callable graph function."""
+  @property
+  def defun_stats(self):
+    """Returns the `DefunStats` of this module's graph function cache.
+
+    Returns:
+      A `DefunStats` with the number of traces, cache hits and evictions, or
+      `None` if the module is not wrapped using the signature keyed cache (see
+      `defun`).
+    """
+    if isinstance(self._call, _SignatureKeyedDefun):
+      return self._call.stats
+    return None
+
+  def defun(self, max_cached_functions=None, relax_shapes_after=None):
+    """Wraps this modules call method in a callable graph function.
+
+    By default the call method is wrapped using `defun`, which retraces the
+    module for every new input signature. If either argument is given, traced
+    functions are instead kept in a cache keyed by input signature, with
+    statistics available from `defun_stats`. Calling this method again once the
+    module is wrapped has no effect.
+
+    Args:
+      max_cached_functions: If not `None`, the maximum number of traced graph
+        functions to keep. The least recently used function is evicted when the
+        limit is exceeded.
+      relax_shapes_after: If not `None`, the number of traces with the same
+        arguments but different tensor shapes after which the module is traced
+        with relaxed shapes, where dimensions which changed are `None`.
+
+    Raises:
+      ValueError: If `max_cached_functions` is not positive or
+        `relax_shapes_after` is negative.
+    """
+    if max_cached_functions is not None and max_cached_functions < 1:
+      raise ValueError("max_cached_functions must be positive, got {}.".format(
+          max_cached_functions))
+    if relax_shapes_after is not None and relax_shapes_after < 0:
+      raise ValueError(
+          "relax_shapes_after must be non-negative, got {}.".format(
+              relax_shapes_after))
     if not self._defun_wrapped:
       self._defun_wrapped = True
-      self._call = contrib_eager.defun(self._call)
+      if max_cached_functions is None and relax_shapes_after is None:
+        self._call = contrib_eager.defun(self._call)
+      else:
+        self._call = _SignatureKeyedDefun(
+            self._call,
+            max_cached_functions=max_cached_functions,
+            relax_shapes_after=relax_shapes_after)
 
   def __call__(self, *args, **kwargs):
     return self._call(*args, **kwargs)
@@ -416,6 +815,9 @@ class AbstractModule(object):
     """
     self._check_init_called()
     self._check_same_graph()
+    if not tf.executing_eagerly():
+      for observer in get_connection_start_stack():
+        observer(self)
     with self._capture_variables():
       outputs, subgraph_name_scope = self._template(*args, **kwargs)
     self._is_connected = True
@@ -429,7 +831,11 @@ class AbstractModule(object):
 
   @property
   def name_scopes(self):
-    """Returns a tuple of all name_scopes generated by this module."""
+    """Returns a tuple of all name_scopes generated by this module.
+
+    Only name scopes of tracked connected subgraphs are returned, see
+    `snt.connected_subgraph_tracking`.
+    """
     if tf.executing_eagerly():
       raise NotSupportedError(
           "The name_scopes property is not supported in eager mode.")
@@ -478,7 +884,7 @@ class AbstractModule(object):
 
   @property
   def connected_subgraphs(self):
-    """Returns the subgraphs created by this module so far."""
+    """Returns the tracked subgraphs created by this module so far."""
     if tf.executing_eagerly():
       raise NotSupportedError(
           "Connected sub-graphs are not tracked in eager mode.")
@@ -493,11 +899,16 @@ class AbstractModule(object):
 
     Raises:
       NotConnectedError: If the module is not connected to the Graph.
+      NotSupportedError: If connected subgraphs are not tracked.
     """
     if tf.executing_eagerly():
       raise NotSupportedError(
           "Connected sub-graphs are not tracked in eager mode.")
     self._ensure_is_connected()
+    if not self._connected_subgraphs:
+      raise NotSupportedError(
+          "Connected sub-graphs of {} are not tracked, see "
+          "`snt.connected_subgraph_tracking`.".format(self.scope_name))
     return self._connected_subgraphs[-1]
 
   @classmethod
@@ -0,0 +1,167 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Benchmarks for graph construction with sonnet.python.modules.base.
+
+Run with `python base_benchmark.py --benchmarks=.`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+# Dependency imports
+import sonnet as snt
+import tensorflow.compat.v1 as tf
+
+
+_NUM_UNROLL_STEPS = 1000
+_BATCH_SIZE = 8
+_HIDDEN_SIZE = 32
+_NUM_CONSTRUCTIONS = 1000
+_NESTING_DEPTH = 50
+_NUM_NESTED_CONNECTIONS = 1000
+
+
+class ConnectedSubgraphTrackingBenchmark(tf.test.Benchmark):
+  """Build time and meta graph size of a long unroll per tracking policy."""
+
+  def _benchmark_unroll(self, policy, name):
+    with tf.Graph().as_default():
+      core = snt.LSTM(hidden_size=_HIDDEN_SIZE)
+      inputs = tf.zeros([_BATCH_SIZE, _HIDDEN_SIZE])
+      start_time = time.time()
+      with snt.connected_subgraph_tracking(policy):
+        state = core.initial_state(_BATCH_SIZE)
+        for _ in range(_NUM_UNROLL_STEPS):
+          _, state = core(inputs, state)
+      build_time = time.time() - start_time
+      meta_graph_bytes = tf.train.export_meta_graph().ByteSize()
+
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=build_time,
+        extras={"num_steps": _NUM_UNROLL_STEPS,
+                "meta_graph_bytes": meta_graph_bytes})
+
+  def benchmark_unroll_tracking_full(self):
+    self._benchmark_unroll(snt.SUBGRAPH_TRACKING_FULL,
+                           "unroll_tracking_full")
+
+  def benchmark_unroll_tracking_last_1(self):
+    self._benchmark_unroll(1, "unroll_tracking_last_1")
+
+  def benchmark_unroll_tracking_none(self):
+    self._benchmark_unroll(snt.SUBGRAPH_TRACKING_NONE,
+                           "unroll_tracking_none")
+
+
+class ModuleConstructionBenchmark(tf.test.Benchmark):
+  """Time taken to construct (not connect) instances of core modules."""
+
+  def _benchmark_construction(self, constructor, name):
+    with tf.Graph().as_default():
+      start_time = time.time()
+      for _ in range(_NUM_CONSTRUCTIONS):
+        constructor()
+      construction_time = time.time() - start_time
+
+    self.report_benchmark(
+        name=name,
+        iters=_NUM_CONSTRUCTIONS,
+        wall_time=construction_time / _NUM_CONSTRUCTIONS,
+        extras={"instances_per_second":
+                    _NUM_CONSTRUCTIONS / construction_time})
+
+  def benchmark_construct_linear(self):
+    self._benchmark_construction(
+        lambda: snt.Linear(output_size=_HIDDEN_SIZE), "construct_linear")
+
+  def benchmark_construct_batch_apply_linear(self):
+    self._benchmark_construction(
+        lambda: snt.BatchApply(snt.Linear(output_size=_HIDDEN_SIZE)),
+        "construct_batch_apply_linear")
+
+  def benchmark_construct_batch_reshape(self):
+    self._benchmark_construction(
+        lambda: snt.BatchReshape(shape=[-1, _HIDDEN_SIZE]),
+        "construct_batch_reshape")
+
+  def benchmark_construct_layer_norm(self):
+    self._benchmark_construction(snt.LayerNorm, "construct_layer_norm")
+
+  def benchmark_construct_conv_2d(self):
+    self._benchmark_construction(
+        lambda: snt.Conv2D(output_channels=_HIDDEN_SIZE, kernel_shape=3),
+        "construct_conv_2d")
+
+  def benchmark_construct_lstm(self):
+    self._benchmark_construction(
+        lambda: snt.LSTM(hidden_size=_HIDDEN_SIZE), "construct_lstm")
+
+  def benchmark_construct_gru(self):
+    self._benchmark_construction(
+        lambda: snt.GRU(hidden_size=_HIDDEN_SIZE), "construct_gru")
+
+  def benchmark_construct_mlp(self):
+    self._benchmark_construction(
+        lambda: snt.nets.MLP(output_sizes=[_HIDDEN_SIZE] * 3),
+        "construct_mlp")
+
+  def benchmark_construct_sequential(self):
+    self._benchmark_construction(
+        lambda: snt.Sequential([tf.nn.relu, tf.nn.tanh]),
+        "construct_sequential")
+
+
+class _NestedModule(snt.AbstractModule):
+  """Adds a bias to the output of an optional inner module."""
+
+  def __init__(self, depth, name="nested_module"):
+    super(_NestedModule, self).__init__(name=name)
+    with self._enter_variable_scope():
+      self._inner = _NestedModule(depth - 1) if depth > 1 else None
+
+  def _build(self, inputs):
+    if self._inner is not None:
+      inputs = self._inner(inputs)
+    bias = tf.get_variable("b", shape=inputs.shape[-1:], dtype=inputs.dtype)
+    return inputs + bias
+
+
+class NestedConnectionBenchmark(tf.test.Benchmark):
+  """Build time of a deeply nested module connected many times."""
+
+  def benchmark_nested_connections(self):
+    with tf.Graph().as_default():
+      module = _NestedModule(_NESTING_DEPTH)
+      inputs = tf.zeros([_BATCH_SIZE, _HIDDEN_SIZE])
+      start_time = time.time()
+      for _ in range(_NUM_NESTED_CONNECTIONS):
+        module(inputs)
+      build_time = time.time() - start_time
+
+    self.report_benchmark(
+        name="nested_connections",
+        iters=_NUM_NESTED_CONNECTIONS,
+        wall_time=build_time / _NUM_NESTED_CONNECTIONS,
+        extras={"depth": _NESTING_DEPTH, "total_build_time": build_time})
+
+
+if __name__ == "__main__":
+  tf.test.main()
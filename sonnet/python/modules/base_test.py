@@ -20,14 +20,17 @@ from __future__ import division
 from __future__ import print_function
 
 import functools
+import gc
 import inspect
 import pickle
+import weakref
 
 # Dependency imports
 from absl.testing import parameterized
 import numpy as np
 import six
 from sonnet.python.modules import base
+from sonnet.python.modules import base_info
 from sonnet.python.modules.base_errors import NotSupportedError
 import tensorflow.compat.v1 as tf
 from tensorflow.contrib.eager.python import tfe as contrib_eager
@@ -531,6 +534,22 @@ class AbstractModuleTest(parameterized.TestCase, tf.test.TestCase):
     for v1, v2 in zip(inner1.variables, inner2.variables):
       self.assertIs(v1, v2)
 
+  def testVariablesPropagatedToEachParent(self):
+    inner = SimpleModule(name="inner")
+    inputs = tf.zeros([10, 10])
+    inner(inputs)  # pylint: disable=not-callable
+    # pylint: disable=not-callable
+    outer_a = base.Module(lambda x: inner(x), name="outer_a")
+    outer_b = base.Module(lambda x: inner(inner(x)), name="outer_b")
+    # pylint: enable=not-callable
+    for _ in range(2):
+      outer_a(inputs)
+      outer_b(inputs)
+
+    self.assertLen(inner.variables, 2)
+    self.assertEqual(outer_a.variables, inner.variables)
+    self.assertEqual(outer_b.variables, inner.variables)
+
   def testCallSignatureAndDocstring(self):
     my_module = SimpleModule()
     self.assertEqual(
@@ -538,6 +557,37 @@ class AbstractModuleTest(parameterized.TestCase, tf.test.TestCase):
         inspect.getargspec(my_module._build))
     self.assertEqual(my_module.__call__.__doc__, my_module._build.__doc__)
 
+  def testCallSignatureSharedPerClass(self):
+    module_a = SimpleModule(name="a")
+    module_b = SimpleModule(name="b")
+    identity = IdentityModule()
+    self.assertIs(module_a.__call__.__func__, module_b.__call__.__func__)
+    self.assertIsNot(module_a.__call__.__func__, identity.__call__.__func__)
+    self.assertIs(module_a.__call__.__self__, module_a)
+    self.assertIs(module_b.__call__.__self__, module_b)
+    self.assertEqual(
+        inspect.getargspec(identity.__call__),
+        inspect.getargspec(identity._build))
+    self.assertEqual(identity.__call__.__doc__, identity._build.__doc__)
+
+  def testCallSignatureCacheEntryCollected(self):
+
+    class LocalModule(base.AbstractModule):
+
+      def _build(self, inputs, scale=2.0):
+        return inputs * scale
+
+    build_fn = six.get_unbound_function(LocalModule._build)
+    call_fn = base._get_call_with_build_signature(build_fn)
+    self.assertEqual(inspect.getargspec(call_fn), inspect.getargspec(build_fn))
+    self.assertIn(build_fn, base._CALL_WITH_BUILD_SIGNATURE_CACHE)
+    cache_size = len(base._CALL_WITH_BUILD_SIGNATURE_CACHE)
+    class_ref = weakref.ref(LocalModule)
+    del call_fn, build_fn, LocalModule
+    gc.collect()
+    self.assertIsNone(class_ref())
+    self.assertLen(base._CALL_WITH_BUILD_SIGNATURE_CACHE, cache_size - 1)
+
 
 def _make_model_with_params(inputs, output_size):
   weight_shape = [inputs.get_shape().as_list()[-1], output_size]
@@ -694,6 +744,107 @@ class ConnectionObserverTest(tf.test.TestCase):
     self.assertIs(complex_module, self._connected_subgraphs[2].module)
     self.assertIs(self._connected_subgraphs[2].outputs, outputs)
 
+  def testObservesConnectionStarts(self):
+    complex_module = ComplexModule()
+    events = []
+    with base.observe_connection_starts(
+        lambda module: events.append(("start", module))):
+      with base.observe_connections(
+          lambda subgraph: events.append(("end", subgraph.module))):
+        complex_module(self._inputs)
+
+    self.assertEqual([event for event, _ in events],
+                     ["start", "start", "end", "start", "end", "end"])
+    self.assertIs(events[0][1], complex_module)
+    self.assertIs(events[-1][1], complex_module)
+
+
+class ConnectedSubgraphTrackingTest(parameterized.TestCase, tf.test.TestCase):
+
+  def setUp(self):
+    super(ConnectedSubgraphTrackingTest, self).setUp()
+    self._inputs = tf.zeros(shape=(10, 10), dtype=tf.float32)
+
+  def _module_info_subgraphs(self, module):
+    module_infos = tf.get_collection(base_info.SONNET_COLLECTION_NAME)
+    module_info, = [info for info in module_infos
+                    if info.scope_name == module.scope_name]
+    return module_info.connected_subgraphs
+
+  def testDefaultIsFull(self):
+    module = IdentityModule()
+    self.assertEqual(module.connected_subgraph_tracking,
+                     base.SUBGRAPH_TRACKING_FULL)
+    for _ in range(5):
+      module(self._inputs)
+    self.assertLen(module.connected_subgraphs, 5)
+
+  def testTrackNone(self):
+    module = IdentityModule()
+    with base.connected_subgraph_tracking(base.SUBGRAPH_TRACKING_NONE):
+      for _ in range(5):
+        module(self._inputs)
+    self.assertTrue(module.is_connected)
+    self.assertEmpty(module.connected_subgraphs)
+    self.assertEmpty(module.name_scopes)
+    self.assertEmpty(self._module_info_subgraphs(module))
+    with self.assertRaisesRegexp(NotSupportedError, "not tracked"):
+      module.last_connected_subgraph  # pylint: disable=pointless-statement
+
+  def testTrackLastN(self):
+    module = IdentityModule()
+    outputs = []
+    with base.connected_subgraph_tracking(2):
+      for _ in range(5):
+        outputs.append(module(self._inputs))
+    self.assertEqual(
+        [subgraph.outputs for subgraph in module.connected_subgraphs],
+        outputs[-2:])
+    self.assertIs(module.last_connected_subgraph.outputs, outputs[-1])
+    self.assertLen(self._module_info_subgraphs(module), 2)
+
+  def testModulePolicyOverridesContext(self):
+    module = IdentityModule()
+    module.set_connected_subgraph_tracking(1)
+    with base.connected_subgraph_tracking(base.SUBGRAPH_TRACKING_NONE):
+      self.assertEqual(module.connected_subgraph_tracking, 1)
+      module(self._inputs)
+      module(self._inputs)
+    self.assertLen(module.connected_subgraphs, 1)
+
+    module.set_connected_subgraph_tracking(None)
+    with base.connected_subgraph_tracking(3):
+      self.assertEqual(module.connected_subgraph_tracking, 3)
+    self.assertEqual(module.connected_subgraph_tracking,
+                     base.SUBGRAPH_TRACKING_FULL)
+
+  def testNestedContexts(self):
+    module = IdentityModule()
+    with base.connected_subgraph_tracking(base.SUBGRAPH_TRACKING_NONE):
+      with base.connected_subgraph_tracking(base.SUBGRAPH_TRACKING_FULL):
+        module(self._inputs)
+      module(self._inputs)
+    self.assertEmpty(module.connected_subgraphs)
+
+  @parameterized.parameters(base.SUBGRAPH_TRACKING_NONE, 1)
+  def testObserversStillNotified(self, policy):
+    module = SimpleModule()
+    observed = []
+    with base.connected_subgraph_tracking(policy):
+      with base.observe_connections(observed.append):
+        outputs = module(self._inputs)
+    self.assertLen(observed, 1)
+    self.assertIs(observed[0].outputs, outputs)
+    self.assertIs(observed[0].inputs["inputs"], self._inputs)
+
+  @parameterized.parameters("last", 0, -1, 1.5, True)
+  def testInvalidPolicy(self, policy):
+    with self.assertRaisesRegexp(ValueError, "Invalid connected subgraph"):
+      with base.connected_subgraph_tracking(policy):
+        pass
+    with self.assertRaisesRegexp(ValueError, "Invalid connected subgraph"):
+      IdentityModule().set_connected_subgraph_tracking(policy)
+
 
 class MatMulModule(base.AbstractModule):
 
@@ -739,6 +890,77 @@ class DefunTest(tf.test.TestCase):
       self.assertListEqual(output.shape.as_list(), [batch_size, 32])
     self.assertEqual(module.call_count, 2)
 
+  def testDefunStatsNotAvailableWithoutCache(self):
+    module = MatMulModule()
+    self.assertIsNone(module.defun_stats)
+    module.defun()
+    self.assertIsNone(module.defun_stats)
+
+  def testDefunCacheHits(self):
+    module = MatMulModule()
+    module.defun(max_cached_functions=2)
+    for _ in range(3):
+      output = module(tf.zeros([10, 1]))
+      self.assertListEqual(output.shape.as_list(), [10, 32])
+    self.assertEqual(module.call_count, 1)
+    self.assertEqual(module.defun_stats,
+                     base.DefunStats(num_traces=1, num_hits=2,
+                                     num_evictions=0))
+
+  def testDefunCacheEviction(self):
+    module = MatMulModule()
+    module.defun(max_cached_functions=2)
+    for batch_size in (1, 2, 3, 1):
+      output = module(tf.zeros([batch_size, 1]))
+      self.assertListEqual(output.shape.as_list(), [batch_size, 32])
+    self.assertEqual(module.call_count, 4)
+    self.assertEqual(module.defun_stats,
+                     base.DefunStats(num_traces=4, num_hits=0,
+                                     num_evictions=2))
+
+    # Batch size 3 is still cached, using it makes 1 the least recently used.
+    module(tf.zeros([3, 1]))
+    module(tf.zeros([2, 1]))
+    module(tf.zeros([3, 1]))
+    self.assertEqual(module.defun_stats,
+                     base.DefunStats(num_traces=5, num_hits=2,
+                                     num_evictions=3))
+
+  def testDefunCacheRelaxShapes(self):
+    module = MatMulModule()
+    module.defun(relax_shapes_after=1)
+    for batch_size in (1, 2, 3, 4):
+      output = module(tf.zeros([batch_size, 1]))
+      self.assertAllEqual(self.evaluate(tf.shape(output)), [batch_size, 32])
+    # The second trace is relaxed to a batch size of `None`, which is then
+    # reused for the following batch sizes.
+    self.assertEqual(module.call_count, 2)
+    self.assertEqual(module.defun_stats,
+                     base.DefunStats(num_traces=2, num_hits=2,
+                                     num_evictions=0))
+
+    # A change in rank needs a new trace.
+    module(tf.zeros([2, 1, 1]))
+    self.assertEqual(module.defun_stats.num_traces, 3)
+
+  def testDefunCacheNonTensorArguments(self):
+    module = base.Module(lambda x, scale: x * scale)
+    module.defun(max_cached_functions=4)
+    self.assertAllEqual(self.evaluate(module(tf.ones([2]), scale=2.)), [2, 2])
+    self.assertAllEqual(self.evaluate(module(tf.ones([2]), scale=3.)), [3, 3])
+    self.assertAllEqual(self.evaluate(module(tf.ones([2]), scale=3.)), [3, 3])
+    self.assertEqual(module.defun_stats,
+                     base.DefunStats(num_traces=2, num_hits=1,
+                                     num_evictions=0))
+    with self.assertRaisesRegexp(TypeError, "must be hashable"):
+      module(tf.ones([2]), scale={1.})
+
+  def testDefunCacheInvalidArguments(self):
+    with self.assertRaisesRegexp(ValueError, "max_cached_functions"):
+      MatMulModule().defun(max_cached_functions=0)
+    with self.assertRaisesRegexp(ValueError, "relax_shapes_after"):
+      MatMulModule().defun(relax_shapes_after=-1)
+
   def testGetVariablesDisabledWhenUsingDefun(self):
     module = MatMulModule()
     module.defun()
@@ -370,6 +370,163 @@ class DeepRNN(rnn_core.RNNCore):
     self._last_output_size = _get_shape_without_batch_dimension(output)
     return output, tuple(next_states)
 
+  @util.reuse_variables
+  def unroll(self, inputs_sequence, initial_state, sequence_length=None,
+             parallel_iterations=32, swap_memory=False):
+    """Connects the DeepRNN to the graph for a whole sequence of inputs.
+
+    The layers are unrolled along a wavefront: the recurrent core `k` (with
+    the non recurrent modules preceding it) processes step `t - k` in the same
+    iteration of the `tf.while_loop` as the first core processes step `t`. The
+    cores of an iteration do not depend on each other, so they can run
+    concurrently, while connecting the DeepRNN once per step only lets a core
+    start once the previous core finished the same step. Non recurrent modules
+    following the last recurrent core are applied to all the steps at once
+    after the loop.
+
+    Args:
+      inputs_sequence: a nested tuple of Tensors of size `[time, batch_size,
+        ...]`.
+      initial_state: a tuple of the initial states of the recurrent cores.
+      sequence_length: Optional `[batch_size]` integer tensor of the lengths
+        of the sequences. The state is not updated and the output is zero past
+        the length of each sequence.
+      parallel_iterations: Number of iterations of the loop run in parallel.
+      swap_memory: Whether to swap the loop activations to host memory.
+
+    Returns:
+      A tuple (output_sequence, final_state) where `output_sequence` is a
+      nested tuple of time major Tensors and `final_state` is a tuple of the
+      final states of the recurrent cores.
+
+    Raises:
+      ValueError: if the DeepRNN uses skip connections, or has no recurrent
+        core.
+    """
+    if self._skip_connections:
+      raise ValueError("unroll is not supported with skip connections.")
+    if not self._num_recurrent:
+      raise ValueError("unroll requires at least one recurrent core.")
+
+    # Each stage applies the non recurrent modules preceding a recurrent core,
+    # then the core.
+    stages = []
+    modules = []
+    for is_recurrent, core in zip(self._is_recurrent_list, self._cores):
+      modules.append(core)
+      if is_recurrent:
+        stages.append(modules)
+        modules = []
+    final_modules = modules
+    num_stages = len(stages)
+    last_core = stages[-1][-1]
+
+    flat_inputs = nest.flatten(inputs_sequence)
+    num_steps = tf.shape(flat_inputs[0])[0]
+    batch_size = tf.dimension_value(flat_inputs[0].get_shape()[1])
+    if batch_size is None:
+      batch_size = tf.shape(flat_inputs[0])[1]
+    if sequence_length is not None:
+      sequence_length = tf.cast(sequence_length, tf.int32)
+      loop_steps = tf.minimum(num_steps, tf.reduce_max(sequence_length))
+    else:
+      loop_steps = num_steps
+    num_iterations = loop_steps + num_stages - 1
+
+    initial_state = tuple(initial_state)
+    dtype = nest.flatten(initial_state)[0].dtype
+    # The first stage rereads the last step while the later stages drain the
+    # wavefront.
+    inputs_arrays = nest.map_structure(
+        lambda x: tf.TensorArray(  # pylint: disable=g-long-lambda
+            x.dtype, size=num_steps, element_shape=x.shape[1:],
+            clear_after_read=False).unstack(x),
+        inputs_sequence)
+    # The outputs of each stage but the last one, fed to the next stage at the
+    # next iteration.
+    def zero_outputs(size):
+      shape = tf.concat([[batch_size], tf.TensorShape(size).as_list()], 0)
+      return tf.zeros(shape, dtype=dtype)
+    initial_carries = tuple(
+        nest.map_structure(zero_outputs, stage[-1].output_size)
+        for stage in stages[:-1])
+    static_batch_shape = flat_inputs[0].get_shape()[1:2]
+    outputs_arrays = nest.map_structure(
+        lambda size: tf.TensorArray(  # pylint: disable=g-long-lambda
+            dtype, size=num_iterations,
+            element_shape=static_batch_shape.concatenate(size)),
+        last_core.output_size)
+
+    def valid_step(step):
+      """Returns whether `step` is a step of each sequence of the batch."""
+      valid = tf.logical_and(step >= 0, step < loop_steps)
+      if sequence_length is not None:
+        valid = tf.logical_and(valid, step < sequence_length)
+      else:
+        valid = tf.fill([batch_size], valid)
+      return valid
+
+    def body(iteration, states, carries, outputs_arrays):
+      next_states = []
+      next_carries = []
+      for k, stage in enumerate(stages):
+        if k == 0:
+          read_index = tf.minimum(iteration, num_steps - 1)
+          stage_inputs = nest.map_structure(
+              lambda ta: ta.read(read_index), inputs_arrays)  # pylint: disable=cell-var-from-loop
+        else:
+          stage_inputs = carries[k - 1]
+        for module in stage[:-1]:
+          stage_inputs = module(stage_inputs)
+        output, next_state = stage[-1](stage_inputs, states[k])
+
+        # Stages outside of the wavefront keep their state.
+        valid = valid_step(iteration - k)
+        next_states.append(nest.map_structure(
+            lambda new, old: tf.where(valid, new, old),  # pylint: disable=cell-var-from-loop
+            next_state, states[k]))
+        next_carries.append(output)
+
+      outputs_arrays = nest.map_structure(
+          lambda ta, o: ta.write(iteration, o), outputs_arrays, output)
+      return (iteration + 1, tuple(next_states), tuple(next_carries[:-1]),
+              outputs_arrays)
+
+    _, final_state, _, outputs_arrays = tf.while_loop(
+        cond=lambda iteration, *unused_args: iteration < num_iterations,
+        body=body,
+        loop_vars=(tf.constant(0), initial_state, initial_carries,
+                   outputs_arrays),
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+
+    # The last stage processes step `t` at iteration `t + num_stages - 1`.
+    def stack_outputs(ta):
+      stacked = ta.stack()[num_stages - 1:]
+      padding = [[0, num_steps - loop_steps]] + [[0, 0]] * (
+          stacked.shape.ndims - 1)
+      padded = tf.pad(stacked, padding)
+      padded.set_shape(
+          flat_inputs[0].shape[:1].concatenate(stacked.shape[1:]))
+      return padded
+    output_sequence = nest.map_structure(stack_outputs, outputs_arrays)
+
+    reference = nest.flatten(output_sequence)[0]
+    for module in final_modules:
+      output_sequence = nest.map_structure(
+          lambda x: basic.split_leading_dim(x, reference, 2),
+          module(nest.map_structure(basic.merge_leading_dims, output_sequence)))
+
+    if sequence_length is not None:
+      # `[time, batch_size]` mask of the steps of each sequence.
+      mask = tf.transpose(tf.sequence_mask(sequence_length, num_steps))
+      def apply_mask(output):
+        mask_shape = tf.concat(
+            [tf.shape(mask), tf.ones([output.shape.ndims - 2], tf.int32)], 0)
+        return output * tf.reshape(tf.cast(mask, output.dtype), mask_shape)
+      output_sequence = nest.map_structure(apply_mask, output_sequence)
+    return output_sequence, final_state
+
   def initial_state(self, batch_size, dtype=tf.float32, trainable=False,
                     trainable_initializers=None, trainable_regularizers=None,
                     name=None):
@@ -558,12 +715,21 @@ class BidirectionalRNN(base.AbstractModule):
   backward cores.
   """
 
-  def __init__(self, forward_core, backward_core, name="bidir_rnn"):
+  def __init__(self, forward_core, backward_core, dynamic=False,
+               parallel_iterations=32, swap_memory=False, name="bidir_rnn"):
     """Construct a Bidirectional RNN core.
 
     Args:
       forward_core: callable RNNCore module that computes forward states.
       backward_core: callable RNNCore module that computes backward states.
+      dynamic: whether to unroll the cores in a `tf.while_loop` instead of in
+          Python. The dynamic unroll is also used when the time dimension of
+          the input is not statically known, or when `sequence_length` is
+          passed to `_build`.
+      parallel_iterations: number of iterations of the dynamic unroll run in
+          parallel.
+      swap_memory: whether the dynamic unroll swaps its activations to host
+          memory, to train on long sequences.
       name: name of the module.
 
     Raises:
@@ -572,6 +738,9 @@ class BidirectionalRNN(base.AbstractModule):
     super(BidirectionalRNN, self).__init__(name=name)
     self._forward_core = forward_core
     self._backward_core = backward_core
+    self._dynamic = dynamic
+    self._parallel_iterations = parallel_iterations
+    self._swap_memory = swap_memory
     def _is_recurrent(core):
       has_rnn_core_interface = (hasattr(core, "initial_state") and
                                 hasattr(core, "output_size") and
@@ -581,13 +750,24 @@ class BidirectionalRNN(base.AbstractModule):
       raise ValueError("Forward and backward cores must both be instances of"
                        "RNNCore.")
 
-  def _build(self, input_sequence, state):
+  def _build(self, input_sequence, state, sequence_length=None):
     """Connects the BidirectionalRNN module into the graph.
 
+    The backward outputs and states are in the order they are computed, so
+    step `i` of the backward sequences corresponds to step
+    `sequence_length - 1 - i` of the input.
+
+    When `sequence_length` is given, the backward core only processes the
+    first `sequence_length` steps of each example, and the outputs of the
+    following steps are zeros while their states are the last state of each
+    example in either direction.
+
     Args:
       input_sequence: tensor (time, batch, [feature_1, ..]). It must be
           time_major.
       state: tuple of states for the forward and backward cores.
+      sequence_length: optional (batch,) integer tensor of the length of each
+          example in `input_sequence`.
 
     Returns:
       A dict with forward/backard states and output sequences:
@@ -598,16 +778,14 @@ class BidirectionalRNN(base.AbstractModule):
         "state": {
             "forward": ...,
             "backward": ...}
-
-    Raises:
-      ValueError: in case time dimension is not statically known.
     """
-    input_shape = input_sequence.get_shape()
-    if input_shape[0] is None:
-      raise ValueError("Time dimension of input (dim 0) must be statically"
-                       "known.")
-    seq_length = int(input_shape[0])
     forward_state, backward_state = state
+    if (self._dynamic or sequence_length is not None or
+        tf.dimension_value(input_sequence.get_shape()[0]) is None):
+      return self._build_dynamic(input_sequence, forward_state, backward_state,
+                                 sequence_length)
+
+    seq_length = int(input_sequence.get_shape()[0])
 
     # Lists for the forward backward output and state.
     output_sequence_f = []
@@ -649,6 +827,46 @@ class BidirectionalRNN(base.AbstractModule):
         }
     }
 
+  def _dynamic_unroll(self, core, input_sequence, initial_state,
+                      sequence_length):
+    """Returns the output and state sequences of `core` over the input."""
+    output_sequence, _, state_sequence = rnn_core.dynamic_unroll(
+        core, core.output_size, input_sequence, initial_state,
+        sequence_length=sequence_length,
+        keep_states=True,
+        parallel_iterations=self._parallel_iterations,
+        swap_memory=self._swap_memory)
+    return output_sequence, state_sequence
+
+  def _build_dynamic(self, input_sequence, forward_state, backward_state,
+                     sequence_length):
+    """Unrolls both cores in `tf.while_loop`s, see `_build`."""
+    with tf.name_scope("forward_rnn"):
+      output_sequence_f = self._dynamic_unroll(
+          self._forward_core, input_sequence, forward_state, sequence_length)
+
+    # The two loops are independent, so they can run concurrently.
+    with tf.name_scope("backward_rnn"):
+      if sequence_length is None:
+        reversed_sequence = tf.reverse(input_sequence, axis=[0])
+      else:
+        reversed_sequence = tf.reverse_sequence(
+            input_sequence, sequence_length, seq_axis=0, batch_axis=1)
+      output_sequence_b = self._dynamic_unroll(
+          self._backward_core, reversed_sequence, backward_state,
+          sequence_length)
+
+    return {
+        "outputs": {
+            "forward": output_sequence_f[0],
+            "backward": output_sequence_b[0]
+        },
+        "state": {
+            "forward": output_sequence_f[1],
+            "backward": output_sequence_b[1]
+        }
+    }
+
   def initial_state(self, batch_size, dtype=tf.float32, trainable=False,
                     trainable_initializers=None, trainable_regularizers=None,
                     name=None):
@@ -0,0 +1,84 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Benchmarks for sonnet.python.modules.basic_rnn.
+
+Compares unrolling deep LSTM stacks one step at a time with
+`tf.nn.dynamic_rnn` to the wavefront `snt.DeepRNN.unroll`. Run on CPU with
+`CUDA_VISIBLE_DEVICES= python basic_rnn_benchmark.py --benchmarks=.`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+# Dependency imports
+import sonnet as snt
+import tensorflow.compat.v1 as tf
+
+
+_BATCH_SIZE = 16
+_INPUT_SIZE = 128
+_HIDDEN_SIZE = 256
+_SEQUENCE_LENGTH = 200
+_NUM_LAYERS = (2, 4, 8)
+_NUM_RUNS = 5
+
+
+class DeepRNNUnrollBenchmark(tf.test.Benchmark):
+  """Steps per second of deep LSTM stacks."""
+
+  def _benchmark_unroll(self, name, unroll_fn, num_layers):
+    with tf.Graph().as_default(), tf.device("/cpu:0"):
+      deep_rnn = snt.DeepRNN(
+          [snt.LSTM(_HIDDEN_SIZE) for _ in range(num_layers)],
+          skip_connections=False)
+      inputs = tf.random_normal([_SEQUENCE_LENGTH, _BATCH_SIZE, _INPUT_SIZE])
+      initial_state = deep_rnn.initial_state(_BATCH_SIZE)
+      outputs = unroll_fn(deep_rnn, inputs, initial_state)
+
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        sess.run(outputs)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(outputs)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name="{}_{}_layers".format(name, num_layers),
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={"steps_per_second": _SEQUENCE_LENGTH / run_time})
+
+  def benchmark_deep_lstm_dynamic_rnn(self):
+    def unroll_fn(deep_rnn, inputs, initial_state):
+      return tf.nn.dynamic_rnn(deep_rnn, inputs, initial_state=initial_state,
+                               time_major=True)[0]
+    for num_layers in _NUM_LAYERS:
+      self._benchmark_unroll("deep_lstm_dynamic_rnn", unroll_fn, num_layers)
+
+  def benchmark_deep_lstm_wavefront_unroll(self):
+    def unroll_fn(deep_rnn, inputs, initial_state):
+      return deep_rnn.unroll(inputs, initial_state)[0]
+    for num_layers in _NUM_LAYERS:
+      self._benchmark_unroll("deep_lstm_wavefront_unroll", unroll_fn,
+                             num_layers)
+
+
+if __name__ == "__main__":
+  tf.test.main()
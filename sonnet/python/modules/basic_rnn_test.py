@@ -27,12 +27,16 @@ import mock
 import numpy as np
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import sonnet as snt
+from sonnet.python.modules import rnn_test_utils
 import tensorflow.compat.v1 as tf
+from tensorflow.contrib import framework as contrib_framework
 from tensorflow.contrib import rnn as contrib_rnn
 from tensorflow.contrib.eager.python import tfe as contrib_eager
 
 from tensorflow.python.ops import variables  # pylint: disable=g-direct-tensorflow-import
 
+nest = contrib_framework.nest
+
 
 @contrib_eager.run_all_tests_in_graph_and_eager_modes
 class VanillaRNNTest(tf.test.TestCase):
@@ -241,7 +245,8 @@ class VanillaRNNTest(tf.test.TestCase):
 
 
 @contrib_eager.run_all_tests_in_graph_and_eager_modes
-class DeepRNNTest(tf.test.TestCase, parameterized.TestCase):
+class DeepRNNTest(rnn_test_utils.UnrollTestMixin, tf.test.TestCase,
+                  parameterized.TestCase):
 
   def testShape(self):
     batch_size = 3
@@ -679,6 +684,39 @@ class DeepRNNTest(tf.test.TestCase, parameterized.TestCase):
       self.assertIn("DeepRNN has been connected into the graph, "
                     "so inferred output size", first_call_args[0])
 
+  @parameterized.parameters(
+      (None, False),
+      (None, True),
+      ([7, 3, 0], False),
+      ([7, 3, 0], True))
+  def testUnrollSameAsDynamicRnn(self, lengths, with_non_recurrent):
+    batch_size = 3
+    seq_len = 7
+    input_size = 4
+    if with_non_recurrent:
+      cores = [snt.Linear(5), tf.nn.relu, snt.LSTM(6), snt.VanillaRNN(3),
+               snt.Linear(2), snt.LSTM(4), snt.Linear(8), tf.nn.tanh]
+    else:
+      cores = [snt.LSTM(6), snt.GRU(5), snt.LSTM(4)]
+    deep_rnn = snt.DeepRNN(cores, skip_connections=False)
+    inputs = tf.constant(
+        np.random.randn(seq_len, batch_size, input_size), dtype=tf.float32)
+    sequence_length = None if lengths is None else tf.constant(lengths)
+    self._assert_unroll_matches_dynamic_rnn(
+        deep_rnn, inputs, deep_rnn.initial_state(batch_size),
+        sequence_length=sequence_length)
+
+  def testUnrollSkipConnections(self):
+    deep_rnn = snt.DeepRNN([snt.LSTM(3), snt.LSTM(3)], skip_connections=True)
+    with self.assertRaisesRegexp(ValueError, "skip connections"):
+      deep_rnn.unroll(tf.ones([4, 2, 3]), deep_rnn.initial_state(2))
+
+  def testUnrollNoRecurrentCore(self):
+    deep_rnn = snt.DeepRNN([snt.Linear(3), tf.nn.relu],
+                           skip_connections=False)
+    with self.assertRaisesRegexp(ValueError, "recurrent core"):
+      deep_rnn.unroll(tf.ones([4, 2, 3]), deep_rnn.initial_state(2))
+
 
 @contrib_eager.run_all_tests_in_graph_and_eager_modes
 class ModelRNNTest(tf.test.TestCase):
@@ -795,6 +833,102 @@ class BidirectionalRNNTest(tf.test.TestCase):
     self.assertAllEqual(output["state"]["backward"].hidden.get_shape(),
                         shape_backward)
 
+  def testDynamicMatchesStatic(self):
+    bidir_rnn = snt.BidirectionalRNN(self.forward_core, self.backward_core)
+    dynamic_bidir_rnn = snt.BidirectionalRNN(
+        self.forward_core, self.backward_core, dynamic=True)
+    seq = tf.random_normal(
+        [self.seq_len, self.batch_size, self.feature_size])
+    state = bidir_rnn.initial_state(self.batch_size)
+    static_output = bidir_rnn(seq, state)
+    dynamic_output = dynamic_bidir_rnn(seq, state)
+    nest.assert_same_structure(static_output, dynamic_output)
+    for static_tensor, dynamic_tensor in zip(nest.flatten(static_output),
+                                             nest.flatten(dynamic_output)):
+      self.assertAllEqual(static_tensor.get_shape(),
+                          dynamic_tensor.get_shape())
+
+    self.evaluate(tf.global_variables_initializer())
+    static_values, dynamic_values = self.evaluate(
+        (static_output, dynamic_output))
+    for static_value, dynamic_value in zip(nest.flatten(static_values),
+                                           nest.flatten(dynamic_values)):
+      self.assertAllClose(static_value, dynamic_value, atol=1e-5)
+
+  def testDynamicUnknownTimeDimension(self):
+    if tf.executing_eagerly():
+      self.skipTest("Shapes are always known in eager mode.")
+    bidir_rnn = snt.BidirectionalRNN(self.forward_core, self.backward_core)
+    seq = tf.placeholder(tf.float32,
+                         [None, self.batch_size, self.feature_size])
+    output = bidir_rnn(seq, bidir_rnn.initial_state(self.batch_size))
+    self.assertAllEqual(output["outputs"]["backward"].get_shape().as_list(),
+                        [None, self.batch_size, self.hidden_size_backward])
+
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      backward_output = sess.run(
+          output["outputs"]["backward"],
+          feed_dict={seq: np.zeros(
+              [100, self.batch_size, self.feature_size])})
+    self.assertEqual(backward_output.shape,
+                     (100, self.batch_size, self.hidden_size_backward))
+
+  def testDynamicSequenceLength(self):
+    bidir_rnn = snt.BidirectionalRNN(self.forward_core, self.backward_core)
+    lengths = [8, 3, 1, 5, 0]
+    seq = tf.random_normal(
+        [self.seq_len, self.batch_size, self.feature_size])
+    state = bidir_rnn.initial_state(self.batch_size)
+    output = bidir_rnn(seq, state, sequence_length=tf.constant(lengths))
+
+    # Each example unrolled on its own, up to its length.
+    expected = []
+    for i, length in enumerate(lengths[:-1]):
+      example_state = nest.map_structure(lambda s: s[i:i + 1], state)
+      expected.append(bidir_rnn(
+          seq[:length, i:i + 1],
+          example_state)["outputs"]["backward"][:, 0])
+
+    self.evaluate(tf.global_variables_initializer())
+    output_values, expected_values = self.evaluate((output, expected))
+
+    forward_outputs = output_values["outputs"]["forward"].out_one
+    backward_outputs = output_values["outputs"]["backward"]
+    backward_states = output_values["state"]["backward"]
+    for i, length in enumerate(lengths[:-1]):
+      self.assertAllClose(backward_outputs[:length, i], expected_values[i],
+                          atol=1e-5)
+    for i, length in enumerate(lengths):
+      # Padded steps produce zeros and keep the last state.
+      self.assertAllEqual(forward_outputs[length:, i],
+                          np.zeros_like(forward_outputs[length:, i]))
+      self.assertAllEqual(backward_outputs[length:, i],
+                          np.zeros_like(backward_outputs[length:, i]))
+      if length:
+        for step in range(length, self.seq_len):
+          self.assertAllEqual(backward_states.hidden[step, i],
+                              backward_states.hidden[length - 1, i])
+
+  def testDynamicGraphSizeIndependentOfLength(self):
+    if tf.executing_eagerly():
+      self.skipTest("There is no graph in eager mode.")
+    bidir_rnn = snt.BidirectionalRNN(
+        self.forward_core, self.backward_core, dynamic=True)
+    state = bidir_rnn.initial_state(self.batch_size)
+    bidir_rnn(tf.zeros([1, self.batch_size, self.feature_size]), state)
+
+    def num_ops(seq_len):
+      # Small zero tensors are a single constant, large ones a fill, so the
+      # inputs are created before counting.
+      inputs = tf.zeros([seq_len, self.batch_size, self.feature_size])
+      graph = tf.get_default_graph()
+      num_ops_before = len(graph.get_operations())
+      bidir_rnn(inputs, state)
+      return len(graph.get_operations()) - num_ops_before
+
+    self.assertEqual(num_ops(10), num_ops(10000))
+
 
 if __name__ == "__main__":
   tf.test.main()
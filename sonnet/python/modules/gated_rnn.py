@@ -57,6 +57,39 @@ from tensorflow.contrib import rnn as contrib_rnn
 LSTMState = collections.namedtuple("LSTMState", ("hidden", "cell"))
 
 
+def _reuse_if_created():
+  """Variable scope reusing the variables of the current scope if they exist.
+
+  Used by cores with sequence methods decorated with `util.reuse_variables`,
+  so that the variables are shared with `_build` whichever is connected first.
+
+  Returns:
+    A `tf.variable_scope` context manager.
+  """
+  return tf.variable_scope(tf.get_variable_scope(), reuse=tf.AUTO_REUSE,
+                           auxiliary_name_scope=False)
+
+
+def _check_sequence_rank(inputs_sequence):
+  """Raises a `ValueError` if `inputs_sequence` is not of rank 3."""
+  rank = inputs_sequence.get_shape().ndims
+  if rank != 3:
+    raise ValueError(
+        "Rank of inputs_sequence must be 3 not: {}".format(rank))
+
+
+def _batch_matmul_sequence(inputs_sequence, weights):
+  """Multiplies a `[time, batch_size, size]` sequence with a weight matrix."""
+  input_size = tf.dimension_value(inputs_sequence.get_shape()[2])
+  outputs = tf.matmul(tf.reshape(inputs_sequence, [-1, input_size]), weights)
+  output_shape = tf.concat(
+      [tf.shape(inputs_sequence)[:2], tf.shape(outputs)[1:]], 0)
+  outputs = tf.reshape(outputs, output_shape)
+  outputs.set_shape(
+      inputs_sequence.get_shape()[:2].concatenate(weights.get_shape()[1:]))
+  return outputs
+
+
 class LSTM(rnn_core.RNNCore):
   """LSTM recurrent network cell with optional peepholes & layer normalization.
 
@@ -232,16 +265,7 @@ class LSTM(rnn_core.RNNCore):
         first time, and the inferred size of the inputs does not match previous
         invocations.
     """
-    prev_hidden, prev_cell = prev_state
-
-    # pylint: disable=invalid-unary-operand-type
-    if self._hidden_clip_value is not None:
-      prev_hidden = tf.clip_by_value(
-          prev_hidden, -self._hidden_clip_value, self._hidden_clip_value)
-    if self._cell_clip_value is not None:
-      prev_cell = tf.clip_by_value(
-          prev_cell, -self._cell_clip_value, self._cell_clip_value)
-    # pylint: enable=invalid-unary-operand-type
+    prev_hidden, prev_cell = self._clip_state(prev_state)
 
     self._create_gate_variables(inputs.get_shape(), inputs.dtype)
 
@@ -253,15 +277,96 @@ class LSTM(rnn_core.RNNCore):
     gates = tf.matmul(inputs_and_hidden, self._w_xh)
 
     if self._use_layer_norm:
-      gates = layer_norm.LayerNorm()(gates)
+      with _reuse_if_created():
+        gates = layer_norm.LayerNorm()(gates)
 
     gates += self._b
 
+    if self._use_peepholes:  # diagonal connections
+      self._create_peephole_variables(inputs.dtype)
+
+    return self._next_state(gates, prev_cell)
+
+  @util.reuse_variables
+  def unroll(self, inputs_sequence, initial_state, sequence_length=None,
+             parallel_iterations=32, swap_memory=False):
+    """Connects the LSTM to the graph for a whole sequence of inputs.
+
+    Equivalent to connecting the LSTM once per step, with the same variables,
+    but the input half of the gate weights is applied to all the steps in a
+    single matmul, and only the recurrent half inside the `tf.while_loop`
+    over the steps.
+
+    Args:
+      inputs_sequence: Tensor of size `[time, batch_size, input_size]`.
+      initial_state: Tuple (initial_hidden, initial_cell).
+      sequence_length: Optional `[batch_size]` integer tensor of the lengths
+        of the sequences. The state is not updated and the output is zero past
+        the length of each sequence.
+      parallel_iterations: Number of iterations of the loop run in parallel.
+      swap_memory: Whether to swap the loop activations to host memory.
+
+    Returns:
+      A tuple (output_sequence, final_state) where `output_sequence` is a
+      Tensor of size `[time, batch_size, hidden_size]` (or `projection_size`)
+      and `final_state` is a `LSTMState` namedtuple.
+
+    Raises:
+      ValueError: If the inputs are not of rank 3, or their size does not match
+        previous connections.
+    """
+    _check_sequence_rank(inputs_sequence)
+    input_shape = inputs_sequence.get_shape()
+    dtype = inputs_sequence.dtype
+    self._create_gate_variables(input_shape[1:], dtype)
+    normalize = None
+    if self._use_layer_norm:
+      with _reuse_if_created():
+        normalize = layer_norm.LayerNorm()
+    if self._use_peepholes:
+      self._create_peephole_variables(dtype)
+
+    w_x, w_h = tf.split(
+        tf.convert_to_tensor(self._w_xh),
+        [tf.dimension_value(input_shape[2]), self._hidden_state_size])
+    input_gates = _batch_matmul_sequence(inputs_sequence, w_x)
+    if normalize is None:
+      input_gates += self._b
+
+    def step(input_gates, prev_state):
+      prev_hidden, prev_cell = self._clip_state(prev_state)
+      gates = input_gates + tf.matmul(prev_hidden, w_h)
+      if normalize is not None:
+        gates = normalize(gates) + self._b
+      return self._next_state(gates, prev_cell)
+
+    output_sequence, final_state, _ = rnn_core.dynamic_unroll(
+        step, self.output_size, input_gates, LSTMState(*initial_state),
+        sequence_length=sequence_length,
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+    return output_sequence, final_state
+
+  def _clip_state(self, prev_state):
+    """Clips the previous hidden and cell states if required."""
+    prev_hidden, prev_cell = prev_state
+
+    # pylint: disable=invalid-unary-operand-type
+    if self._hidden_clip_value is not None:
+      prev_hidden = tf.clip_by_value(
+          prev_hidden, -self._hidden_clip_value, self._hidden_clip_value)
+    if self._cell_clip_value is not None:
+      prev_cell = tf.clip_by_value(
+          prev_cell, -self._cell_clip_value, self._cell_clip_value)
+    # pylint: enable=invalid-unary-operand-type
+    return prev_hidden, prev_cell
+
+  def _next_state(self, gates, prev_cell):
+    """Computes the output and next state from the pre-activation gates."""
     # i = input_gate, j = next_input, f = forget_gate, o = output_gate
     i, j, f, o = tf.split(value=gates, num_or_size_splits=4, axis=1)
 
     if self._use_peepholes:  # diagonal connections
-      self._create_peephole_variables(inputs.dtype)
       f += self._w_f_diag * prev_cell
       i += self._w_i_diag * prev_cell
 
@@ -286,54 +391,56 @@ class LSTM(rnn_core.RNNCore):
     equiv_input_size = self._hidden_state_size + input_shape.dims[1].value
     initializer = basic.create_linear_initializer(equiv_input_size)
 
-    self._w_xh = tf.get_variable(
-        self.W_GATES,
-        shape=[equiv_input_size, 4 * self._hidden_size],
-        dtype=dtype,
-        initializer=self._initializers.get(self.W_GATES, initializer),
-        partitioner=self._partitioners.get(self.W_GATES),
-        regularizer=self._regularizers.get(self.W_GATES))
-    self._b = tf.get_variable(
-        self.B_GATES,
-        shape=[4 * self._hidden_size],
-        dtype=dtype,
-        initializer=self._initializers.get(self.B_GATES, initializer),
-        partitioner=self._partitioners.get(self.B_GATES),
-        regularizer=self._regularizers.get(self.B_GATES))
-    if self._use_projection:
-      w_h_initializer = basic.create_linear_initializer(self._hidden_size)
-      self._w_h_projection = tf.get_variable(
-          self.W_H_PROJECTION,
-          shape=[self._hidden_size, self._hidden_state_size],
+    with _reuse_if_created():
+      self._w_xh = tf.get_variable(
+          self.W_GATES,
+          shape=[equiv_input_size, 4 * self._hidden_size],
           dtype=dtype,
-          initializer=self._initializers.get(self.W_H_PROJECTION,
-                                             w_h_initializer),
-          partitioner=self._partitioners.get(self.W_H_PROJECTION),
-          regularizer=self._regularizers.get(self.W_H_PROJECTION))
+          initializer=self._initializers.get(self.W_GATES, initializer),
+          partitioner=self._partitioners.get(self.W_GATES),
+          regularizer=self._regularizers.get(self.W_GATES))
+      self._b = tf.get_variable(
+          self.B_GATES,
+          shape=[4 * self._hidden_size],
+          dtype=dtype,
+          initializer=self._initializers.get(self.B_GATES, initializer),
+          partitioner=self._partitioners.get(self.B_GATES),
+          regularizer=self._regularizers.get(self.B_GATES))
+      if self._use_projection:
+        w_h_initializer = basic.create_linear_initializer(self._hidden_size)
+        self._w_h_projection = tf.get_variable(
+            self.W_H_PROJECTION,
+            shape=[self._hidden_size, self._hidden_state_size],
+            dtype=dtype,
+            initializer=self._initializers.get(self.W_H_PROJECTION,
+                                               w_h_initializer),
+            partitioner=self._partitioners.get(self.W_H_PROJECTION),
+            regularizer=self._regularizers.get(self.W_H_PROJECTION))
 
   def _create_peephole_variables(self, dtype):
     """Initialize the variables used for the peephole connections."""
-    self._w_f_diag = tf.get_variable(
-        self.W_F_DIAG,
-        shape=[self._hidden_size],
-        dtype=dtype,
-        initializer=self._initializers.get(self.W_F_DIAG),
-        partitioner=self._partitioners.get(self.W_F_DIAG),
-        regularizer=self._regularizers.get(self.W_F_DIAG))
-    self._w_i_diag = tf.get_variable(
-        self.W_I_DIAG,
-        shape=[self._hidden_size],
-        dtype=dtype,
-        initializer=self._initializers.get(self.W_I_DIAG),
-        partitioner=self._partitioners.get(self.W_I_DIAG),
-        regularizer=self._regularizers.get(self.W_I_DIAG))
-    self._w_o_diag = tf.get_variable(
-        self.W_O_DIAG,
-        shape=[self._hidden_size],
-        dtype=dtype,
-        initializer=self._initializers.get(self.W_O_DIAG),
-        partitioner=self._partitioners.get(self.W_O_DIAG),
-        regularizer=self._regularizers.get(self.W_O_DIAG))
+    with _reuse_if_created():
+      self._w_f_diag = tf.get_variable(
+          self.W_F_DIAG,
+          shape=[self._hidden_size],
+          dtype=dtype,
+          initializer=self._initializers.get(self.W_F_DIAG),
+          partitioner=self._partitioners.get(self.W_F_DIAG),
+          regularizer=self._regularizers.get(self.W_F_DIAG))
+      self._w_i_diag = tf.get_variable(
+          self.W_I_DIAG,
+          shape=[self._hidden_size],
+          dtype=dtype,
+          initializer=self._initializers.get(self.W_I_DIAG),
+          partitioner=self._partitioners.get(self.W_I_DIAG),
+          regularizer=self._regularizers.get(self.W_I_DIAG))
+      self._w_o_diag = tf.get_variable(
+          self.W_O_DIAG,
+          shape=[self._hidden_size],
+          dtype=dtype,
+          initializer=self._initializers.get(self.W_O_DIAG),
+          partitioner=self._partitioners.get(self.W_O_DIAG),
+          regularizer=self._regularizers.get(self.W_O_DIAG))
 
   @property
   def state_size(self):
@@ -1370,6 +1477,60 @@ class ConvLSTM(rnn_core.RNNCore):
 
   def _build(self, inputs, state):
     hidden, cell = state
+    input_conv, hidden_conv = self._get_convolutions()
+    next_hidden = input_conv(inputs) + hidden_conv(hidden)
+    return self._next_state(next_hidden, cell)
+
+  @util.reuse_variables
+  def unroll(self, inputs_sequence, initial_state, sequence_length=None,
+             parallel_iterations=32, swap_memory=False):
+    """Connects the ConvLSTM to the graph for a whole sequence of inputs.
+
+    Equivalent to connecting the ConvLSTM once per step, with the same
+    variables, but the input convolution is applied to all the steps at once
+    by folding time into the batch dimension, and only the hidden convolution
+    runs inside the `tf.while_loop` over the steps.
+
+    Args:
+      inputs_sequence: Tensor of size `[time, batch_size] + input_shape`.
+      initial_state: Tuple (initial_hidden, initial_cell).
+      sequence_length: Optional `[batch_size]` integer tensor of the lengths
+        of the sequences. The state is not updated and the output is zero past
+        the length of each sequence.
+      parallel_iterations: Number of iterations of the loop run in parallel.
+      swap_memory: Whether to swap the loop activations to host memory.
+
+    Returns:
+      A tuple (output_sequence, final_state) where `output_sequence` is a
+      Tensor of size `[time, batch_size] + output_size` and `final_state` is a
+      tuple (final_hidden, final_cell).
+
+    Raises:
+      ValueError: If the rank of the inputs does not match `conv_ndims`.
+    """
+    rank = inputs_sequence.get_shape().ndims
+    if rank != self._conv_ndims + 3:
+      raise ValueError(
+          "Rank of inputs_sequence must be {} not: {}".format(
+              self._conv_ndims + 3, rank))
+    input_conv, hidden_conv = self._get_convolutions()
+    input_gates = basic.split_leading_dim(
+        input_conv(basic.merge_leading_dims(inputs_sequence, 2)),
+        inputs_sequence, 2)
+
+    def step(input_gates, prev_state):
+      hidden, cell = prev_state
+      return self._next_state(input_gates + hidden_conv(hidden), cell)
+
+    output_sequence, final_state, _ = rnn_core.dynamic_unroll(
+        step, self.output_size, input_gates, tuple(initial_state),
+        sequence_length=sequence_length,
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+    return output_sequence, final_state
+
+  def _get_convolutions(self):
+    """Returns the input and hidden convolutions, creating them if needed."""
     if "input" not in self._convolutions:
       self._convolutions["input"] = self._new_convolution(self._use_bias)
     if "hidden" not in self._convolutions:
@@ -1378,17 +1539,19 @@ class ConvLSTM(rnn_core.RNNCore):
       else:
         # Do not apply bias a second time
         self._convolutions["hidden"] = self._new_convolution(use_bias=False)
-    input_conv = self._convolutions["input"]
-    hidden_conv = self._convolutions["hidden"]
-    next_hidden = input_conv(inputs) + hidden_conv(hidden)
+    return self._convolutions["input"], self._convolutions["hidden"]
 
+  def _next_state(self, next_hidden, cell):
+    """Computes the output and next state from the pre-activation gates."""
     if self._use_layer_norm:
       # Normalize over all non-batch dimensions.
       # Temporarily flatten the spatial and channel dimensions together.
       flatten = basic.BatchFlatten()
       unflatten = basic.BatchReshape(next_hidden.get_shape().as_list()[1:])
       next_hidden = flatten(next_hidden)
-      next_hidden = layer_norm.LayerNorm()(next_hidden)
+      with _reuse_if_created():
+        normalize = layer_norm.LayerNorm()
+      next_hidden = normalize(next_hidden)
       next_hidden = unflatten(next_hidden)
 
     gates = tf.split(value=next_hidden, num_or_size_splits=4,
@@ -1536,59 +1699,119 @@ class GRU(rnn_core.RNNCore):
         first time, and the inferred size of the inputs does not match previous
         invocations.
     """
-    input_size = inputs.get_shape()[1]
-    weight_shape = (input_size, self._hidden_size)
-    u_shape = (self._hidden_size, self._hidden_size)
-    bias_shape = (self._hidden_size,)
+    self._create_variables(inputs.get_shape(), inputs.dtype)
 
-    self._wz = tf.get_variable(GRU.WZ, weight_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.WZ),
-                               partitioner=self._partitioners.get(GRU.WZ),
-                               regularizer=self._regularizers.get(GRU.WZ))
-    self._uz = tf.get_variable(GRU.UZ, u_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.UZ),
-                               partitioner=self._partitioners.get(GRU.UZ),
-                               regularizer=self._regularizers.get(GRU.UZ))
-    self._bz = tf.get_variable(GRU.BZ, bias_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.BZ),
-                               partitioner=self._partitioners.get(GRU.BZ),
-                               regularizer=self._regularizers.get(GRU.BZ))
     z = tf.sigmoid(tf.matmul(inputs, self._wz) +
                    tf.matmul(prev_state, self._uz) + self._bz)
-
-    self._wr = tf.get_variable(GRU.WR, weight_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.WR),
-                               partitioner=self._partitioners.get(GRU.WR),
-                               regularizer=self._regularizers.get(GRU.WR))
-    self._ur = tf.get_variable(GRU.UR, u_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.UR),
-                               partitioner=self._partitioners.get(GRU.UR),
-                               regularizer=self._regularizers.get(GRU.UR))
-    self._br = tf.get_variable(GRU.BR, bias_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.BR),
-                               partitioner=self._partitioners.get(GRU.BR),
-                               regularizer=self._regularizers.get(GRU.BR))
     r = tf.sigmoid(tf.matmul(inputs, self._wr) +
                    tf.matmul(prev_state, self._ur) + self._br)
-
-    self._wh = tf.get_variable(GRU.WH, weight_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.WH),
-                               partitioner=self._partitioners.get(GRU.WH),
-                               regularizer=self._regularizers.get(GRU.WH))
-    self._uh = tf.get_variable(GRU.UH, u_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.UH),
-                               partitioner=self._partitioners.get(GRU.UH),
-                               regularizer=self._regularizers.get(GRU.UH))
-    self._bh = tf.get_variable(GRU.BH, bias_shape, dtype=inputs.dtype,
-                               initializer=self._initializers.get(GRU.BH),
-                               partitioner=self._partitioners.get(GRU.BH),
-                               regularizer=self._regularizers.get(GRU.BH))
     h_twiddle = tf.tanh(tf.matmul(inputs, self._wh) +
                         tf.matmul(r * prev_state, self._uh) + self._bh)
 
     state = (1 - z) * prev_state + z * h_twiddle
     return state, state
 
+  @util.reuse_variables
+  def unroll(self, inputs_sequence, initial_state, sequence_length=None,
+             parallel_iterations=32, swap_memory=False):
+    """Connects the GRU to the graph for a whole sequence of inputs.
+
+    Equivalent to connecting the GRU once per step, with the same variables,
+    but the input weights of the three gates are applied to all the steps in
+    a single matmul before the `tf.while_loop` over the steps, which only
+    computes the contributions of the previous state.
+
+    Args:
+      inputs_sequence: Tensor of size `[time, batch_size, input_size]`.
+      initial_state: Tensor of size `[batch_size, hidden_size]`.
+      sequence_length: Optional `[batch_size]` integer tensor of the lengths
+        of the sequences. The state is not updated and the output is zero past
+        the length of each sequence.
+      parallel_iterations: Number of iterations of the loop run in parallel.
+      swap_memory: Whether to swap the loop activations to host memory.
+
+    Returns:
+      A tuple (output_sequence, final_state) where `output_sequence` is a
+      Tensor of size `[time, batch_size, hidden_size]` and `final_state` is a
+      Tensor of size `[batch_size, hidden_size]`.
+
+    Raises:
+      ValueError: If the inputs are not of rank 3, or their size does not match
+        previous connections.
+    """
+    _check_sequence_rank(inputs_sequence)
+    self._create_variables(inputs_sequence.get_shape()[1:],
+                           inputs_sequence.dtype)
+
+    input_weights = tf.concat([self._wz, self._wr, self._wh], axis=1)
+    biases = tf.concat([self._bz, self._br, self._bh], axis=0)
+    input_gates = _batch_matmul_sequence(inputs_sequence, input_weights)
+    input_gates += biases
+    # The update and reset gates of the previous state are computed together.
+    u_zr = tf.concat([self._uz, self._ur], axis=1)
+    uh = tf.convert_to_tensor(self._uh)
+
+    def step(input_gates, prev_state):
+      input_z, input_r, input_h = tf.split(input_gates, 3, axis=1)
+      state_z, state_r = tf.split(tf.matmul(prev_state, u_zr), 2, axis=1)
+      z = tf.sigmoid(input_z + state_z)
+      r = tf.sigmoid(input_r + state_r)
+      h_twiddle = tf.tanh(input_h + tf.matmul(r * prev_state, uh))
+      state = (1 - z) * prev_state + z * h_twiddle
+      return state, state
+
+    output_sequence, final_state, _ = rnn_core.dynamic_unroll(
+        step, self.output_size, input_gates, initial_state,
+        sequence_length=sequence_length,
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+    return output_sequence, final_state
+
+  def _create_variables(self, input_shape, dtype):
+    """Creates the variables of the GRU, or reuses them if they exist."""
+    input_size = input_shape[1]
+    weight_shape = (input_size, self._hidden_size)
+    u_shape = (self._hidden_size, self._hidden_size)
+    bias_shape = (self._hidden_size,)
+
+    with _reuse_if_created():
+      self._wz = tf.get_variable(GRU.WZ, weight_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.WZ),
+                                 partitioner=self._partitioners.get(GRU.WZ),
+                                 regularizer=self._regularizers.get(GRU.WZ))
+      self._uz = tf.get_variable(GRU.UZ, u_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.UZ),
+                                 partitioner=self._partitioners.get(GRU.UZ),
+                                 regularizer=self._regularizers.get(GRU.UZ))
+      self._bz = tf.get_variable(GRU.BZ, bias_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.BZ),
+                                 partitioner=self._partitioners.get(GRU.BZ),
+                                 regularizer=self._regularizers.get(GRU.BZ))
+      self._wr = tf.get_variable(GRU.WR, weight_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.WR),
+                                 partitioner=self._partitioners.get(GRU.WR),
+                                 regularizer=self._regularizers.get(GRU.WR))
+      self._ur = tf.get_variable(GRU.UR, u_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.UR),
+                                 partitioner=self._partitioners.get(GRU.UR),
+                                 regularizer=self._regularizers.get(GRU.UR))
+      self._br = tf.get_variable(GRU.BR, bias_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.BR),
+                                 partitioner=self._partitioners.get(GRU.BR),
+                                 regularizer=self._regularizers.get(GRU.BR))
+      self._wh = tf.get_variable(GRU.WH, weight_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.WH),
+                                 partitioner=self._partitioners.get(GRU.WH),
+                                 regularizer=self._regularizers.get(GRU.WH))
+      self._uh = tf.get_variable(GRU.UH, u_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.UH),
+                                 partitioner=self._partitioners.get(GRU.UH),
+                                 regularizer=self._regularizers.get(GRU.UH))
+      self._bh = tf.get_variable(GRU.BH, bias_shape, dtype=dtype,
+                                 initializer=self._initializers.get(GRU.BH),
+                                 partitioner=self._partitioners.get(GRU.BH),
+                                 regularizer=self._regularizers.get(GRU.BH))
+
   @property
   def state_size(self):
     return tf.TensorShape([self._hidden_size])
@@ -1709,7 +1932,61 @@ class HighwayCore(rnn_core.RNNCore):
         first time, and the inferred size of the inputs does not match previous
         invocations.
     """
-    input_size = inputs.get_shape()[1]
+    self._create_variables(inputs.get_shape(), inputs.dtype)
+    state = self._highway_layers(prev_state,
+                                 tf.matmul(inputs, self._pre_highway_wt),
+                                 tf.matmul(inputs, self._pre_highway_wh))
+    return state, state
+
+  @util.reuse_variables
+  def unroll(self, inputs_sequence, initial_state, sequence_length=None,
+             parallel_iterations=32, swap_memory=False):
+    """Connects the highway core to the graph for a whole sequence of inputs.
+
+    Equivalent to connecting the core once per step, with the same variables,
+    but the input weights of the first highway layer are applied to all the
+    steps in a single matmul before the `tf.while_loop` over the steps.
+
+    Args:
+      inputs_sequence: Tensor of size `[time, batch_size, input_size]`.
+      initial_state: Tensor of size `[batch_size, hidden_size]`.
+      sequence_length: Optional `[batch_size]` integer tensor of the lengths
+        of the sequences. The state is not updated and the output is zero past
+        the length of each sequence.
+      parallel_iterations: Number of iterations of the loop run in parallel.
+      swap_memory: Whether to swap the loop activations to host memory.
+
+    Returns:
+      A tuple (output_sequence, final_state) where `output_sequence` is a
+      Tensor of size `[time, batch_size, hidden_size]` and `final_state` is a
+      Tensor of size `[batch_size, hidden_size]`.
+
+    Raises:
+      ValueError: If the inputs are not of rank 3, or their size does not match
+        previous connections.
+    """
+    _check_sequence_rank(inputs_sequence)
+    self._create_variables(inputs_sequence.get_shape()[1:],
+                           inputs_sequence.dtype)
+    input_weights = tf.concat(
+        [self._pre_highway_wt, self._pre_highway_wh], axis=1)
+    input_gates = _batch_matmul_sequence(inputs_sequence, input_weights)
+
+    def step(input_gates, prev_state):
+      input_t, input_h = tf.split(input_gates, 2, axis=1)
+      state = self._highway_layers(prev_state, input_t, input_h)
+      return state, state
+
+    output_sequence, final_state, _ = rnn_core.dynamic_unroll(
+        step, self.output_size, input_gates, initial_state,
+        sequence_length=sequence_length,
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+    return output_sequence, final_state
+
+  def _create_variables(self, input_shape, dtype):
+    """Creates the variables of the core, or reuses them if they exist."""
+    input_size = input_shape[1]
     weight_shape = (input_size, self._hidden_size)
     u_shape = (self._hidden_size, self._hidden_size)
     bias_shape = (self._hidden_size,)
@@ -1718,30 +1995,45 @@ class HighwayCore(rnn_core.RNNCore):
       return tf.get_variable(
           name,
           shape,
-          dtype=inputs.dtype,
+          dtype=dtype,
           initializer=self._initializers.get(name),
           partitioner=self._partitioners.get(name),
           regularizer=self._regularizers.get(name))
 
-    pre_highway_wt = _get_variable(self.WT, weight_shape)
-    pre_highway_wh = _get_variable(self.WH, weight_shape)
+    with _reuse_if_created():
+      self._pre_highway_wt = _get_variable(self.WT, weight_shape)
+      self._pre_highway_wh = _get_variable(self.WH, weight_shape)
+      self._layers = []
+      for layer_index in xrange(self._num_layers):
+        layer_str = str(layer_index)
+        self._layers.append((_get_variable(self.WT + layer_str, u_shape),
+                             _get_variable(self.BT + layer_str, bias_shape),
+                             _get_variable(self.WH + layer_str, u_shape),
+                             _get_variable(self.BH + layer_str, bias_shape)))
+
+  def _highway_layers(self, prev_state, input_t, input_h):
+    """Applies the highway layers given the input contributions to the gates.
+
+    Args:
+      prev_state: Tensor of size `[batch_size, hidden_size]`.
+      input_t: Contribution of the inputs to the T gate of the first layer.
+      input_h: Contribution of the inputs to the H gate of the first layer.
+
+    Returns:
+      The next state.
+    """
     state = prev_state
-    for layer_index in xrange(self._num_layers):
-      layer_str = str(layer_index)
-      layer_wt = _get_variable(self.WT + layer_str, u_shape)
-      layer_bt = _get_variable(self.BT + layer_str, bias_shape)
-      layer_wh = _get_variable(self.WH + layer_str, u_shape)
-      layer_bh = _get_variable(self.BH + layer_str, bias_shape)
+    for layer_index, layer in enumerate(self._layers):
+      layer_wt, layer_bt, layer_wh, layer_bh = layer
       linear_t = tf.matmul(state, layer_wt) + layer_bt
       linear_h = tf.matmul(state, layer_wh) + layer_bh
       if layer_index == 0:
-        linear_t += tf.matmul(inputs, pre_highway_wt)
-        linear_h += tf.matmul(inputs, pre_highway_wh)
+        linear_t += input_t
+        linear_h += input_h
       output_t = tf.sigmoid(linear_t)
       output_h = tf.tanh(linear_h)
       state = state * (1 - output_t) + output_h * output_t
-
-    return state, state
+    return state
 
   @property
   def state_size(self):
@@ -0,0 +1,153 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Benchmarks for the sequence methods of sonnet.python.modules.gated_rnn.
+
+Compares unrolling cores one step at a time with `tf.nn.dynamic_rnn` to their
+sequence methods, which compute the input projections of all the steps at
+once. Run on CPU with
+`CUDA_VISIBLE_DEVICES= python gated_rnn_benchmark.py --benchmarks=.`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+# Dependency imports
+import sonnet as snt
+import tensorflow.compat.v1 as tf
+
+
+_BATCH_SIZE = 32
+_INPUT_SIZE = 256
+_SEQUENCE_LENGTH = 200
+_HIDDEN_SIZES = (128, 512)
+_NUM_RUNS = 5
+
+_CONV_BATCH_SIZE = 4
+_CONV_SEQUENCE_LENGTH = 16
+_FRAME_SHAPE = (64, 64, 32)
+_CONV_OUTPUT_CHANNELS = 16
+
+
+def _dynamic_rnn(core, inputs, initial_state):
+  return tf.nn.dynamic_rnn(core, inputs, initial_state=initial_state,
+                           time_major=True)[0]
+
+
+def _unroll(core, inputs, initial_state):
+  return core.unroll(inputs, initial_state)[0]
+
+
+class UnrollBenchmark(tf.test.Benchmark):
+  """Steps per second of the cores' `unroll` and per-step `dynamic_rnn`."""
+
+  def _benchmark_unroll(self, name, core_ctor, unroll_fn, hidden_size,
+                        with_gradients):
+    with tf.Graph().as_default(), tf.device("/cpu:0"):
+      core = core_ctor(hidden_size)
+      inputs = tf.random_normal([_SEQUENCE_LENGTH, _BATCH_SIZE, _INPUT_SIZE])
+      initial_state = core.initial_state(_BATCH_SIZE)
+      outputs = unroll_fn(core, inputs, initial_state)
+      fetches = [outputs]
+      if with_gradients:
+        fetches.append(tf.gradients(tf.reduce_sum(outputs),
+                                    core.get_variables()))
+
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        sess.run(fetches)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(fetches)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name="{}_{}_hidden_{}".format(
+            name, "train" if with_gradients else "forward", hidden_size),
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={"steps_per_second": _SEQUENCE_LENGTH / run_time})
+
+  def _benchmark_all(self, name, core_ctor, unroll_fn):
+    for hidden_size in _HIDDEN_SIZES:
+      for with_gradients in (False, True):
+        self._benchmark_unroll(name, core_ctor, unroll_fn, hidden_size,
+                               with_gradients)
+
+  def benchmark_lstm_dynamic_rnn(self):
+    self._benchmark_all("lstm_dynamic_rnn", snt.LSTM, _dynamic_rnn)
+
+  def benchmark_lstm_unroll(self):
+    self._benchmark_all("lstm_unroll", snt.LSTM, _unroll)
+
+  def benchmark_gru_dynamic_rnn(self):
+    self._benchmark_all("gru_dynamic_rnn", snt.GRU, _dynamic_rnn)
+
+  def benchmark_gru_unroll(self):
+    self._benchmark_all("gru_unroll", snt.GRU, _unroll)
+
+  def benchmark_highway_core_dynamic_rnn(self):
+    self._benchmark_all(
+        "highway_core_dynamic_rnn",
+        lambda hidden_size: snt.HighwayCore(hidden_size, num_layers=2),
+        _dynamic_rnn)
+
+  def benchmark_highway_core_unroll(self):
+    self._benchmark_all(
+        "highway_core_unroll",
+        lambda hidden_size: snt.HighwayCore(hidden_size, num_layers=2),
+        _unroll)
+
+
+class ConvLSTMUnrollBenchmark(tf.test.Benchmark):
+  """Steps per second of `snt.Conv2DLSTM.unroll` and per-step `dynamic_rnn`."""
+
+  def _benchmark_conv_unroll(self, name, unroll_fn):
+    with tf.Graph().as_default(), tf.device("/cpu:0"):
+      core = snt.Conv2DLSTM(
+          input_shape=_FRAME_SHAPE,
+          output_channels=_CONV_OUTPUT_CHANNELS,
+          kernel_shape=3,
+          legacy_bias_behaviour=False)
+      inputs = tf.random_normal(
+          (_CONV_SEQUENCE_LENGTH, _CONV_BATCH_SIZE) + _FRAME_SHAPE)
+      outputs = unroll_fn(core, inputs, core.initial_state(_CONV_BATCH_SIZE))
+
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        sess.run(outputs)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(outputs)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name=name,
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={"steps_per_second": _CONV_SEQUENCE_LENGTH / run_time})
+
+  def benchmark_conv_2d_lstm_dynamic_rnn(self):
+    self._benchmark_conv_unroll("conv_2d_lstm_dynamic_rnn", _dynamic_rnn)
+
+  def benchmark_conv_2d_lstm_unroll(self):
+    self._benchmark_conv_unroll("conv_2d_lstm_unroll", _unroll)
+
+
+if __name__ == "__main__":
+  tf.test.main()
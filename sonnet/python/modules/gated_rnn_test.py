@@ -26,12 +26,16 @@ from absl.testing import parameterized
 import numpy as np
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import sonnet as snt
+from sonnet.python.modules import rnn_test_utils
 import tensorflow.compat.v1 as tf
+from tensorflow.contrib import framework as contrib_framework
 from tensorflow.contrib import rnn as contrib_rnn
 from tensorflow.contrib.eager.python import tfe as contrib_eager
 
 from tensorflow.python.ops import variables  # pylint: disable=g-direct-tensorflow-import
 
+nest = contrib_framework.nest
+
 
 # Some helpers used for generic tests which cover both LSTM and BatchNormLSTM:
 
@@ -80,7 +84,8 @@ def _get_possible_initializer_keys(use_peepholes, use_batch_norm_h,
 
 
 @contrib_eager.run_all_tests_in_graph_and_eager_modes
-class LSTMTest(tf.test.TestCase, parameterized.TestCase):
+class LSTMTest(rnn_test_utils.UnrollTestMixin, tf.test.TestCase,
+               parameterized.TestCase):
 
   def testShape(self):
     batch_size = 2
@@ -630,6 +635,64 @@ class LSTMTest(tf.test.TestCase, parameterized.TestCase):
     static_out, dynamic_out = self.evaluate([static_output, dynamic_output])
     self.assertAllClose(static_out, dynamic_out)
 
+  @parameterized.parameters(
+      (False, False, None, None),
+      (True, False, None, None),
+      (False, True, None, None),
+      (False, False, 2, None),
+      (True, True, 2, 0.5))
+  def testUnrollSameAsDynamicRnn(self, use_peepholes, use_layer_norm,
+                                 projection_size, hidden_clip_value):
+    batch_size = 3
+    seq_len = 5
+    hidden_size = 4
+    input_size = 6
+
+    inputs = tf.constant(
+        np.random.randn(seq_len, batch_size, input_size), dtype=tf.float32)
+    core = snt.LSTM(hidden_size=hidden_size,
+                    use_peepholes=use_peepholes,
+                    use_layer_norm=use_layer_norm,
+                    projection_size=projection_size,
+                    hidden_clip_value=hidden_clip_value)
+    initial_state = core.initial_state(batch_size, tf.float32)
+    self._assert_unroll_matches_dynamic_rnn(core, inputs, initial_state)
+
+  def testUnrollBeforeBuild(self):
+    batch_size = 3
+    inputs = tf.ones([4, batch_size, 5])
+    core = snt.LSTM(hidden_size=6, use_peepholes=True, use_layer_norm=True)
+    variables = self._assert_unroll_before_build(
+        core, inputs, core.initial_state(batch_size))
+    self.assertLen(variables, 7)
+
+  def testUnrollSequenceLength(self):
+    batch_size = 3
+    seq_len = 6
+    lengths = [6, 2, 0]
+    inputs = tf.constant(
+        np.random.randn(seq_len, batch_size, 5), dtype=tf.float32)
+    core = snt.LSTM(hidden_size=4)
+    self._assert_unroll_matches_dynamic_rnn(
+        core, inputs, core.initial_state(batch_size),
+        sequence_length=tf.constant(lengths))
+
+  def testUnrollPlainTupleState(self):
+    batch_size = 3
+    inputs = tf.constant(
+        np.random.randn(4, batch_size, 5), dtype=tf.float32)
+    core = snt.LSTM(hidden_size=6)
+    hidden, cell = core.initial_state(batch_size)
+
+    _, unroll_state = self._assert_unroll_matches_dynamic_rnn(
+        core, inputs, (hidden, cell))
+    self.assertIsInstance(unroll_state, snt.LSTMState)
+
+  def testUnrollWrongRank(self):
+    core = snt.LSTM(hidden_size=4)
+    with self.assertRaisesRegexp(ValueError, "Rank of inputs_sequence"):
+      core.unroll(tf.ones([3, 5]), core.initial_state(3))
+
   def testLayerNormVariables(self):
     core = snt.LSTM(hidden_size=3, use_layer_norm=True)
 
@@ -803,7 +866,8 @@ class LSTMTest(tf.test.TestCase, parameterized.TestCase):
 
 
 @contrib_eager.run_all_tests_in_graph_and_eager_modes
-class ConvLSTMTest(tf.test.TestCase, parameterized.TestCase):
+class ConvLSTMTest(rnn_test_utils.UnrollTestMixin, tf.test.TestCase,
+                   parameterized.TestCase):
 
   @parameterized.parameters(
       (snt.Conv1DLSTM, 1, False),
@@ -1151,9 +1215,43 @@ class ConvLSTMTest(tf.test.TestCase, parameterized.TestCase):
     self.evaluate(init)
     self.evaluate(train_op)
 
+  @parameterized.parameters(
+      (snt.Conv1DLSTM, 1, True, None),
+      (snt.Conv2DLSTM, 2, False, None),
+      (snt.Conv2DLSTM, 2, True, [4, 1]),
+      (snt.Conv2DLSTM, 2, True, None, True),
+  )
+  def testUnrollSameAsDynamicRnn(self, lstm_class, dim,
+                                 legacy_bias_behaviour, lengths,
+                                 use_layer_norm=False):
+    time_steps = 4
+    batch_size = 2
+    input_shape = (6,) * dim + (3,)
+
+    lstm = lstm_class(
+        input_shape=input_shape,
+        output_channels=5,
+        kernel_shape=3,
+        legacy_bias_behaviour=legacy_bias_behaviour,
+        use_layer_norm=use_layer_norm)
+    inputs = tf.constant(
+        np.random.randn(time_steps, batch_size, *input_shape),
+        dtype=tf.float32)
+    sequence_length = None if lengths is None else tf.constant(lengths)
+    self._assert_unroll_matches_dynamic_rnn(
+        lstm, inputs, lstm.initial_state(batch_size, tf.float32),
+        sequence_length=sequence_length)
+
+  def testUnrollWrongRank(self):
+    lstm = snt.Conv2DLSTM(input_shape=(6, 6, 3), output_channels=5,
+                          kernel_shape=3)
+    with self.assertRaisesRegexp(ValueError, "Rank of inputs_sequence"):
+      lstm.unroll(tf.ones([2, 6, 6, 3]), lstm.initial_state(2))
+
 
 @contrib_eager.run_all_tests_in_graph_and_eager_modes
-class GRUTest(tf.test.TestCase, parameterized.TestCase):
+class GRUTest(rnn_test_utils.UnrollTestMixin, tf.test.TestCase,
+              parameterized.TestCase):
 
   def testShape(self):
     batch_size = 2
@@ -1300,9 +1398,29 @@ class GRUTest(tf.test.TestCase, parameterized.TestCase):
     self.assertLen(tf.get_collection(
         tf.GraphKeys.REGULARIZATION_LOSSES), len(keys))
 
+  @parameterized.parameters((None,), ([6, 2, 0],))
+  def testUnrollSameAsDynamicRnn(self, lengths):
+    batch_size = 3
+    seq_len = 6
+    inputs = tf.constant(
+        np.random.randn(seq_len, batch_size, 7), dtype=tf.float32)
+    sequence_length = None if lengths is None else tf.constant(lengths)
+    core = snt.GRU(hidden_size=5)
+    self._assert_unroll_matches_dynamic_rnn(
+        core, inputs, core.initial_state(batch_size),
+        sequence_length=sequence_length)
+
+  def testUnrollBeforeBuild(self):
+    batch_size = 3
+    inputs = tf.ones([4, batch_size, 7])
+    core = snt.GRU(hidden_size=5)
+    self._assert_unroll_before_build(
+        core, inputs, core.initial_state(batch_size))
+
 
 @contrib_eager.run_all_tests_in_graph_and_eager_modes
-class HighwayCoreTest(tf.test.TestCase, parameterized.TestCase):
+class HighwayCoreTest(rnn_test_utils.UnrollTestMixin, tf.test.TestCase,
+                      parameterized.TestCase):
 
   def testShape(self):
     batch_size = 2
@@ -1403,6 +1521,25 @@ class HighwayCoreTest(tf.test.TestCase, parameterized.TestCase):
       state_ex = state_ex[0]
     self.assertAllClose(state_data, state_ex)
 
+  @parameterized.parameters((None,), ([6, 2, 0],))
+  def testUnrollSameAsDynamicRnn(self, lengths):
+    batch_size = 3
+    seq_len = 6
+    inputs = tf.constant(
+        np.random.randn(seq_len, batch_size, 7), dtype=tf.float32)
+    sequence_length = None if lengths is None else tf.constant(lengths)
+    core = snt.HighwayCore(hidden_size=5, num_layers=2)
+    self._assert_unroll_matches_dynamic_rnn(
+        core, inputs, core.initial_state(batch_size),
+        sequence_length=sequence_length)
+
+  def testUnrollBeforeBuild(self):
+    batch_size = 3
+    inputs = tf.ones([4, batch_size, 7])
+    core = snt.HighwayCore(hidden_size=5, num_layers=2)
+    self._assert_unroll_before_build(
+        core, inputs, core.initial_state(batch_size))
+
 
 @contrib_eager.run_all_tests_in_graph_and_eager_modes
 class LSTMBlockCellTest(tf.test.TestCase, parameterized.TestCase):
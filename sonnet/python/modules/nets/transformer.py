@@ -55,6 +55,15 @@ AttentionState = collections.namedtuple('AttentionState',
 CompressedMemoryState = collections.namedtuple(
     'CompressedMemoryState', ('episodic_memory', 'compressed_memory', 'index'))
 
+# Projected per-head keys [B, H, M, K] and values [B, H, M, V] of a memory.
+KeyValueMemoryState = collections.namedtuple('KeyValueMemoryState',
+                                             ('keys', 'values'))
+
+# Ring buffer memory [B, M, D], whose oldest element is at slot `index` [B, 1].
+# Each example has its own slot, as examples whose sequence has ended stop
+# advancing under `tf.nn.dynamic_rnn` with `sequence_length`.
+RingMemoryState = collections.namedtuple('RingMemoryState', ('memory', 'index'))
+
 
 def rel_shift(position_logits):
   """Shifting of logits for relative attention.
@@ -104,6 +113,43 @@ def rel_shift(position_logits):
   return position_logits
 
 
+def _relative_logits(queries, relative_keys, start, num_rows, num_queries):
+  """Computes rows of the shifted relative logits of a block of queries.
+
+  This is equivalent to `rel_shift` applied to the logits of all queries
+  against the relative keys tiled over the batch, but the keys are broadcast
+  over the batch and the padding of `rel_shift` is folded into the matmul by
+  prepending a zero key, so that the shift only slices the logits once.
+
+  Args:
+    queries: A tensor of shape [B, H, R, K] with queries [start, start + R),
+      where R is `num_rows + 1`, or `num_rows` if these are the final queries.
+    relative_keys: A tensor of shape [1, H, N + M, K].
+    start: Index of the first query.
+    num_rows: Number of rows to return.
+    num_queries: Total number of queries.
+
+  Returns:
+    A tensor of shape [B, H, num_rows, N + M], equal to rows
+    [start, start + num_rows) of the shifted relative logits of all queries.
+  """
+  t2 = relative_keys.get_shape().as_list()[2]
+  relative_keys = tf.pad(relative_keys, [[0, 0], [0, 0], [1, 0], [0, 0]])
+  # [B, H, R, N + M + 1], whose first column is zero.
+  position_logits = tf.matmul(queries, relative_keys, transpose_b=True)
+  logits_shape = tf.shape(position_logits)
+  batch_size = logits_shape[0]
+  num_heads = logits_shape[1]
+  # `rel_shift` reads the padded logits of all queries, flattened, from offset
+  # `num_queries`. The rows of a block start `num_queries - start` elements
+  # into its own padded logits, and overlap with the first row of the next
+  # block.
+  position_logits = tf.reshape(position_logits, [batch_size, num_heads, -1])
+  offset = num_queries - start
+  position_logits = position_logits[:, :, offset:offset + num_rows * t2]
+  return tf.reshape(position_logits, [batch_size, num_heads, num_rows, t2])
+
+
 def _layer_norm(inputs):
   if inputs.get_shape().ndims > 2:
     return basic.BatchApply(snt_ln.LayerNorm())(inputs)
@@ -118,6 +164,126 @@ def _concat_and_slice(prev_memory, new_memory):
   return memory, concat_memory
 
 
+def _stateless_dropout(inputs, keep_prob, seed):
+  """Dropout with a mask determined by `seed`, so it can be recomputed."""
+  random = tf.random.stateless_uniform(
+      tf.shape(inputs), seed=seed, dtype=inputs.dtype)
+  return inputs * tf.floor(keep_prob + random) / keep_prob
+
+
+def _ring_write(ring, new_memory):
+  """Writes `new_memory` over the oldest slots of a `RingMemoryState`.
+
+  The memory is updated with a scatter, which TF can perform in place once all
+  the other reads of the previous memory have run, rather than copied twice by
+  `_concat_and_slice`.
+
+  Args:
+    ring: A `RingMemoryState` with memory of shape [B, M, D].
+    new_memory: A tensor of shape [B, N, D].
+
+  Returns:
+    The updated `RingMemoryState`.
+  """
+  memory_size = ring.memory.get_shape().as_list()[1]
+  if memory_size == 0:
+    return ring
+  num_new = new_memory.get_shape().as_list()[1]
+  # Only the newest M elements are kept if N > M.
+  num_written = min(num_new, memory_size)
+  new_memory = new_memory[:, num_new - num_written:]
+  first_slot = tf.cast(ring.index, tf.int32) + num_new - num_written
+  # [B, N], the slots written for each example.
+  slots = (first_slot + tf.range(num_written)) % memory_size
+  batch_indices = tf.broadcast_to(
+      tf.range(tf.shape(new_memory)[0])[:, tf.newaxis], tf.shape(slots))
+  indices = tf.stack([batch_indices, slots], -1)
+  memory = tf.tensor_scatter_nd_update(ring.memory, indices, new_memory)
+  index = tf.mod(ring.index + num_new, memory_size)
+  return RingMemoryState(memory=memory, index=index)
+
+
+def _ring_read_oldest(ring, new_memory, num_elements):
+  """Returns the oldest elements of a ring buffer, followed by `new_memory`.
+
+  Args:
+    ring: A `RingMemoryState` with memory of shape [B, M, D].
+    new_memory: A tensor of shape [B, N, D].
+    num_elements: Number of elements to read, at most M + N.
+
+  Returns:
+    A tensor of shape [B, num_elements, D], equal to the first `num_elements`
+    of the memory in time order concatenated with `new_memory`.
+  """
+  memory_size = ring.memory.get_shape().as_list()[1]
+  num_read = min(num_elements, memory_size)
+  oldest = new_memory[:, :0]
+  if num_read:
+    slots = (tf.cast(ring.index, tf.int32) + tf.range(num_read)) % memory_size
+    oldest = tf.gather(ring.memory, slots, axis=1, batch_dims=1)
+  if num_elements > num_read:
+    oldest = tf.concat([oldest, new_memory[:, :num_elements - num_read]], 1)
+  return oldest
+
+
+def _unpack_memory(memory):
+  """Returns a memory tensor and the [B] slots of its oldest element or None."""
+  if isinstance(memory, RingMemoryState):
+    return memory.memory, tf.cast(memory.index[:, 0], tf.int32)
+  return memory, None
+
+
+def _rotate_memory_columns(logits, memory_rotations):
+  """Moves the memory columns of `logits` from time order to slot order.
+
+  Args:
+    logits: A tensor of shape [B, ..., M + N], or [1, ..., M + N] if it is
+      broadcast over the batch, whose first M columns correspond to the
+      memories ordered from the oldest to the newest element.
+    memory_rotations: List of `(memory_size, slot)` tuples for the successive
+      memories, where `slot` is the [B] int32 slot of the oldest element of a
+      ring buffer memory for each example, or None for a memory in time order.
+
+  Returns:
+    A tensor of shape [B, ..., M + N], whose columns match the slots of the
+    memories.
+  """
+  slots = [slot for _, slot in memory_rotations if slot is not None]
+  if not slots:
+    return logits
+  # The slots differ between examples, so logits broadcast over the batch are
+  # tiled first.
+  logits_shape = tf.shape(logits)
+  logits = tf.broadcast_to(
+      logits, tf.concat([tf.shape(slots[0]), logits_shape[1:]], 0))
+  column_axis = logits.get_shape().ndims - 1
+  columns = []
+  start = 0
+  for memory_size, slot in memory_rotations:
+    memory_columns = logits[..., start:start + memory_size]
+    if slot is not None and memory_size:
+      # Rolls the columns of each example by its slot, as `tf.roll` would.
+      column_indices = tf.mod(
+          tf.range(memory_size) - slot[:, tf.newaxis], memory_size)
+      memory_columns = tf.gather(memory_columns, column_indices,
+                                 axis=column_axis, batch_dims=1)
+    columns.append(memory_columns)
+    start += memory_size
+  columns.append(logits[..., start:])
+  return tf.concat(columns, -1)
+
+
+def _select_attention_state_fields(attention_state, fields):
+  """Returns `attention_state` with the fields not in `fields` set to None."""
+  unknown_fields = set(fields) - set(AttentionState._fields)
+  if unknown_fields:
+    raise ValueError('Unknown AttentionState fields: {}.'.format(
+        ', '.join(sorted(unknown_fields))))
+  return AttentionState(**{
+      field: value if field in fields else None
+      for field, value in attention_state._asdict().items()})
+
+
 def simple_attention(queries, keys, values):
   logits = tf.matmul(queries, keys, transpose_b=True)
   weights = tf.nn.softmax(logits)
@@ -173,8 +339,12 @@ def future_mask(chunk_size, dtype):
 
 def _memory_size(state):
   if isinstance(state, CompressedMemoryState):
-    return (state.episodic_memory.get_shape().as_list()[1] +
-            state.compressed_memory.get_shape().as_list()[1])
+    return (_memory_size(state.episodic_memory) +
+            _memory_size(state.compressed_memory))
+  elif isinstance(state, RingMemoryState):
+    return state.memory.get_shape().as_list()[1]
+  elif isinstance(state, KeyValueMemoryState):
+    return state.keys.get_shape().as_list()[2]
   else:
     return state.get_shape().as_list()[1]
 
@@ -184,8 +354,9 @@ def create_mask(inputs, state, equal_window):
 
   Args:
     inputs: inputs tensor of shape [B, N, D]
-    state: optional tensor of shape [B, M, D], CompressedMemoryState or a list
-      where the ith entry corresponds to the ith layer's state.
+    state: optional tensor of shape [B, M, D], CompressedMemoryState,
+      KeyValueMemoryState, RingMemoryState or a list where the ith entry
+      corresponds to the ith layer's state.
     equal_window: if True, then each activation has an equally-sized attention
       window of length 'M'. This only makes sense if a state is given.
 
@@ -265,6 +436,7 @@ class MultiheadAttention(base.AbstractModule):
                positional_encodings=None,
                use_relative_positions=False,
                init_std=2.,
+               attention_block_size=None,
                name='multihead_attention'):
     """Creates a MultiheadAttention module.
 
@@ -284,6 +456,13 @@ class MultiheadAttention(base.AbstractModule):
         vs absolute, into the attention logits. This is done exactly as
         described in the TransformerXL, Dai et al. 2019.
       init_std: scaling of standard deviation for weight matrices init.
+      attention_block_size: If set, the queries are processed in blocks of
+        this size, so that the forward pass holds the attention logits and
+        weights of only one block in memory at a time. They are recomputed
+        block by block for the gradients, and these recomputations may run
+        concurrently, so the peak memory of a training step is not
+        necessarily lower. The `logits` and `weights` of the returned
+        `AttentionState` are then None.
       name: Name of module.
     """
 
@@ -303,6 +482,7 @@ class MultiheadAttention(base.AbstractModule):
     self._positional_encodings = positional_encodings
     self._use_relative_positions = use_relative_positions
     self._init = {'w': tf.variance_scaling_initializer(init_std)}
+    self._attention_block_size = attention_block_size
 
   @util.reuse_variables
   def multihead_linear(self, inputs, name):
@@ -322,18 +502,39 @@ class MultiheadAttention(base.AbstractModule):
              query_inputs=None,
              state=None,
              is_training=False,
-             dropout_keep_prob=0.5):
+             dropout_keep_prob=0.5,
+             attention_state_fields=None):
     embedding_size = self._value_size * self._num_heads
 
     q_inputs = inputs if query_inputs is None else query_inputs
     # Denoted by L. If query_inputs is None, L = N.
     _, query_size = q_inputs.get_shape().as_list()[:2]
 
-    if state is not None:
+    # Keys and values of the memory were projected on previous calls, only
+    # those of the inputs are computed here.
+    cached_memory = isinstance(state, KeyValueMemoryState)
+    if cached_memory and (self._positional_encodings and
+                          not self._use_relative_positions):
+      raise ValueError('KeyValueMemoryState requires relative positions, as '
+                       'absolute positions are added before the projection.')
+
+    memory_rotations = []
+    if state is not None and not cached_memory:
       if isinstance(state, CompressedMemoryState):
         state_memory_list = [state.compressed_memory, state.episodic_memory]
       else:
         state_memory_list = [state]
+      # Ring buffer memories are attended in slot order, and the positional
+      # logits and mask are rotated to match.
+      state_memory_list, oldest_slots = zip(
+          *[_unpack_memory(memory) for memory in state_memory_list])
+      state_memory_list = list(state_memory_list)
+      memory_rotations = [
+          (memory.get_shape().as_list()[1], slot)
+          for memory, slot in zip(state_memory_list, oldest_slots)]
+      if (any(slot is not None for slot in oldest_slots) and
+          self._positional_encodings and not self._use_relative_positions):
+        raise ValueError('RingMemoryState requires relative positions.')
 
       k_inputs = tf.concat(state_memory_list + [inputs], 1)
       v_inputs = k_inputs
@@ -341,12 +542,12 @@ class MultiheadAttention(base.AbstractModule):
       k_inputs = inputs
       v_inputs = inputs
 
-    # Batch size denoted by B
-    batch_size = tf.shape(inputs)[0]
     # Chunk_size denoted by N
     chunk_size = inputs.get_shape().as_list()[1]
     # Denoted by N + M
     att_size = k_inputs.get_shape().as_list()[1]
+    if cached_memory:
+      att_size += _memory_size(state)
 
     if self._positional_encodings and not self._use_relative_positions:
       key_positions, query_positions = self._positional_encodings
@@ -359,18 +560,30 @@ class MultiheadAttention(base.AbstractModule):
     k = self.multihead_linear(k_inputs, 'key')
     # [B, H, N + M, V]
     v = self.multihead_linear(v_inputs, 'value')
+    if cached_memory:
+      k = tf.concat([state.keys, k], 2)
+      v = tf.concat([state.values, v], 2)
 
     # Scaling the dot-product
     if self._scaling:
       q *= self._key_size**-0.5
 
-    # [B, H, L, N + M]
+    if self._mask is not None:
+      if self._mask.get_shape().as_list()[-1] != att_size:
+        mask = self._mask[:, :, :, -att_size:]
+      else:
+        mask = self._mask
+      mask = _rotate_memory_columns(mask, memory_rotations)
+    else:
+      mask = None
+
+    content_bias = None
+    relative_keys = []
+    relative_biases = []
     if self._use_relative_positions:
-      r_w_bias = tf.get_variable(
+      content_bias = tf.get_variable(
           'r_w_bias', [1, self._num_heads, 1, self._key_size],
           dtype=inputs.dtype)
-      content_logits = tf.matmul(q + r_w_bias, k, transpose_b=True)
-      all_relative_logits = []
       # Loop over multiple positional encodings, for the case of multiple
       # memory types.
       for i, positional_encodings in enumerate(self._positional_encodings):
@@ -379,38 +592,49 @@ class MultiheadAttention(base.AbstractModule):
           key_positions = key_positions[:, -att_size:]  # Crop to layer mem size
         is_final = i == len(self._positional_encodings) - 1
         suffix = '' if is_final else '_%d' % i
-        relative_keys = self.multihead_linear(
-            key_positions, name='relative_keys' + suffix)
-        # [B, H, N, D]
-        r_r_bias = tf.get_variable(
+        # [1, H, N + M, K], broadcast over the batch.
+        relative_keys.append(self.multihead_linear(
+            key_positions, name='relative_keys' + suffix))
+        relative_biases.append(tf.get_variable(
             'r_r_bias' + suffix, [1, self._num_heads, 1, self._key_size],
-            dtype=inputs.dtype)
-        relative_keys = tf.tile(relative_keys, [batch_size, 1, 1, 1])
-        relative_logits = tf.matmul(
-            q + r_r_bias, relative_keys, transpose_b=True)
-        relative_logits = rel_shift(relative_logits)
-        if not is_final:  # Include relative positions for input sequence.
-          relative_logits = relative_logits[:, :, :, :-chunk_size]
-        all_relative_logits.append(relative_logits)
-      all_relative_logits = tf.concat(all_relative_logits, 3)
-      logits = content_logits + all_relative_logits
+            dtype=inputs.dtype))
+
+    if self._attention_block_size:
+      # [B, L, H, V]
+      output_transpose = self._blockwise_attention(
+          q, k, v, content_bias, relative_keys, relative_biases, mask,
+          memory_rotations, chunk_size, is_training, dropout_keep_prob)
+      weights = None
+      content_logits = None
     else:
-      # [B, H, N, N + M]
-      logits = tf.matmul(q, k, transpose_b=True)
-      content_logits = logits
-
-    if self._mask is not None:
-      if self._mask.get_shape().as_list()[-1] != att_size:
-        mask = self._mask[:, :, :, -att_size:]
+      # [B, H, L, N + M]
+      if self._use_relative_positions:
+        content_logits = tf.matmul(q + content_bias, k, transpose_b=True)
+        all_relative_logits = []
+        for i, (relative_keys_i, r_r_bias) in enumerate(
+            zip(relative_keys, relative_biases)):
+          relative_logits = _relative_logits(
+              q + r_r_bias, relative_keys_i, 0, query_size, query_size)
+          if i < len(relative_keys) - 1:
+            # Include relative positions for input sequence.
+            relative_logits = relative_logits[:, :, :, :-chunk_size]
+          all_relative_logits.append(relative_logits)
+        all_relative_logits = _rotate_memory_columns(
+            tf.concat(all_relative_logits, 3), memory_rotations)
+        logits = content_logits + all_relative_logits
       else:
-        mask = self._mask
-      logits += mask
+        # [B, H, N, N + M]
+        logits = tf.matmul(q, k, transpose_b=True)
+        content_logits = logits
 
-    weights = tf.nn.softmax(logits)
-    if is_training:
-      weights = tf.nn.dropout(weights, dropout_keep_prob)
-    # [B, L, H, V], where V is value_size
-    output_transpose = tf.einsum('bhij,bhjk->bihk', weights, v)
+      if mask is not None:
+        logits += mask
+
+      weights = tf.nn.softmax(logits)
+      if is_training:
+        weights = tf.nn.dropout(weights, dropout_keep_prob)
+      # [B, L, H, V], where V is value_size
+      output_transpose = tf.einsum('bhij,bhjk->bihk', weights, v)
 
     # [B, L, H, V] -> [B, L, HV]
     attended_inputs = basic.BatchReshape([query_size, embedding_size])(
@@ -426,8 +650,102 @@ class MultiheadAttention(base.AbstractModule):
         logits=content_logits,
         embeddings=inputs,
         read_words=output)
+    if attention_state_fields is not None:
+      attention_state = _select_attention_state_fields(attention_state,
+                                                       attention_state_fields)
     return output, attention_state
 
+  def _blockwise_attention(self, q, k, v, content_bias, relative_keys,
+                           relative_biases, mask, memory_rotations, chunk_size,
+                           is_training, dropout_keep_prob):
+    """Attends over blocks of `attention_block_size` queries in sequence.
+
+    Each block is wrapped in `tf.recompute_grad`, so its logits and weights
+    are freed once its output is computed and recomputed for the gradients.
+    The dropout masks are drawn from a seed, so that they are recomputed
+    identically. Only the forward blocks are chained: the recomputations of
+    the backward pass have no control dependencies between them, so TF may
+    run several at once and hold the logits of more than one block.
+
+    Args:
+      q: [B, H, L, K] queries.
+      k: [B, H, N + M, K] keys.
+      v: [B, H, N + M, V] values.
+      content_bias: Optional [1, H, 1, K] bias of the queries for the content
+        logits.
+      relative_keys: List of [1, H, N + M_i, K] relative position keys, one per
+        memory type.
+      relative_biases: List of [1, H, 1, K] biases of the queries for the
+        corresponding relative logits.
+      mask: Optional [1, 1, L, N + M] mask added to the logits, or
+        [B, 1, L, N + M] if rotated for ring buffer memories.
+      memory_rotations: Rotations of the relative logits of ring buffer
+        memories, see `_rotate_memory_columns`.
+      chunk_size: N.
+      is_training: Whether to apply dropout to the attention weights.
+      dropout_keep_prob: Probability of keeping an attention weight.
+
+    Returns:
+      The [B, L, H, V] attended values.
+    """
+    num_queries = q.get_shape().as_list()[2]
+    block_outputs = []
+    for start in range(0, num_queries, self._attention_block_size):
+      num_rows = min(self._attention_block_size, num_queries - start)
+      content_queries = q[:, :, start:start + num_rows]
+      if content_bias is not None:
+        content_queries += content_bias
+      # The relative logits of a block are shifted using the logits of the
+      # first query of the next block.
+      relative_queries = [q[:, :, start:start + num_rows + 1] + bias
+                          for bias in relative_biases]
+      block_inputs = [k, v, content_queries] + relative_keys + relative_queries
+      if block_outputs:
+        # Blocks are run in sequence, to bound the memory they use.
+        with tf.control_dependencies([block_outputs[-1]]):
+          block_inputs = [tf.identity(t) for t in block_inputs]
+
+      block_mask = None if mask is None else mask[:, :, start:start + num_rows]
+      seed = None
+      if is_training:
+        seed = tf.random.uniform([2], maxval=tf.int32.max, dtype=tf.int32,
+                                 name='dropout_seed')
+      attend = self._attend_block_fn(start, num_rows, num_queries, chunk_size,
+                                     block_mask, memory_rotations, seed,
+                                     dropout_keep_prob)
+      block_outputs.append(tf.recompute_grad(attend)(*block_inputs))
+    return tf.concat(block_outputs, 1)
+
+  def _attend_block_fn(self, start, num_rows, num_queries, chunk_size, mask,
+                       memory_rotations, seed, dropout_keep_prob):
+    """Returns a function attending with queries [start, start + num_rows)."""
+
+    def attend(k, v, content_queries, *relative_inputs):
+      num_relative = len(relative_inputs) // 2
+      relative_keys = relative_inputs[:num_relative]
+      relative_queries = relative_inputs[num_relative:]
+      logits = tf.matmul(content_queries, k, transpose_b=True)
+      if relative_keys:
+        all_relative_logits = []
+        for i, (relative_keys_i, relative_queries_i) in enumerate(
+            zip(relative_keys, relative_queries)):
+          relative_logits = _relative_logits(
+              relative_queries_i, relative_keys_i, start, num_rows,
+              num_queries)
+          if i < num_relative - 1:
+            relative_logits = relative_logits[:, :, :, :-chunk_size]
+          all_relative_logits.append(relative_logits)
+        logits += _rotate_memory_columns(
+            tf.concat(all_relative_logits, 3), memory_rotations)
+      if mask is not None:
+        logits += mask
+      weights = tf.nn.softmax(logits)
+      if seed is not None:
+        weights = _stateless_dropout(weights, dropout_keep_prob, seed)
+      return tf.einsum('bhij,bhjk->bihk', weights, v)
+
+    return attend
+
 
 class TransformerTower(base.AbstractModule):
   """Transformer tower.
@@ -450,6 +768,7 @@ class TransformerTower(base.AbstractModule):
                clamp_time_range=0,
                same_attention_length=False,
                layer_norm='input',
+               attention_block_size=None,
                name='transformer_tower'):
     """Initializes TransformerTower.
 
@@ -476,6 +795,8 @@ class TransformerTower(base.AbstractModule):
         position in the sequence contains the same length of attention.
       layer_norm: Where to apply layer-norm in Transformer block. Can be one of
         'input' (Vaswani et al. 2017), 'output', or 'both'.
+      attention_block_size: if set, each attention layer processes its queries
+        in blocks of this size, see `MultiheadAttention`.
       name: name of variable scope.
     """
     super(TransformerTower, self).__init__(name=name)
@@ -500,6 +821,7 @@ class TransformerTower(base.AbstractModule):
     self._clamp_time_range = clamp_time_range
     self._same_attention_length = same_attention_length
     self._layer_norm = layer_norm
+    self._attention_block_size = attention_block_size
     self._attention_modules = []
     self._object_mlps = []
 
@@ -513,6 +835,7 @@ class TransformerTower(base.AbstractModule):
           positional_encodings=self._positional_encodings,
           use_relative_positions=self._use_relative_positions,
           init_std=2. / np.sqrt(self._num_layers),
+          attention_block_size=self._attention_block_size,
       )
       self._multihead_attention = ResidualDropoutWrapper(
           attention_module, self._dropout_rate, layer_norm=self._layer_norm)
@@ -525,7 +848,12 @@ class TransformerTower(base.AbstractModule):
     self._object_mlps.append(mlp)
     return self._multihead_attention, object_mlp
 
-  def _build(self, inputs, state=None, condition=None, is_training=True):
+  def _build(self,
+             inputs,
+             state=None,
+             condition=None,
+             is_training=True,
+             attention_state_fields=None):
     """Calculates multi-layer self attention and mlp transformation.
 
     Args:
@@ -534,6 +862,12 @@ class TransformerTower(base.AbstractModule):
       condition: optional tensor to condition on. The shape is shape
         [batch_size, dim_size].
       is_training: If true, dropout is applied.
+      attention_state_fields: optional iterable of `AttentionState` field
+        names. If set, the other fields of the returned attention states are
+        None. This only lowers the peak memory when the attention states
+        outlive the tower, e.g. when they are returned from a
+        `tf.nn.dynamic_rnn` step or in eager mode; in graph mode, states which
+        are not used are freed after their last consumer regardless.
 
     Returns:
       output: tensor of shape [batch_size, num_steps, output_dim_size].
@@ -584,7 +918,8 @@ class TransformerTower(base.AbstractModule):
             layer_i_inputs,
             state=state_i,
             is_training=is_training,
-            dropout_keep_prob=1. - self._dropout_rate)
+            dropout_keep_prob=1. - self._dropout_rate,
+            attention_state_fields=attention_state_fields)
         attention_states.append(attention_state)
         # Feed-forward with residuals.
         output = object_mlp(
@@ -619,12 +954,25 @@ class TransformerXL(rnn_core.RNNCore):
   * single-step, i.e. when chunk_size = 0. Here the model expects 2D input
     `[batch_size, input_dim]`.
 
+  By default the memory of each layer holds the past inputs of its attention
+  module, whose keys and values are projected again at every call. With
+  `cache_keys_and_values=True` the memory instead holds `KeyValueMemoryState`
+  tuples of the already-projected keys and values, so that each call only
+  projects its own inputs. This makes single-step sampling cost O(1) rather
+  than O(memory_size) projections per layer. It requires relative positions.
+
+  With `ring_memory=True` the memory of each layer is a `RingMemoryState`,
+  where new elements overwrite the oldest slots instead of the whole memory
+  being shifted at every call. It also requires relative positions.
+
   """
 
   def __init__(self,
                core_config,
                memory_size,
                chunk_size,
+               cache_keys_and_values=False,
+               ring_memory=False,
                name='transformer_xl'):
     """Constructs TransformerXL graph.
 
@@ -634,13 +982,31 @@ class TransformerXL(rnn_core.RNNCore):
       chunk_size: expected chunk size of inputs, if greater than zero inputs are
         of size [batch_size, chunk_size, input_dim]. If equal to zero inputs are
         of size [batch_size, input_dim].
+      cache_keys_and_values: if True, the state of each layer is a
+        `KeyValueMemoryState` of the projected keys and values of the memory,
+        instead of the memory itself.
+      ring_memory: if True, the state of each layer is a `RingMemoryState`.
       name: name of variable scope.
+
+    Raises:
+      ValueError: if `cache_keys_and_values` or `ring_memory` is True and
+        `core_config` uses absolute positions, or if both are True.
     """
 
     super(TransformerXL, self).__init__(name=name)
     self._core_config = core_config
     self._memory_size = memory_size
     self._chunk_size = chunk_size
+    self._cache_keys_and_values = cache_keys_and_values
+    self._ring_memory = ring_memory
+    if (cache_keys_and_values and
+        not core_config.get('use_relative_positions', True)):
+      raise ValueError('cache_keys_and_values requires relative positions.')
+    if ring_memory and not core_config.get('use_relative_positions', True):
+      raise ValueError('ring_memory requires relative positions.')
+    if cache_keys_and_values and ring_memory:
+      raise ValueError('cache_keys_and_values and ring_memory cannot be used '
+                       'together.')
 
     # Extract some size information from the core config.
     self._num_layers = self._core_config['num_layers']
@@ -664,14 +1030,36 @@ class TransformerXL(rnn_core.RNNCore):
 
     transformer = TransformerTower(**self._core_config)
     state_for_transformer = None if self._memory_size == 0 else prev_state
+    if self._cache_keys_and_values:
+      attention_state_fields = ('keys', 'values')
+    elif self._ring_memory:
+      attention_state_fields = ('embeddings', 'read_words')
+    else:
+      attention_state_fields = ('embeddings',)
     output, attention_state = transformer(
-        inputs, state=state_for_transformer, is_training=is_training)
+        inputs,
+        state=state_for_transformer,
+        is_training=is_training,
+        attention_state_fields=attention_state_fields)
 
     next_state = []
     for i, state_i in enumerate(prev_state):
-      # Append new elements to memory.
       attn_state_i = attention_state[i]
-      memory = tf.concat([state_i, attn_state_i.embeddings], 1)[:, chunk_size:]
+      if self._cache_keys_and_values:
+        # The attention keys and values already hold the memory followed by
+        # the new elements.
+        memory = KeyValueMemoryState(
+            keys=attn_state_i.keys[:, :, chunk_size:],
+            values=attn_state_i.values[:, :, chunk_size:])
+      elif self._ring_memory:
+        # Waits for the attention of the layer to read the memory, so that it
+        # can be overwritten in place.
+        with tf.control_dependencies([attn_state_i.read_words]):
+          memory = _ring_write(state_i, attn_state_i.embeddings)
+      else:
+        # Append new elements to memory.
+        memory = tf.concat([state_i, attn_state_i.embeddings],
+                           1)[:, chunk_size:]
       next_state.append(memory)
 
     if self._chunk_size == 0:  # For the use-case as a single-step RNN.
@@ -681,7 +1069,18 @@ class TransformerXL(rnn_core.RNNCore):
 
   @property
   def state_size(self):
-    memory_shape = tf.TensorShape([self._memory_size, self._embedding_size])
+    if self._cache_keys_and_values:
+      memory_shape = KeyValueMemoryState(
+          keys=tf.TensorShape(
+              [self._num_heads, self._memory_size, self._key_size]),
+          values=tf.TensorShape(
+              [self._num_heads, self._memory_size, self._value_size]))
+    elif self._ring_memory:
+      memory_shape = RingMemoryState(
+          memory=tf.TensorShape([self._memory_size, self._embedding_size]),
+          index=tf.TensorShape([1]))
+    else:
+      memory_shape = tf.TensorShape([self._memory_size, self._embedding_size])
     return [memory_shape] * self._num_layers
 
   @property
@@ -867,7 +1266,8 @@ def _compute_avg_attention(attention_state,
                            compressed_memory_size,
                            episodic_memory_size,
                            chunk_size,
-                           n_buckets=6):
+                           n_buckets=6,
+                           memory_rotations=None):
   """Computes average attention for Compressive Transformer.
 
   Computes average attention for `n_buckets` over the sequence,
@@ -880,6 +1280,8 @@ def _compute_avg_attention(attention_state,
     chunk_size: size of input sequence.
     n_buckets: number of buckets to average attention per memory,
       compressed memory, and sequence.
+    memory_rotations: optional rotations of the attention weights over ring
+      buffer memories, see `_rotate_memory_columns`.
 
   Returns:
     Tuple of (names, avg_weights) where each is a list. The names are
@@ -906,7 +1308,15 @@ def _compute_avg_attention(attention_state,
   split_sizes += [chunk_size - int(chunk_size / n_buckets) * (n_buckets - 1)]
 
   split_names += ['seq_p%d' % i for i in range(n_buckets)]
-  avg_weights = tf.reduce_mean(attention_state.weights, axis=[0, 1, 2])
+  # [B, M + N]
+  avg_weights = tf.reduce_mean(attention_state.weights, axis=[1, 2])
+  if memory_rotations:
+    # Restores the time order of the weights over ring buffer memories, which
+    # differs between examples.
+    avg_weights = _rotate_memory_columns(
+        avg_weights, [(size, None if slot is None else -slot)
+                      for size, slot in memory_rotations])
+  avg_weights = tf.reduce_mean(avg_weights, axis=0)
   split_avg_weights = tf.split(avg_weights, split_sizes)
   split_avg_weights = [tf.reduce_sum(x) for x in split_avg_weights]
   return split_names, split_avg_weights
@@ -929,6 +1339,7 @@ class CompressiveTransformer(rnn_core.RNNCore):
                compression_ctor=ConvCompressor,
                compression_config=None,
                export_stats=False,
+               ring_memory=False,
                name='compressive_transformer'):
     """Constructs Compressive Transformer.
 
@@ -955,10 +1366,24 @@ class CompressiveTransformer(rnn_core.RNNCore):
         compression network.
       export_stats: exports compression loss and attention weight per layer to a
         tf collection 'stats_export' if true. Can slow down training.
+      ring_memory: if True, the episodic and compressed memories of each
+        `CompressedMemoryState` are `RingMemoryState` tuples, where new elements
+        overwrite the oldest slots instead of the whole memory being shifted.
+        Requires relative positions.
       name: name of variable scope.
+
+    Raises:
+      ValueError: if `core_config` sets an `attention_block_size`, as the
+        attention weights are needed for the compression statistics, or if
+        `ring_memory` is True and `core_config` uses absolute positions.
     """
 
     super(CompressiveTransformer, self).__init__(name=name)
+    if core_config.get('attention_block_size'):
+      raise ValueError('CompressiveTransformer does not support blockwise '
+                       'attention.')
+    if ring_memory and not core_config.get('use_relative_positions', True):
+      raise ValueError('ring_memory requires relative positions.')
     self._core_config = core_config
     self._episodic_memory_size = episodic_memory_size
     self._compressed_memory_size = compressed_memory_size
@@ -972,6 +1397,7 @@ class CompressiveTransformer(rnn_core.RNNCore):
     })
     self._compression_ctor = compression_ctor
     self._export_stats = export_stats
+    self._ring_memory = ring_memory
 
     # Extract some size information from the core config.
     self._num_layers = self._core_config['num_layers']
@@ -1033,8 +1459,12 @@ class CompressiveTransformer(rnn_core.RNNCore):
             is_training=is_training,
             dropout_keep_prob=1 - self._dropout_rate,
         )
-        compressed_memory, _ = _concat_and_slice(prev_compressed_memory,
-                                                 next_compressed_memory)
+        if self._ring_memory:
+          compressed_memory = _ring_write(prev_compressed_memory,
+                                          next_compressed_memory)
+        else:
+          compressed_memory, _ = _concat_and_slice(prev_compressed_memory,
+                                                   next_compressed_memory)
         return compressed_memory, compression_loss
 
       return _inner_fn
@@ -1044,7 +1474,7 @@ class CompressiveTransformer(rnn_core.RNNCore):
 
       def _inner_fn():
         return (prev_compressed_memory,
-                tf.zeros([], dtype=prev_compressed_memory.dtype))
+                tf.zeros([], dtype=inputs.dtype))
 
       return _inner_fn
 
@@ -1055,8 +1485,23 @@ class CompressiveTransformer(rnn_core.RNNCore):
     for i, state_i in enumerate(prev_state):
       # Append new elements to memory.
       attn_state_i = attention_state[i]
-      memory, concat_memory = _concat_and_slice(state_i.episodic_memory,
-                                                attn_state_i.embeddings)
+      if self._ring_memory:
+        mem_to_compress = _ring_read_oldest(
+            state_i.episodic_memory, attn_state_i.embeddings, num_to_compress)
+        # Waits for the memory to be read, so that it can be overwritten in
+        # place.
+        with tf.control_dependencies(
+            [mem_to_compress, attn_state_i.keys, attn_state_i.values]):
+          memory = _ring_write(state_i.episodic_memory,
+                               attn_state_i.embeddings)
+        memory_rotations = [
+            (_memory_size(ring), _unpack_memory(ring)[1])
+            for ring in (state_i.compressed_memory, state_i.episodic_memory)]
+      else:
+        memory, concat_memory = _concat_and_slice(state_i.episodic_memory,
+                                                  attn_state_i.embeddings)
+        mem_to_compress = concat_memory[:, :num_to_compress]
+        memory_rotations = None
 
       sequence_index = state_i.index[0]
       # We special-case chunk_size=1, which is useful for sampling. In the
@@ -1072,7 +1517,7 @@ class CompressiveTransformer(rnn_core.RNNCore):
       apply_compression_fn = apply_compression_generic(
           attn_state=attn_state_i,
           attn_module=transformer.attention_module(i),
-          mem_to_compress=concat_memory[:, :num_to_compress],
+          mem_to_compress=mem_to_compress,
           prev_compressed_memory=state_i.compressed_memory,
       )
       dont_apply_compression_fn = dont_apply_compression_generic(
@@ -1088,7 +1533,8 @@ class CompressiveTransformer(rnn_core.RNNCore):
       # Attention weights per layer.
       attn_names, attn_weights = _compute_avg_attention(
           attn_state_i, self._compressed_memory_size,
-          self._episodic_memory_size, chunk_size)
+          self._episodic_memory_size, chunk_size,
+          memory_rotations=memory_rotations)
       attn_names_i = [name + '_l%02d' % i for name in attn_names]
       stats_export_dict.update(dict(zip(attn_names_i, attn_weights)))
 
@@ -1127,6 +1573,9 @@ class CompressiveTransformer(rnn_core.RNNCore):
     cm_shape = tf.TensorShape(
         [self._compressed_memory_size, self._embedding_size])
     index_shape = tf.TensorShape([1])
+    if self._ring_memory:
+      memory_shape = RingMemoryState(memory=memory_shape, index=index_shape)
+      cm_shape = RingMemoryState(memory=cm_shape, index=index_shape)
     shape_per_layer = CompressedMemoryState(
         index=index_shape,
         episodic_memory=memory_shape,
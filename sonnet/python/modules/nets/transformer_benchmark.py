@@ -0,0 +1,335 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Benchmarks for sonnet.python.modules.nets.transformer.
+
+Run on CPU with
+`CUDA_VISIBLE_DEVICES= python transformer_benchmark.py --benchmarks=.`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import functools
+import time
+
+# Dependency imports
+import sonnet as snt
+import tensorflow.compat.v1 as tf
+
+
+_BATCH_SIZE = 8
+_NUM_TOKENS = 1000
+_NUM_RUNS = 3
+
+_CORE_CONFIG = {
+    'value_size': 64,
+    'num_heads': 8,
+    'num_layers': 4,
+    'mlp_hidden_sizes': (1024,),
+    'dropout_rate': 0.,
+}
+_SAMPLE_LENGTH = 64
+_MEMORY_SIZES = (512, 1024, 2048, 4096)
+
+_TOWER_BATCH_SIZE = 2
+_TOWER_CHUNK_SIZE = 1024
+_TOWER_MEMORY_SIZE = 1024
+_ATTENTION_BLOCK_SIZES = (None, 256, 128)
+
+_RELATIVE_BATCH_SIZES = (1, 4, 16, 64, 256)
+_RELATIVE_NUM_HEADS = 8
+_RELATIVE_KEY_SIZE = 64
+_RELATIVE_CHUNK_SIZE = 128
+_RELATIVE_MEMORY_SIZE = 128
+
+_RING_NUM_STEPS = 16
+_RING_INPUT_SIZE = 128
+_RING_MEMORY_SIZES = (1024, 2048, 4096, 8192)
+
+_LEAN_NUM_LAYERS = 12
+_LEAN_NUM_CHUNKS = 4
+_LEAN_CHUNK_SIZE = 256
+
+
+def _peak_bytes(run_metadata):
+  """Returns the peak memory in use by an allocator during a traced run."""
+  # `peak_bytes` of a node only counts the allocations of that node.
+  return max([0] + [memory.allocator_bytes_in_use
+                    for device_stats in run_metadata.step_stats.dev_stats
+                    for node_stats in device_stats.node_stats
+                    for memory in node_stats.memory])
+
+
+def _allocated_bytes(run_metadata):
+  """Returns the total memory allocated by the ops of a traced run."""
+  return sum(memory.total_bytes
+             for device_stats in run_metadata.step_stats.dev_stats
+             for node_stats in device_stats.node_stats
+             for memory in node_stats.memory)
+
+
+class TransformerXLSamplingBenchmark(tf.test.Benchmark):
+  """Tokens per second of single-step sampling from a `TransformerXL`."""
+
+  def _benchmark_sampling(self, name, cache_keys_and_values, memory_size):
+    with tf.Graph().as_default(), tf.device('/cpu:0'):
+      core = snt.nets.TransformerXL(
+          _CORE_CONFIG,
+          memory_size=memory_size,
+          chunk_size=0,
+          cache_keys_and_values=cache_keys_and_values)
+      embed = snt.Embed(_NUM_TOKENS, embed_dim=128)
+      sampler = snt.RNNSampler(
+          core=functools.partial(core, is_training=False),
+          embed=embed,
+          output=snt.Linear(_NUM_TOKENS))
+      initial_logits = tf.zeros([_BATCH_SIZE, _NUM_TOKENS])
+      tokens = sampler(initial_logits, core.initial_state(_BATCH_SIZE),
+                       sequence_length=_SAMPLE_LENGTH).tokens
+
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        sess.run(tokens)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(tokens)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name='{}_memory_{}'.format(name, memory_size),
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={'tokens_per_second': _BATCH_SIZE * _SAMPLE_LENGTH / run_time})
+
+  def benchmark_sampling_memory(self):
+    for memory_size in _MEMORY_SIZES:
+      self._benchmark_sampling('sampling_memory', False, memory_size)
+
+  def benchmark_sampling_cached_keys_and_values(self):
+    for memory_size in _MEMORY_SIZES:
+      self._benchmark_sampling('sampling_cached_keys_and_values', True,
+                               memory_size)
+
+
+class AttentionBlockBenchmark(tf.test.Benchmark):
+  """Latency and peak memory of a `TransformerTower` training step."""
+
+  def _benchmark_tower(self, name, attention_block_size):
+    with tf.Graph().as_default(), tf.device('/cpu:0'):
+      hidden_size = _CORE_CONFIG['value_size'] * _CORE_CONFIG['num_heads']
+      tower = snt.nets.TransformerTower(
+          attention_block_size=attention_block_size, **_CORE_CONFIG)
+      inputs = tf.random_normal(
+          [_TOWER_BATCH_SIZE, _TOWER_CHUNK_SIZE, hidden_size])
+      state = [tf.random_normal(
+          [_TOWER_BATCH_SIZE, _TOWER_MEMORY_SIZE, hidden_size])
+               for _ in range(_CORE_CONFIG['num_layers'])]
+      output, _ = tower(inputs, state=state)
+      train_op = tf.gradients(tf.reduce_sum(output), tower.get_variables())
+
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        run_metadata = tf.RunMetadata()
+        sess.run(train_op,
+                 options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE),
+                 run_metadata=run_metadata)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(train_op)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name=name,
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={'peak_bytes': _peak_bytes(run_metadata)})
+
+  def benchmark_attention_blocks(self):
+    for attention_block_size in _ATTENTION_BLOCK_SIZES:
+      if attention_block_size is None:
+        name = 'tower_train_full_attention'
+      else:
+        name = 'tower_train_attention_block_{}'.format(attention_block_size)
+      self._benchmark_tower(name, attention_block_size)
+
+
+def _tiled_relative_logits(queries, relative_keys):
+  batch_size = tf.shape(queries)[0]
+  relative_keys = tf.tile(relative_keys, [batch_size, 1, 1, 1])
+  return snt.nets.transformer.rel_shift(
+      tf.matmul(queries, relative_keys, transpose_b=True))
+
+
+def _broadcast_relative_logits(queries, relative_keys):
+  num_queries = queries.get_shape().as_list()[2]
+  return snt.nets.transformer._relative_logits(  # pylint: disable=protected-access
+      queries, relative_keys, 0, num_queries, num_queries)
+
+
+class RelativeLogitsBenchmark(tf.test.Benchmark):
+  """Latency and peak memory of the relative position attention logits."""
+
+  def _benchmark_relative_logits(self, name, logits_fn, batch_size):
+    with tf.Graph().as_default(), tf.device('/cpu:0'):
+      queries = tf.random_normal(
+          [batch_size, _RELATIVE_NUM_HEADS, _RELATIVE_CHUNK_SIZE,
+           _RELATIVE_KEY_SIZE])
+      relative_keys = tf.random_normal(
+          [1, _RELATIVE_NUM_HEADS,
+           _RELATIVE_CHUNK_SIZE + _RELATIVE_MEMORY_SIZE, _RELATIVE_KEY_SIZE])
+      logits = logits_fn(queries, relative_keys)
+      fetches = tf.gradients(tf.reduce_sum(logits), [queries, relative_keys])
+
+      with tf.Session() as sess:
+        run_metadata = tf.RunMetadata()
+        sess.run(fetches,
+                 options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE),
+                 run_metadata=run_metadata)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(fetches)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name='{}_batch_{}'.format(name, batch_size),
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={'peak_bytes': _peak_bytes(run_metadata)})
+
+  def benchmark_tiled_relative_logits(self):
+    for batch_size in _RELATIVE_BATCH_SIZES:
+      self._benchmark_relative_logits('tiled_relative_logits',
+                                      _tiled_relative_logits, batch_size)
+
+  def benchmark_broadcast_relative_logits(self):
+    for batch_size in _RELATIVE_BATCH_SIZES:
+      self._benchmark_relative_logits('broadcast_relative_logits',
+                                      _broadcast_relative_logits, batch_size)
+
+
+class RingMemoryBenchmark(tf.test.Benchmark):
+  """Step latency and allocations of `TransformerXL` memory updates."""
+
+  def _benchmark_memory(self, name, ring_memory, memory_size):
+    with tf.Graph().as_default(), tf.device('/cpu:0'):
+      core = snt.nets.TransformerXL(
+          _CORE_CONFIG,
+          memory_size=memory_size,
+          chunk_size=0,
+          ring_memory=ring_memory)
+      inputs = tf.random_normal(
+          [_RING_NUM_STEPS, _BATCH_SIZE, _RING_INPUT_SIZE])
+      # The core runs in training mode, which only differs in its dropout, and
+      # dropout is disabled by the config.
+      outputs, _ = tf.nn.dynamic_rnn(
+          core,
+          inputs,
+          initial_state=core.initial_state(_BATCH_SIZE),
+          time_major=True)
+
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        run_metadata = tf.RunMetadata()
+        sess.run(outputs,
+                 options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE),
+                 run_metadata=run_metadata)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(outputs)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name='{}_memory_{}'.format(name, memory_size),
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={
+            'step_seconds': run_time / _RING_NUM_STEPS,
+            'allocated_bytes_per_step':
+                _allocated_bytes(run_metadata) / _RING_NUM_STEPS,
+        })
+
+  def benchmark_shifted_memory(self):
+    for memory_size in _RING_MEMORY_SIZES:
+      self._benchmark_memory('shifted_memory', False, memory_size)
+
+  def benchmark_ring_memory(self):
+    for memory_size in _RING_MEMORY_SIZES:
+      self._benchmark_memory('ring_memory', True, memory_size)
+
+
+class AttentionStateFieldsBenchmark(tf.test.Benchmark):
+  """Peak memory of training a 12-layer tower whose attention states are kept.
+
+  The tower runs over a sequence of chunks in a `tf.map_fn`, which stacks the
+  attention states returned for each chunk, as `tf.nn.dynamic_rnn` does for the
+  outputs of a core. A tower whose attention states are not returned from the
+  loop only keeps them until their last use, in which case
+  `attention_state_fields` does not change the peak memory.
+  """
+
+  def _benchmark_fields(self, name, attention_state_fields):
+    with tf.Graph().as_default(), tf.device('/cpu:0'):
+      core_config = dict(_CORE_CONFIG, num_layers=_LEAN_NUM_LAYERS)
+      hidden_size = core_config['value_size'] * core_config['num_heads']
+      tower = snt.nets.TransformerTower(**core_config)
+      inputs = tf.random_normal(
+          [_LEAN_NUM_CHUNKS, _TOWER_BATCH_SIZE, _LEAN_CHUNK_SIZE, hidden_size])
+      num_fields = len(attention_state_fields or
+                       snt.nets.transformer.AttentionState._fields)
+
+      def step(chunk):
+        output, attention_states = tower(
+            chunk, attention_state_fields=attention_state_fields)
+        return output, [[field for field in attention_state
+                         if field is not None]
+                        for attention_state in attention_states]
+
+      outputs, attention_states = tf.map_fn(
+          step,
+          inputs,
+          dtype=(tf.float32, [[tf.float32] * num_fields] * _LEAN_NUM_LAYERS),
+          parallel_iterations=1)
+      train_op = tf.gradients(tf.reduce_sum(outputs), tower.get_variables())
+      fetches = [train_op, attention_states]
+
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        run_metadata = tf.RunMetadata()
+        sess.run(fetches,
+                 options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE),
+                 run_metadata=run_metadata)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(fetches)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name=name,
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={'peak_bytes': _peak_bytes(run_metadata)})
+
+  def benchmark_all_attention_state_fields(self):
+    self._benchmark_fields('tower_train_all_attention_state_fields', None)
+
+  def benchmark_embeddings_attention_state_field(self):
+    self._benchmark_fields('tower_train_embeddings_attention_state_field',
+                           ('embeddings',))
+
+
+if __name__ == '__main__':
+  tf.test.main()
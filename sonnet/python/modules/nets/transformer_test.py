@@ -18,11 +18,32 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import re
+
 import numpy as np
 import sonnet as snt
 import tensorflow.compat.v1 as tf
 
 
+def _copy_variables(src, dst):
+  """Returns an op assigning the variables of module `src` to those of `dst`.
+
+  Both modules must have been connected, with the same configuration.
+  """
+  src_variables = src.get_all_variables()
+  dst_variables = dst.get_all_variables()
+  assert len(src_variables) == len(dst_variables)
+  return tf.group(*[
+      tf.assign(dst_variable, src_variable)
+      for src_variable, dst_variable in zip(src_variables, dst_variables)])
+
+
+def _ring_in_time_order(ring):
+  """Returns the memory of an evaluated `RingMemoryState` in time order."""
+  return np.stack([np.roll(memory, -int(index[0]), axis=0)
+                   for memory, index in zip(ring.memory, ring.index)])
+
+
 class TransformerTowerTest(tf.test.TestCase):
 
   def test_forward(self):
@@ -71,6 +92,151 @@ class TransformerTowerTest(tf.test.TestCase):
     with self.assertRaises(ValueError):
       transformer(invalid_inputs)
 
+  def test_attention_block_size(self):
+    """Checks blockwise attention matches attending with all queries at once."""
+    batch_size = 2
+    window_size = 8
+    memory_size = 5
+    value_size = 4
+    num_heads = 3
+    num_layers = 2
+    hidden_size = value_size * num_heads
+    inputs = tf.random_normal([batch_size, window_size, hidden_size])
+    state = [
+        tf.random_normal([batch_size, memory_size, hidden_size])
+        for _ in range(num_layers)
+    ]
+
+    def build_gradients(attention_block_size):
+      transformer = snt.nets.TransformerTower(
+          value_size=value_size,
+          num_heads=num_heads,
+          num_layers=num_layers,
+          mlp_hidden_sizes=tuple([16]),
+          attention_block_size=attention_block_size)
+      output, attention_states = transformer(
+          inputs, state=state, is_training=False)
+      variables = transformer.get_all_variables()
+      gradients = tf.gradients(output, [inputs] + state + list(variables))
+      return transformer, output, gradients, attention_states
+
+    transformer, output, gradients, _ = build_gradients(None)
+    (blockwise_transformer, blockwise_output, blockwise_gradients,
+     blockwise_attention_states) = build_gradients(3)
+    for attention_state in blockwise_attention_states:
+      self.assertIsNone(attention_state.weights)
+      self.assertIsNone(attention_state.logits)
+
+    copy_variables = _copy_variables(transformer, blockwise_transformer)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      sess.run(copy_variables)
+      output_v, blockwise_output_v, gradients_v, blockwise_gradients_v = (
+          sess.run([output, blockwise_output, gradients, blockwise_gradients]))
+    self.assertAllClose(output_v, blockwise_output_v, atol=1e-5)
+    for gradient_v, blockwise_gradient_v in zip(gradients_v,
+                                                blockwise_gradients_v):
+      self.assertAllClose(gradient_v, blockwise_gradient_v, atol=1e-4)
+
+  def test_attention_state_fields(self):
+    batch_size = 2
+    window_size = 5
+    value_size = 4
+    num_heads = 3
+    num_layers = 2
+    inputs = tf.random_normal([batch_size, window_size, value_size * num_heads])
+    transformer = snt.nets.TransformerTower(
+        value_size=value_size,
+        num_heads=num_heads,
+        num_layers=num_layers,
+        mlp_hidden_sizes=tuple([16]))
+    _, attention_states = transformer(
+        inputs, attention_state_fields=('embeddings', 'keys'))
+    self.assertLen(attention_states, num_layers)
+    for attention_state in attention_states:
+      for field, value in attention_state._asdict().items():
+        if field in ('embeddings', 'keys'):
+          self.assertIsNotNone(value)
+        else:
+          self.assertIsNone(value)
+
+    with self.assertRaisesRegexp(ValueError, 'Unknown AttentionState fields'):
+      transformer(inputs, attention_state_fields=('embedding',))
+
+
+class MultiheadAttentionTest(tf.test.TestCase):
+
+  def test_attention_block_size_training_gradients(self):
+    """Checks blockwise attention gradients with dropout numerically."""
+    batch_size = 1
+    window_size = 5
+    num_heads = 2
+    value_size = 3
+    inputs_shape = [batch_size, window_size, num_heads * value_size]
+    inputs = tf.constant(
+        np.random.RandomState(0).randn(*inputs_shape), dtype=tf.float32)
+    attention = snt.nets.transformer.MultiheadAttention(
+        value_size=value_size,
+        key_size=value_size,
+        num_heads=num_heads,
+        init_std=1.,
+        attention_block_size=2)
+    output, _ = attention(inputs, is_training=True, dropout_keep_prob=0.5)
+    eval_output, _ = attention(inputs, is_training=False)
+
+    # The dropout seeds of the blocks are fixed, so that the output is a
+    # deterministic function of the inputs.
+    seeds = [op.outputs[0] for op in tf.get_default_graph().get_operations()
+             if re.search(r'/dropout_seed(_\d+)?$', op.name)]
+    self.assertLen(seeds, 3)
+    seeds_feed = {seed: [i, 7] for i, seed in enumerate(seeds)}
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      output_v, eval_output_v = sess.run([output, eval_output],
+                                         feed_dict=seeds_feed)
+      self.assertNotAllClose(output_v, eval_output_v)
+      self.assertAllEqual(output_v, sess.run(output, feed_dict=seeds_feed))
+      # The gradients only match if the recomputed blocks drop the same
+      # weights as the forward ones.
+      gradient_error = tf.test.compute_gradient_error(
+          inputs, inputs_shape, output, inputs_shape,
+          extra_feed_dict=seeds_feed)
+    self.assertLess(gradient_error, 1e-2)
+
+
+class RelativeLogitsTest(tf.test.TestCase):
+
+  def test_matches_rel_shift(self):
+    """Checks broadcast relative logits match tiled and shifted logits."""
+    batch_size = 3
+    num_heads = 2
+    num_queries = 5
+    att_size = 9
+    key_size = 4
+    block_size = 2
+    queries = tf.random_normal([batch_size, num_heads, num_queries, key_size])
+    relative_keys = tf.random_normal([1, num_heads, att_size, key_size])
+    expected_logits = snt.nets.transformer.rel_shift(
+        tf.matmul(queries, tf.tile(relative_keys, [batch_size, 1, 1, 1]),
+                  transpose_b=True))
+    # pylint: disable=protected-access
+    logits = snt.nets.transformer._relative_logits(
+        queries, relative_keys, 0, num_queries, num_queries)
+    block_logits = [
+        snt.nets.transformer._relative_logits(
+            queries[:, :, start:start + block_size + 1], relative_keys, start,
+            min(block_size, num_queries - start), num_queries)
+        for start in range(0, num_queries, block_size)
+    ]
+    # pylint: enable=protected-access
+    self.assertAllEqual(logits.get_shape().as_list(),
+                        [batch_size, num_heads, num_queries, att_size])
+    with self.test_session() as sess:
+      expected_logits_v, logits_v, block_logits_v = sess.run(
+          [expected_logits, logits, tf.concat(block_logits, 2)])
+    self.assertAllClose(expected_logits_v, logits_v)
+    self.assertAllClose(expected_logits_v, block_logits_v)
+
 
 class TransformerXLTest(tf.test.TestCase):
 
@@ -327,6 +493,168 @@ class TransformerXLTest(tf.test.TestCase):
           feed_dict={inputs: np.ones([batch_size_2, sequence_length, 16])})
       self.assertAllEqual(final_output_2.shape[0], batch_size_2)
 
+  def test_cache_keys_and_values(self):
+    """Checks caching projected keys and values does not change the outputs."""
+    batch_size = 2
+    memory_size = 4
+    num_steps = 6
+    num_heads = 5
+    key_size = 3
+    value_size = 4
+    core_config = {
+        'key_size': key_size,
+        'value_size': value_size,
+        'num_heads': num_heads,
+        'num_layers': 2,
+        'dropout_rate': 0.,
+    }
+    inputs = tf.random_normal([num_steps, batch_size, 16])
+    transformer_xl = snt.nets.transformer.TransformerXL(
+        core_config, memory_size=memory_size, chunk_size=0)
+    cached_transformer_xl = snt.nets.transformer.TransformerXL(
+        core_config,
+        memory_size=memory_size,
+        chunk_size=0,
+        cache_keys_and_values=True)
+    state = transformer_xl.initial_state(batch_size)
+    cached_state = cached_transformer_xl.initial_state(batch_size)
+    outputs = []
+    cached_outputs = []
+    for t in range(num_steps):
+      output, state = transformer_xl(inputs[t], state, is_training=False)
+      cached_output, cached_state = cached_transformer_xl(
+          inputs[t], cached_state, is_training=False)
+      outputs.append(output)
+      cached_outputs.append(cached_output)
+
+    for state_i in cached_state:
+      self.assertIsInstance(state_i,
+                            snt.nets.transformer.KeyValueMemoryState)
+      self.assertAllEqual(state_i.keys.get_shape().as_list(),
+                          [batch_size, num_heads, memory_size, key_size])
+      self.assertAllEqual(state_i.values.get_shape().as_list(),
+                          [batch_size, num_heads, memory_size, value_size])
+
+    copy_variables = _copy_variables(transformer_xl, cached_transformer_xl)
+    with self.test_session() as session:
+      tf.global_variables_initializer().run()
+      session.run(copy_variables)
+      outputs_v, cached_outputs_v = session.run([outputs, cached_outputs])
+    self.assertAllClose(outputs_v, cached_outputs_v, atol=1e-5)
+
+  def test_cache_keys_and_values_absolute_positions(self):
+    core_config = {
+        'value_size': 4,
+        'num_heads': 5,
+        'num_layers': 2,
+        'use_relative_positions': False,
+    }
+    with self.assertRaisesRegexp(ValueError, 'relative positions'):
+      snt.nets.transformer.TransformerXL(
+          core_config, memory_size=4, chunk_size=0, cache_keys_and_values=True)
+
+  def _check_ring_memory(self, chunk_size, memory_size, num_steps):
+    """Checks a ring buffer memory does not change the outputs."""
+    batch_size = 2
+    core_config = {
+        'key_size': 3,
+        'value_size': 4,
+        'num_heads': 5,
+        'num_layers': 2,
+        'dropout_rate': 0.,
+    }
+    inputs = tf.random_normal([num_steps, batch_size, chunk_size, 16])
+    transformer_xl = snt.nets.transformer.TransformerXL(
+        core_config, memory_size=memory_size, chunk_size=chunk_size)
+    ring_transformer_xl = snt.nets.transformer.TransformerXL(
+        core_config,
+        memory_size=memory_size,
+        chunk_size=chunk_size,
+        ring_memory=True)
+    state = transformer_xl.initial_state(batch_size)
+    ring_state = ring_transformer_xl.initial_state(batch_size)
+    outputs = []
+    ring_outputs = []
+    for t in range(num_steps):
+      output, state = transformer_xl(inputs[t], state, is_training=False)
+      ring_output, ring_state = ring_transformer_xl(
+          inputs[t], ring_state, is_training=False)
+      outputs.append(output)
+      ring_outputs.append(ring_output)
+
+    for state_i in ring_state:
+      self.assertIsInstance(state_i, snt.nets.transformer.RingMemoryState)
+      self.assertAllEqual(state_i.memory.get_shape().as_list(),
+                          [batch_size, memory_size, 20])
+
+    copy_variables = _copy_variables(transformer_xl, ring_transformer_xl)
+    with self.test_session() as session:
+      tf.global_variables_initializer().run()
+      session.run(copy_variables)
+      outputs_v, ring_outputs_v, state_v, ring_state_v = session.run(
+          [outputs, ring_outputs, state, ring_state])
+    self.assertAllClose(outputs_v, ring_outputs_v, atol=1e-5)
+    # The oldest element is in the slot after the last one written.
+    oldest_slot = num_steps * chunk_size % memory_size
+    for state_i_v, ring_state_i_v in zip(state_v, ring_state_v):
+      self.assertAllEqual(ring_state_i_v.index, [[oldest_slot]] * batch_size)
+      self.assertAllClose(state_i_v, _ring_in_time_order(ring_state_i_v))
+
+  def test_ring_memory(self):
+    self._check_ring_memory(chunk_size=3, memory_size=5, num_steps=4)
+
+  def test_ring_memory_chunk_larger_than_memory(self):
+    self._check_ring_memory(chunk_size=7, memory_size=3, num_steps=3)
+
+  def test_ring_memory_sequence_length(self):
+    """Checks each example of a ring buffer memory has its own oldest slot."""
+    batch_size = 2
+    memory_size = 3
+    num_steps = 4
+    core_config = {
+        'key_size': 3,
+        'value_size': 4,
+        'num_heads': 5,
+        'num_layers': 2,
+        'dropout_rate': 0.,
+    }
+    inputs = tf.random_normal([2, batch_size, num_steps, 16])
+
+    def build(ring_memory):
+      transformer_xl = snt.nets.transformer.TransformerXL(
+          core_config,
+          memory_size=memory_size,
+          chunk_size=0,
+          ring_memory=ring_memory)
+      # The second example stops after 2 steps of the first segment, so it is
+      # at a different slot than the first one when both continue.
+      _, state = tf.nn.dynamic_rnn(
+          transformer_xl, inputs[0], sequence_length=[num_steps, 2],
+          initial_state=transformer_xl.initial_state(batch_size))
+      outputs, final_state = tf.nn.dynamic_rnn(
+          transformer_xl, inputs[1], initial_state=state)
+      return transformer_xl, state, outputs, final_state
+
+    transformer_xl, state, outputs, final_state = build(False)
+    (ring_transformer_xl, ring_state, ring_outputs,
+     ring_final_state) = build(True)
+    copy_variables = _copy_variables(transformer_xl, ring_transformer_xl)
+    with self.test_session() as session:
+      tf.global_variables_initializer().run()
+      session.run(copy_variables)
+      ring_state_v, outputs_v, ring_outputs_v = session.run(
+          [ring_state, outputs, ring_outputs])
+      final_state_v, ring_final_state_v = session.run(
+          [final_state, ring_final_state])
+
+    for ring_state_i_v in ring_state_v:
+      self.assertAllEqual(ring_state_i_v.index,
+                          [[num_steps % memory_size], [2]])
+    self.assertAllClose(outputs_v, ring_outputs_v, atol=1e-5)
+    for state_i_v, ring_state_i_v in zip(final_state_v, ring_final_state_v):
+      self.assertAllClose(state_i_v, _ring_in_time_order(ring_state_i_v),
+                          atol=1e-5)
+
 
 class CompressiveTransformerTest(tf.test.TestCase):
 
@@ -391,6 +719,72 @@ class CompressiveTransformerTest(tf.test.TestCase):
     # Compression loss is > 0 because em is populated.
     self.assertGreater(compression_loss_np[1], 0)
 
+  def _check_ring_memory(self, chunk_size, num_steps):
+    """Checks ring buffer memories do not change the outputs or memories."""
+    batch_size = 2
+    episodic_memory_size = 6
+    compressed_memory_size = 3
+    compression_rate = 2
+    core_config = {
+        'key_size': 3,
+        'value_size': 4,
+        'num_heads': 5,
+        'num_layers': 2,
+        'dropout_rate': 0.,
+    }
+    inputs = tf.random_normal([num_steps, batch_size, chunk_size, 16])
+
+    def build(ring_memory):
+      compressive_transformer = snt.nets.CompressiveTransformer(
+          core_config=core_config,
+          episodic_memory_size=episodic_memory_size,
+          compressed_memory_size=compressed_memory_size,
+          compression_rate=compression_rate,
+          chunk_size=chunk_size,
+          ring_memory=ring_memory)
+      state = compressive_transformer.initial_state(batch_size)
+      outputs = []
+      for t in range(num_steps):
+        output, state = compressive_transformer(
+            inputs[t], state, is_training=False)
+        outputs.append(output)
+      return compressive_transformer, outputs, state
+
+    compressive_transformer, outputs, state = build(False)
+    ring_compressive_transformer, ring_outputs, ring_state = build(True)
+    copy_variables = _copy_variables(compressive_transformer,
+                                     ring_compressive_transformer)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      sess.run(copy_variables)
+      outputs_v, ring_outputs_v, state_v, ring_state_v = sess.run(
+          [outputs, ring_outputs, state, ring_state])
+    self.assertAllClose(outputs_v, ring_outputs_v, atol=1e-5)
+    for state_i_v, ring_state_i_v in zip(state_v, ring_state_v):
+      self.assertAllEqual(ring_state_i_v.index, [[num_steps]] * batch_size)
+      self.assertAllClose(
+          state_i_v.episodic_memory,
+          _ring_in_time_order(ring_state_i_v.episodic_memory), atol=1e-5)
+      self.assertAllClose(
+          state_i_v.compressed_memory,
+          _ring_in_time_order(ring_state_i_v.compressed_memory), atol=1e-5)
+    return ring_state_v
+
+  def test_ring_memory(self):
+    self._check_ring_memory(chunk_size=4, num_steps=4)
+
+  def test_ring_memory_single_step(self):
+    """Checks the ring memories when compressing every other step."""
+    num_steps = 8
+    ring_state_v = self._check_ring_memory(chunk_size=1, num_steps=num_steps)
+    for ring_state_i_v in ring_state_v:
+      # One element is written to the episodic memory per step, and one
+      # compressed element every `compression_rate` steps.
+      self.assertAllEqual(ring_state_i_v.episodic_memory.index,
+                          [[num_steps % 6]] * 2)
+      self.assertAllEqual(ring_state_i_v.compressed_memory.index,
+                          [[num_steps // 2 % 3]] * 2)
+
 
 if __name__ == '__main__':
   tf.test.main()
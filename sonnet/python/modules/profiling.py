@@ -0,0 +1,208 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tools for profiling the graph construction cost of Sonnet modules."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import contextlib
+import time
+
+# Dependency imports
+from absl import logging
+import contextlib2
+from sonnet.python.modules import base
+from sonnet.python.modules import util
+import tensorflow.compat.v1 as tf
+
+
+ConnectionProfile = collections.namedtuple(
+    "ConnectionProfile",
+    ("scope_name", "class_name", "name_scope", "wall_time", "num_ops",
+     "variable_bytes"))
+
+
+ModuleProfile = collections.namedtuple(
+    "ModuleProfile",
+    ("scope_name", "class_name", "num_connections", "wall_time", "num_ops",
+     "variable_bytes"))
+
+
+# Fields of `ModuleProfile` which can be used to sort the summary. Numeric
+# fields are sorted in descending order, names in ascending order.
+_SORT_KEYS = ("wall_time", "num_ops", "variable_bytes", "num_connections",
+              "scope_name")
+
+
+class _PendingConnection(object):
+  """Book-keeping for a module connection which has not finished yet."""
+
+  def __init__(self, module, graph):
+    self.module = module
+    self.graph = graph
+    self.start_version = graph.version
+    self.variable_bytes = 0
+    self.start_time = time.time()
+
+
+class ConnectionProfiler(object):
+  """Records the graph construction cost of every Sonnet module connection.
+
+  For each connection the profiler records the wall time spent inside the
+  module's `__call__`, the number of ops added to the graph and the number of
+  bytes of variables created. All three quantities are inclusive: the cost of a
+  module includes the cost of any submodules connected inside it.
+
+  Use `profile_connections` to create a profiler and activate it.
+  """
+
+  def __init__(self):
+    self._records = []
+    self._pending = []
+
+  @property
+  def records(self):
+    """Returns a tuple of `ConnectionProfile`s, in order of completion."""
+    return tuple(self._records)
+
+  def _connection_started(self, module):
+    self._pending.append(_PendingConnection(module, tf.get_default_graph()))
+
+  def _connection_finished(self, connected_subgraph):
+    """Completes the pending record matching `connected_subgraph`."""
+    module = connected_subgraph.module
+    for index in range(len(self._pending) - 1, -1, -1):
+      if self._pending[index].module is module:
+        break
+    else:
+      # Connections made via `snt.reuse_variables` methods are observed without
+      # having been started, so there is nothing to measure.
+      return
+
+    pending = self._pending[index]
+    # Entries above `index` belong to connections which raised an error.
+    del self._pending[index:]
+    self._records.append(ConnectionProfile(
+        scope_name=module.scope_name,
+        class_name=module.__class__.__name__,
+        name_scope=connected_subgraph.name_scope,
+        wall_time=time.time() - pending.start_time,
+        num_ops=pending.graph.version - pending.start_version,
+        variable_bytes=pending.variable_bytes))
+
+  def _variable_created(self, variable):
+    num_elements = variable.shape.num_elements() or 0
+    num_bytes = num_elements * variable.dtype.base_dtype.size
+    for pending in self._pending:
+      pending.variable_bytes += num_bytes
+
+  def summary(self, sort_by="wall_time"):
+    """Returns the recorded costs aggregated over the connections of a module.
+
+    Args:
+      sort_by: Field of `ModuleProfile` to sort by, one of "wall_time",
+        "num_ops", "variable_bytes", "num_connections" or "scope_name".
+
+    Returns:
+      A list of `ModuleProfile`s, one per profiled module.
+
+    Raises:
+      ValueError: If `sort_by` is not a valid sort key.
+    """
+    if sort_by not in _SORT_KEYS:
+      raise ValueError("Invalid sort key '{}', must be one of {}.".format(
+          sort_by, ", ".join(_SORT_KEYS)))
+
+    totals = collections.OrderedDict()
+    for record in self._records:
+      key = (record.scope_name, record.class_name)
+      num_connections, wall_time, num_ops, variable_bytes = totals.get(
+          key, (0, 0., 0, 0))
+      totals[key] = (num_connections + 1,
+                     wall_time + record.wall_time,
+                     num_ops + record.num_ops,
+                     variable_bytes + record.variable_bytes)
+
+    profiles = [ModuleProfile(scope_name, class_name, *values)
+                for (scope_name, class_name), values in totals.items()]
+    return sorted(profiles, key=lambda profile: getattr(profile, sort_by),
+                  reverse=(sort_by != "scope_name"))
+
+  def format(self, sort_by="wall_time", join_lines=True):
+    """Formats the summary of the recorded costs as a table.
+
+    Args:
+      sort_by: Field to sort by, see `summary`.
+      join_lines: If `True` returns a single string, otherwise a generator of
+        rows.
+
+    Returns:
+      The formatted table.
+    """
+    rows = [("Module", "Type", "Connections", "Wall time", "Ops",
+             "Variables")]
+    for profile in self.summary(sort_by=sort_by):
+      rows.append((profile.scope_name,
+                   profile.class_name,
+                   str(profile.num_connections),
+                   "%.3f ms" % (profile.wall_time * 1000.),
+                   str(profile.num_ops),
+                   util._num_bytes_to_human_readable(profile.variable_bytes)))  # pylint: disable=protected-access
+    return util._format_table(rows, join_lines)  # pylint: disable=protected-access
+
+  def log(self, sort_by="wall_time"):
+    """Logs the summary of the recorded costs as a table.
+
+    Args:
+      sort_by: Field to sort by, see `summary`.
+    """
+    for row in self.format(sort_by=sort_by, join_lines=False):
+      logging.info(row)
+
+
+@contextlib.contextmanager
+def profile_connections():
+  """Profiles the graph construction cost of all modules connected inside.
+
+  For example:
+
+  ```python
+  with snt.profile_connections() as profiler:
+    logits = model(images)
+
+  profiler.log(sort_by="num_ops")
+  ```
+
+  Only connections made in graph mode are profiled. Variable sizes are only
+  recorded for variables created in the default graph at the time the context
+  is entered.
+
+  Yields:
+    A `ConnectionProfiler`, which is populated as modules are connected.
+  """
+  profiler = ConnectionProfiler()
+  # pylint: disable=protected-access
+  with contextlib2.ExitStack() as stack:
+    stack.enter_context(
+        base.observe_connection_starts(profiler._connection_started))
+    stack.enter_context(
+        base.observe_connections(profiler._connection_finished))
+    stack.enter_context(
+        util.notify_about_new_variables(profiler._variable_created))
+    yield profiler
+  # pylint: enable=protected-access
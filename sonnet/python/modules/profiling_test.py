@@ -0,0 +1,140 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for sonnet.python.modules.profiling."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+# Dependency imports
+from absl.testing import parameterized
+import sonnet as snt
+import tensorflow.compat.v1 as tf
+
+
+class ProfileConnectionsTest(parameterized.TestCase, tf.test.TestCase):
+
+  def setUp(self):
+    super(ProfileConnectionsTest, self).setUp()
+    self._inputs = tf.zeros(shape=(3, 4), dtype=tf.float32)
+
+  def testRecordsSingleConnection(self):
+    linear = snt.Linear(output_size=5)
+    with snt.profile_connections() as profiler:
+      linear(self._inputs)
+
+    self.assertLen(profiler.records, 1)
+    record = profiler.records[0]
+    self.assertEqual(record.scope_name, linear.scope_name)
+    self.assertEqual(record.class_name, "Linear")
+    self.assertEqual(record.name_scope, linear.name_scopes[0])
+    self.assertGreater(record.num_ops, 0)
+    self.assertGreaterEqual(record.wall_time, 0.)
+    # Weights and bias, float32.
+    self.assertEqual(record.variable_bytes, (4 * 5 + 5) * 4)
+
+  def testVariablesOnlyCountedOnce(self):
+    linear = snt.Linear(output_size=5)
+    with snt.profile_connections() as profiler:
+      linear(self._inputs)
+      linear(self._inputs)
+
+    self.assertLen(profiler.records, 2)
+    self.assertGreater(profiler.records[0].variable_bytes, 0)
+    self.assertEqual(profiler.records[1].variable_bytes, 0)
+
+    summary = profiler.summary()
+    self.assertLen(summary, 1)
+    self.assertEqual(summary[0].num_connections, 2)
+    self.assertEqual(summary[0].num_ops,
+                     sum(record.num_ops for record in profiler.records))
+
+  def testNestedModulesAreInclusive(self):
+    linear_1 = snt.Linear(output_size=5, name="linear_1")
+    linear_2 = snt.Linear(output_size=6, name="linear_2")
+    seq = snt.Sequential([linear_1, tf.nn.relu, linear_2])
+    with snt.profile_connections() as profiler:
+      seq(self._inputs)
+
+    self.assertEqual([record.scope_name for record in profiler.records],
+                     [linear_1.scope_name, linear_2.scope_name,
+                      seq.scope_name])
+    inner_1, inner_2, outer = profiler.records
+    self.assertEqual(outer.variable_bytes,
+                     inner_1.variable_bytes + inner_2.variable_bytes)
+    self.assertGreater(outer.num_ops, inner_1.num_ops + inner_2.num_ops)
+    self.assertGreaterEqual(outer.wall_time,
+                            inner_1.wall_time + inner_2.wall_time)
+
+  def testNotRecordingOutsideContext(self):
+    linear = snt.Linear(output_size=5)
+    with snt.profile_connections() as profiler:
+      pass
+    linear(self._inputs)
+    self.assertEmpty(profiler.records)
+
+  def testFailedConnectionIsDiscarded(self):
+    def raise_error(unused_inputs):
+      raise ValueError("Error in build.")
+
+    failing = snt.Module(raise_error)
+    linear = snt.Linear(output_size=5)
+    with snt.profile_connections() as profiler:
+      with self.assertRaises(ValueError):
+        failing(self._inputs)
+      linear(self._inputs)
+
+    self.assertLen(profiler.records, 1)
+    self.assertEqual(profiler.records[0].scope_name, linear.scope_name)
+
+  @parameterized.parameters(
+      "wall_time", "num_ops", "variable_bytes", "num_connections")
+  def testSummarySortedDescending(self, sort_by):
+    small = snt.Linear(output_size=1, name="small")
+    large = snt.Linear(output_size=100, name="large")
+    with snt.profile_connections() as profiler:
+      small(self._inputs)
+      large(self._inputs)
+      large(self._inputs)
+
+    values = [getattr(profile, sort_by)
+              for profile in profiler.summary(sort_by=sort_by)]
+    self.assertEqual(values, sorted(values, reverse=True))
+
+  def testSummaryInvalidSortKey(self):
+    with snt.profile_connections() as profiler:
+      pass
+    with self.assertRaisesRegexp(ValueError, "Invalid sort key"):
+      profiler.summary(sort_by="foo")
+
+  def testFormat(self):
+    linear = snt.Linear(output_size=5, name="lin")
+    with snt.profile_connections() as profiler:
+      linear(self._inputs)
+
+    lines = profiler.format(sort_by="scope_name").split("\n")
+    self.assertLen(lines, 2)
+    self.assertEqual(lines[0].split(),
+                     ["Module", "Type", "Connections", "Wall", "time", "Ops",
+                      "Variables"])
+    columns = lines[1].split()
+    self.assertEqual(columns[:3], ["lin", "Linear", "1"])
+    self.assertEqual(columns[-2:], ["100", "B"])
+    profiler.log()
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -168,6 +168,115 @@ def trainable_initial_state(batch_size, state_size, dtype, initializers=None,
                                flat_sequence=flat_initial_state)
 
 
+def dynamic_unroll(step_fn, output_size, input_sequence, initial_state,
+                   sequence_length=None, keep_states=False,
+                   parallel_iterations=32, swap_memory=False):
+  """Unrolls a recurrent step function over a sequence in a `tf.while_loop`.
+
+  Steps past the length of an example leave its state unchanged and produce
+  zero outputs, as in `tf.nn.dynamic_rnn`. The loop stops after the longest
+  sequence of the batch, and the size of the graph does not depend on the
+  number of steps.
+
+  Args:
+    step_fn: Callable mapping `(inputs, prev_state)` to `(output,
+      next_state)`, typically an `RNNCore`.
+    output_size: Nested structure of the output sizes of `step_fn`, setting the
+      static shapes of the output sequences. The sizes must match the shapes
+      of the outputs of each step, excluding the batch dimension, otherwise a
+      shape error is raised.
+    input_sequence: Tensor (or nested structure of tensors) of size
+      `[time, batch_size, ...]`.
+    initial_state: Initial state of `step_fn`.
+    sequence_length: Optional `[batch_size]` integer tensor of the lengths of
+      the examples.
+    keep_states: Whether to also return the state after each step.
+    parallel_iterations: Number of iterations of the loop run in parallel.
+    swap_memory: Whether to swap the loop activations to host memory.
+
+  Returns:
+    A tuple `(output_sequence, final_state, state_sequence)` where the output
+    and state sequences are time major, and `state_sequence` is `None` unless
+    `keep_states` is `True`.
+  """
+  flat_inputs = nest.flatten(input_sequence)
+  num_steps = tf.shape(flat_inputs[0])[0]
+  time_shape = flat_inputs[0].shape[:1]
+  if sequence_length is not None:
+    sequence_length = tf.cast(sequence_length, tf.int32)
+    loop_steps = tf.minimum(num_steps, tf.reduce_max(sequence_length))
+  else:
+    loop_steps = num_steps
+
+  inputs_arrays = nest.map_structure(
+      lambda x: tf.TensorArray(  # pylint: disable=g-long-lambda
+          x.dtype, size=num_steps, element_shape=x.shape[1:]).unstack(x),
+      input_sequence)
+  # As in `tf.nn.dynamic_rnn`, outputs are assumed to have the dtype of the
+  # state.
+  output_dtype = nest.flatten(initial_state)[0].dtype
+  static_batch_shape = flat_inputs[0].shape[1:2]
+  outputs_arrays = nest.map_structure(
+      lambda size: tf.TensorArray(  # pylint: disable=g-long-lambda
+          output_dtype, size=loop_steps,
+          element_shape=static_batch_shape.concatenate(size)),
+      output_size)
+  states_arrays = ()
+  if keep_states:
+    states_arrays = nest.map_structure(
+        lambda s: tf.TensorArray(s.dtype, size=loop_steps,  # pylint: disable=g-long-lambda
+                                 element_shape=s.shape),
+        initial_state)
+
+  def body(t, state, outputs_arrays, states_arrays):
+    inputs = nest.map_structure(lambda ta: ta.read(t), inputs_arrays)
+    output, next_state = step_fn(inputs, state)
+    if sequence_length is not None:
+      valid = t < sequence_length
+      output = nest.map_structure(
+          lambda o: tf.where(valid, o, tf.zeros_like(o)), output)
+      next_state = nest.map_structure(
+          lambda new, old: tf.where(valid, new, old), next_state, state)
+    outputs_arrays = nest.map_structure(
+        lambda ta, o: ta.write(t, o), outputs_arrays, output)
+    if keep_states:
+      states_arrays = nest.map_structure(
+          lambda ta, s: ta.write(t, s), states_arrays, next_state)
+    return t + 1, next_state, outputs_arrays, states_arrays
+
+  _, final_state, outputs_arrays, states_arrays = tf.while_loop(
+      cond=lambda t, *unused_args: t < loop_steps,
+      body=body,
+      loop_vars=(tf.constant(0), initial_state, outputs_arrays, states_arrays),
+      parallel_iterations=parallel_iterations,
+      swap_memory=swap_memory)
+
+  # Steps after the longest sequence were not computed, their outputs are
+  # zero and their states those of the last step of each sequence.
+  def stack_outputs(ta):
+    stacked = ta.stack()
+    padding = [[0, num_steps - loop_steps]] + [[0, 0]] * (
+        stacked.shape.ndims - 1)
+    padded = tf.pad(stacked, padding)
+    padded.set_shape(time_shape.concatenate(stacked.shape[1:]))
+    return padded
+
+  def stack_states(ta, last):
+    stacked = ta.stack()
+    multiples = tf.concat([[num_steps - loop_steps],
+                           tf.ones([last.shape.ndims], tf.int32)], 0)
+    padded = tf.concat([stacked, tf.tile(last[tf.newaxis], multiples)], 0)
+    padded.set_shape(time_shape.concatenate(last.shape))
+    return padded
+
+  output_sequence = nest.map_structure(stack_outputs, outputs_arrays)
+  state_sequence = None
+  if keep_states:
+    state_sequence = nest.map_structure(stack_states, states_arrays,
+                                        final_state)
+  return output_sequence, final_state, state_sequence
+
+
 @six.add_metaclass(abc.ABCMeta)
 class RNNCore(base.AbstractModule):
   """Superclass for Recurrent Neural Network Cores.
@@ -0,0 +1,246 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Module sampling token sequences from an RNN core inside a `tf.while_loop`."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+# Dependency imports
+from sonnet.python.modules import base
+import tensorflow.compat.v1 as tf
+from tensorflow.contrib import framework as contrib_framework
+
+nest = contrib_framework.nest
+
+
+MULTINOMIAL = "multinomial"
+TOP_K = "top_k"
+BEAM_SEARCH = "beam_search"
+
+_STRATEGIES = (MULTINOMIAL, TOP_K, BEAM_SEARCH)
+
+# Score given to the initially empty beams, low enough never to be selected
+# while avoiding the NaNs `-inf` would produce.
+_EMPTY_BEAM_SCORE = -1e9
+
+
+SamplerOutput = collections.namedtuple("SamplerOutput", ("tokens", "scores"))
+
+
+class RNNSampler(base.AbstractModule):
+  """Samples sequences of tokens from an `RNNCore` with a `tf.while_loop`.
+
+  At each step a token is chosen from the current logits, fed back through
+  `embed` and `core`, and `output` maps the core output to the logits of the
+  next step. Since the steps are built once inside a `tf.while_loop`, the size
+  of the graph does not depend on the number of tokens sampled.
+
+  ```python
+  sampler = snt.RNNSampler(
+      core=lstm,
+      embed=lambda ids: embed_module(ids),
+      output=output_linear,
+      strategy=snt.TOP_K,
+      top_k=5)
+  tokens, log_probs = sampler(initial_logits, initial_state,
+                              sequence_length=1000)
+  ```
+
+  Three strategies are supported:
+
+  * `MULTINOMIAL`: tokens are sampled from the softmax of the logits.
+  * `TOP_K`: tokens are sampled among the `top_k` most likely ones.
+  * `BEAM_SEARCH`: keeps the `beam_width` most likely sequences of each batch
+    element, using the sum of the token log probabilities as score.
+
+  With every strategy, the returned scores are the log probabilities of the
+  sequences under the model, i.e. the softmax of the unscaled logits. They do
+  not depend on `temperature` nor `top_k`, which only change how the tokens
+  are selected, so that the scores of different strategies can be compared.
+  """
+
+  def __init__(self, core, embed, output, strategy=MULTINOMIAL, top_k=None,
+               beam_width=None, temperature=1.0, name="rnn_sampler"):
+    """Constructs an `RNNSampler`.
+
+    Args:
+      core: `RNNCore` to sample from.
+      embed: Callable mapping a `[batch_size]` int32 tensor of tokens to the
+        inputs of `core`.
+      output: Callable mapping the outputs of `core` to `[batch_size,
+        num_tokens]` logits.
+      strategy: One of `MULTINOMIAL`, `TOP_K` or `BEAM_SEARCH`.
+      top_k: Number of most likely tokens to sample among, for `TOP_K`.
+      beam_width: Number of sequences kept per batch element, for
+        `BEAM_SEARCH`.
+      temperature: Logits are divided by this before sampling. Only used by
+        `MULTINOMIAL` and `TOP_K`.
+      name: Name of the module.
+
+    Raises:
+      ValueError: If `strategy` is unknown, or if `top_k` or `beam_width` is
+        not a positive integer when required by `strategy`.
+    """
+    super(RNNSampler, self).__init__(name=name)
+    if strategy not in _STRATEGIES:
+      raise ValueError("Unknown strategy '{}', must be one of {}.".format(
+          strategy, ", ".join(_STRATEGIES)))
+    if strategy == TOP_K and (top_k is None or top_k < 1):
+      raise ValueError("top_k must be a positive integer, got {}.".format(
+          top_k))
+    if strategy == BEAM_SEARCH and (beam_width is None or beam_width < 1):
+      raise ValueError("beam_width must be a positive integer, got {}.".format(
+          beam_width))
+
+    self._core = core
+    self._embed = embed
+    self._output = output
+    self._strategy = strategy
+    self._top_k = top_k
+    self._beam_width = beam_width
+    self._temperature = temperature
+
+  def _sample(self, logits):
+    """Returns a `[batch_size]` int32 tensor of tokens sampled from `logits`."""
+    logits /= self._temperature
+    if self._strategy == TOP_K:
+      top_logits, top_indices = tf.nn.top_k(logits, k=self._top_k)
+      choice = tf.random.categorical(top_logits, 1, dtype=tf.int32)
+      return tf.gather(top_indices, choice[:, 0], batch_dims=1)
+    return tf.random.categorical(logits, 1, dtype=tf.int32)[:, 0]
+
+  def _step(self, tokens, state):
+    """Feeds `tokens` to the core and returns the next logits and state."""
+    core_output, next_state = self._core(self._embed(tokens), state)
+    return self._output(core_output), next_state
+
+  def _build(self, initial_logits, initial_state, sequence_length):
+    """Samples sequences of tokens.
+
+    Args:
+      initial_logits: `[batch_size, num_tokens]` logits of the first token.
+      initial_state: State of `core` after the step producing
+        `initial_logits`.
+      sequence_length: Number of tokens to sample, a Python integer or scalar
+        int32 tensor.
+
+    Returns:
+      A `SamplerOutput` of:
+        tokens: int32 tensor of sampled tokens of size `[sequence_length,
+          batch_size]`, or `[sequence_length, batch_size, beam_width]` for
+          `BEAM_SEARCH`, with the beams sorted by decreasing score.
+        scores: Sum of the log probabilities of the sampled tokens under the
+          unscaled logits, of size `[batch_size]`, or `[batch_size,
+          beam_width]` for `BEAM_SEARCH`.
+    """
+    if self._strategy == BEAM_SEARCH:
+      return self._beam_search(initial_logits, initial_state, sequence_length)
+
+    batch_size = tf.shape(initial_logits)[0]
+    tokens_array = tf.TensorArray(tf.int32, size=sequence_length,
+                                  element_shape=initial_logits.shape[:1])
+
+    def body(t, logits, state, scores, tokens_array):
+      tokens = self._sample(logits)
+      # Scored under the model rather than the tempered or truncated
+      # distribution the tokens are sampled from, see the class docstring.
+      log_probs = tf.nn.log_softmax(logits)
+      scores += tf.gather(log_probs, tokens, batch_dims=1)
+      next_logits, next_state = self._step(tokens, state)
+      return (t + 1, next_logits, next_state, scores,
+              tokens_array.write(t, tokens))
+
+    _, _, _, scores, tokens_array = tf.while_loop(
+        cond=lambda t, *unused_args: t < sequence_length,
+        body=body,
+        loop_vars=(tf.constant(0), initial_logits, initial_state,
+                   tf.zeros([batch_size], dtype=initial_logits.dtype),
+                   tokens_array))
+    return SamplerOutput(tokens=tokens_array.stack(), scores=scores)
+
+  def _beam_search(self, initial_logits, initial_state, sequence_length):
+    """Beam search decoding, see `_build`."""
+    beam_width = self._beam_width
+    batch_size = tf.shape(initial_logits)[0]
+    num_tokens = tf.shape(initial_logits)[1]
+
+    # The beams of each batch element are flattened into the batch dimension,
+    # as `[batch_size * beam_width, ...]`.
+    def tile_beams(tensor):
+      multiples = [1, beam_width] + [1] * (tensor.shape.ndims - 1)
+      tiled = tf.tile(tf.expand_dims(tensor, 1), multiples)
+      tiled = tf.reshape(tiled, tf.concat([[-1], tf.shape(tensor)[1:]], 0))
+      tiled.set_shape(tf.TensorShape([None]).concatenate(tensor.shape[1:]))
+      return tiled
+
+    # Only the first beam is live initially, so that the first step selects
+    # `beam_width` distinct tokens.
+    initial_scores = tf.tile(
+        tf.concat([[0.], tf.fill([beam_width - 1], _EMPTY_BEAM_SCORE)], 0)
+        [tf.newaxis], [batch_size, 1])
+    initial_scores = tf.cast(initial_scores, initial_logits.dtype)
+    beam_offsets = tf.range(batch_size)[:, tf.newaxis] * beam_width
+
+    tokens_array = tf.TensorArray(tf.int32, size=sequence_length)
+    parents_array = tf.TensorArray(tf.int32, size=sequence_length)
+
+    def body(t, logits, state, scores, tokens_array, parents_array):
+      log_probs = tf.reshape(tf.nn.log_softmax(logits),
+                             [batch_size, beam_width, num_tokens])
+      candidate_scores = tf.reshape(
+          scores[:, :, tf.newaxis] + log_probs, [batch_size, -1])
+      scores, indices = tf.nn.top_k(candidate_scores, k=beam_width)
+      parents = indices // num_tokens
+      tokens = indices % num_tokens
+
+      flat_parents = tf.reshape(parents + beam_offsets, [-1])
+      state = nest.map_structure(
+          lambda s: tf.gather(s, flat_parents), state)
+      next_logits, next_state = self._step(tf.reshape(tokens, [-1]), state)
+      return (t + 1, next_logits, next_state, scores,
+              tokens_array.write(t, tokens),
+              parents_array.write(t, parents))
+
+    _, _, _, scores, tokens_array, parents_array = tf.while_loop(
+        cond=lambda t, *unused_args: t < sequence_length,
+        body=body,
+        loop_vars=(tf.constant(0),
+                   tile_beams(initial_logits),
+                   nest.map_structure(tile_beams, initial_state),
+                   initial_scores,
+                   tokens_array,
+                   parents_array))
+
+    # Follows the parent pointers back from the final beams to recover their
+    # tokens.
+    def backtrack(t, beams, sequences_array):
+      sequences_array = sequences_array.write(
+          t, tf.gather(tokens_array.read(t), beams, batch_dims=1))
+      beams = tf.gather(parents_array.read(t), beams, batch_dims=1)
+      return t - 1, beams, sequences_array
+
+    _, _, sequences_array = tf.while_loop(
+        cond=lambda t, *unused_args: t >= 0,
+        body=backtrack,
+        loop_vars=(sequence_length - 1,
+                   tf.tile(tf.range(beam_width)[tf.newaxis], [batch_size, 1]),
+                   tf.TensorArray(tf.int32, size=sequence_length)))
+    tokens = sequences_array.stack()
+    tokens.set_shape([None, initial_logits.shape[0], beam_width])
+    return SamplerOutput(tokens=tokens, scores=scores)
@@ -0,0 +1,106 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Benchmarks for sonnet.python.modules.rnn_sampler.
+
+Compares sampling with `snt.RNNSampler` to a sampling loop unrolled in Python.
+Run with `python rnn_sampler_benchmark.py --benchmarks=.`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+# Dependency imports
+import sonnet as snt
+import tensorflow.compat.v1 as tf
+
+
+_BATCH_SIZE = 32
+_VOCAB_SIZE = 96
+_HIDDEN_SIZE = 128
+_SEQUENCE_LENGTH = 1000
+_NUM_RUNS = 5
+
+
+class RNNSamplerBenchmark(tf.test.Benchmark):
+  """Build time and tokens per second of sampling strategies."""
+
+  def _benchmark_sampling(self, name, sample_fn, num_sequences=_BATCH_SIZE):
+    with tf.Graph().as_default():
+      core = snt.LSTM(hidden_size=_HIDDEN_SIZE)
+      embed = snt.Embed(vocab_size=_VOCAB_SIZE, embed_dim=_HIDDEN_SIZE)
+      output = snt.Linear(_VOCAB_SIZE)
+      initial_logits = tf.zeros([_BATCH_SIZE, _VOCAB_SIZE])
+      initial_state = core.initial_state(_BATCH_SIZE)
+
+      start_time = time.time()
+      tokens = sample_fn(core, embed, output, initial_logits, initial_state)
+      build_time = time.time() - start_time
+      num_ops = len(tf.get_default_graph().get_operations())
+
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        sess.run(tokens)
+        start_time = time.time()
+        for _ in range(_NUM_RUNS):
+          sess.run(tokens)
+        run_time = (time.time() - start_time) / _NUM_RUNS
+
+    self.report_benchmark(
+        name=name,
+        iters=_NUM_RUNS,
+        wall_time=run_time,
+        extras={"tokens_per_second":
+                    _SEQUENCE_LENGTH * num_sequences / run_time,
+                "build_time": build_time,
+                "num_ops": num_ops})
+
+  def benchmark_python_unrolled_multinomial(self):
+    def sample_fn(core, embed, output, logits, state):
+      tokens = []
+      for _ in range(_SEQUENCE_LENGTH):
+        token = tf.random.categorical(logits, 1, dtype=tf.int32)[:, 0]
+        tokens.append(token)
+        core_output, state = core(embed(token), state)
+        logits = output(core_output)
+      return tf.stack(tokens)
+    self._benchmark_sampling("python_unrolled_multinomial", sample_fn)
+
+  def _sampler_fn(self, **kwargs):
+    def sample_fn(core, embed, output, logits, state):
+      sampler = snt.RNNSampler(core, embed, output, **kwargs)
+      return sampler(logits, state, _SEQUENCE_LENGTH).tokens
+    return sample_fn
+
+  def benchmark_while_loop_multinomial(self):
+    self._benchmark_sampling("while_loop_multinomial",
+                             self._sampler_fn(strategy=snt.MULTINOMIAL))
+
+  def benchmark_while_loop_top_k(self):
+    self._benchmark_sampling("while_loop_top_k",
+                             self._sampler_fn(strategy=snt.TOP_K, top_k=10))
+
+  def benchmark_while_loop_beam_search(self):
+    self._benchmark_sampling(
+        "while_loop_beam_search",
+        self._sampler_fn(strategy=snt.BEAM_SEARCH, beam_width=4),
+        num_sequences=_BATCH_SIZE * 4)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,138 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for sonnet.python.modules.rnn_sampler."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+# Dependency imports
+from absl.testing import parameterized
+import numpy as np
+import sonnet as snt
+import tensorflow.compat.v1 as tf
+
+
+class RNNSamplerTest(parameterized.TestCase, tf.test.TestCase):
+
+  def setUp(self):
+    super(RNNSamplerTest, self).setUp()
+    self.batch_size = 3
+    self.vocab_size = 7
+    self.sequence_length = 6
+    self.core = snt.LSTM(hidden_size=5)
+    self.embed = snt.Embed(vocab_size=self.vocab_size, embed_dim=4)
+    self.output = snt.Linear(self.vocab_size)
+    self.initial_logits = tf.random_normal([self.batch_size, self.vocab_size])
+    self.initial_state = self.core.initial_state(self.batch_size)
+
+  def _sample(self, sequence_length=None, **kwargs):
+    sampler = snt.RNNSampler(self.core, self.embed, self.output, **kwargs)
+    if sequence_length is None:
+      sequence_length = self.sequence_length
+    return sampler(self.initial_logits, self.initial_state, sequence_length)
+
+  @parameterized.parameters(
+      {"strategy": snt.MULTINOMIAL},
+      {"strategy": snt.TOP_K, "top_k": 3},
+      {"strategy": snt.BEAM_SEARCH, "beam_width": 4})
+  def testShape(self, **kwargs):
+    tokens, scores = self._sample(**kwargs)
+    self.evaluate(tf.global_variables_initializer())
+    tokens_v, scores_v = self.evaluate([tokens, scores])
+
+    expected_shape = [self.sequence_length, self.batch_size]
+    if kwargs["strategy"] == snt.BEAM_SEARCH:
+      expected_shape.append(kwargs["beam_width"])
+    self.assertEqual(list(tokens_v.shape), expected_shape)
+    self.assertEqual(list(scores_v.shape), expected_shape[1:])
+    self.assertTrue(np.all(tokens_v >= 0))
+    self.assertTrue(np.all(tokens_v < self.vocab_size))
+    self.assertTrue(np.all(scores_v <= 0.))
+
+  def testGreedyDecodingsMatch(self):
+    top_1 = self._sample(strategy=snt.TOP_K, top_k=1)
+    beam_1 = self._sample(strategy=snt.BEAM_SEARCH, beam_width=1)
+    self.evaluate(tf.global_variables_initializer())
+    (top_1_tokens, top_1_scores), (beam_1_tokens, beam_1_scores) = (
+        self.evaluate([top_1, beam_1]))
+
+    self.assertAllEqual(top_1_tokens, beam_1_tokens[:, :, 0])
+    self.assertAllClose(top_1_scores, beam_1_scores[:, 0])
+
+  def testScoresIgnoreTemperature(self):
+    tempered = self._sample(strategy=snt.TOP_K, top_k=1, temperature=0.5)
+    greedy = self._sample(strategy=snt.TOP_K, top_k=1)
+    self.evaluate(tf.global_variables_initializer())
+    (tempered_tokens, tempered_scores), (greedy_tokens, greedy_scores) = (
+        self.evaluate([tempered, greedy]))
+
+    self.assertAllEqual(tempered_tokens, greedy_tokens)
+    self.assertAllClose(tempered_scores, greedy_scores)
+    # The scores are those of the model, not of the single top token.
+    self.assertTrue(np.all(greedy_scores < 0.))
+
+  def testBeamSearch(self):
+    greedy = self._sample(strategy=snt.TOP_K, top_k=1)
+    beam = self._sample(strategy=snt.BEAM_SEARCH, beam_width=4)
+    self.evaluate(tf.global_variables_initializer())
+    (_, greedy_scores), (beam_tokens, beam_scores) = self.evaluate(
+        [greedy, beam])
+
+    # Beams are sorted by score, and at least as good as the greedy decoding.
+    self.assertAllEqual(beam_scores, -np.sort(-beam_scores, axis=1))
+    self.assertTrue(np.all(beam_scores[:, 0] >= greedy_scores - 1e-5))
+    # The beams of a batch element are distinct sequences.
+    for b in range(self.batch_size):
+      sequences = set(tuple(beam_tokens[:, b, i]) for i in range(4))
+      self.assertLen(sequences, 4)
+
+  @parameterized.parameters(
+      {"strategy": snt.MULTINOMIAL},
+      {"strategy": snt.BEAM_SEARCH, "beam_width": 2})
+  def testGraphSizeIndependentOfLength(self, **kwargs):
+    # Creates the variables, so that the graphs compared only differ by length.
+    self._sample(sequence_length=1, **kwargs)
+    graph = tf.get_default_graph()
+    num_ops = len(graph.get_operations())
+    self._sample(sequence_length=10, **kwargs)
+    short_num_ops = len(graph.get_operations()) - num_ops
+
+    num_ops = len(graph.get_operations())
+    self._sample(sequence_length=1000, **kwargs)
+    long_num_ops = len(graph.get_operations()) - num_ops
+    self.assertEqual(short_num_ops, long_num_ops)
+
+  def testTensorSequenceLength(self):
+    sequence_length = tf.placeholder(tf.int32, shape=[])
+    tokens, _ = self._sample(sequence_length=sequence_length)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      tokens_v = sess.run(tokens, feed_dict={sequence_length: 9})
+    self.assertEqual(tokens_v.shape, (9, self.batch_size))
+
+  @parameterized.parameters(
+      ({"strategy": "foo"}, "Unknown strategy"),
+      ({"strategy": snt.TOP_K}, "top_k must be a positive integer"),
+      ({"strategy": snt.BEAM_SEARCH, "beam_width": 0},
+       "beam_width must be a positive integer"))
+  def testInvalidArguments(self, kwargs, message):
+    with self.assertRaisesRegexp(ValueError, message):
+      snt.RNNSampler(self.core, self.embed, self.output, **kwargs)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,86 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Assertions shared by the tests of the `unroll` methods of RNN cores."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+# Dependency imports
+import tensorflow.compat.v1 as tf
+from tensorflow.contrib import framework as contrib_framework
+
+nest = contrib_framework.nest
+
+
+class UnrollTestMixin(object):
+  """Compares the `unroll` method of a core to `tf.nn.dynamic_rnn`.
+
+  Meant to be mixed into a `tf.test.TestCase`.
+  """
+
+  def _assert_unroll_matches_dynamic_rnn(self, core, inputs, initial_state,
+                                         sequence_length=None):
+    """Checks `core.unroll` gives the outputs and state of `dynamic_rnn`.
+
+    `core.unroll` is connected first, so `dynamic_rnn` must reuse the
+    variables it created.
+
+    Args:
+      core: RNN core with an `unroll` method.
+      inputs: time major input sequence.
+      initial_state: initial state passed to `core.unroll`. `dynamic_rnn` gets
+        the same Tensors in the structure of `core.state_size`.
+      sequence_length: Optional `[batch_size]` Tensor of sequence lengths.
+
+    Returns:
+      The outputs and final state returned by `core.unroll`.
+    """
+    unroll_output, unroll_state = core.unroll(
+        inputs, initial_state, sequence_length=sequence_length)
+    num_variables = len(core.get_variables())
+    dynamic_output, dynamic_state = tf.nn.dynamic_rnn(
+        core, inputs, sequence_length=sequence_length,
+        initial_state=nest.pack_sequence_as(core.state_size,
+                                            nest.flatten(initial_state)),
+        time_major=True)
+    self.assertLen(core.get_variables(), num_variables)
+    self.assertEqual(unroll_output.get_shape(), dynamic_output.get_shape())
+
+    self.evaluate(tf.global_variables_initializer())
+    unroll_values, dynamic_values = self.evaluate(
+        [(unroll_output, unroll_state), (dynamic_output, dynamic_state)])
+    for unroll_value, dynamic_value in zip(
+        nest.flatten(unroll_values), nest.flatten(dynamic_values)):
+      self.assertAllClose(unroll_value, dynamic_value, atol=1e-5)
+    return unroll_output, unroll_state
+
+  def _assert_unroll_before_build(self, core, inputs, initial_state):
+    """Checks connecting `core` after `core.unroll` reuses its variables.
+
+    Args:
+      core: RNN core with an `unroll` method, not connected yet.
+      inputs: time major input sequence.
+      initial_state: initial state of the core.
+
+    Returns:
+      The variables created by `core.unroll`.
+    """
+    core.unroll(inputs, initial_state)
+    variables = core.get_variables()
+    core(nest.map_structure(lambda x: x[0], inputs), initial_state)
+    self.assertEqual(variables, core.get_variables())
+    return variables
@@ -23,12 +23,14 @@ import contextlib
 import functools
 import importlib
 import inspect
+import operator
 import re
 import weakref
 
 # Dependency imports
 from absl import logging
 import six
+from sonnet.python.modules import async_saver
 import tensorflow.compat.v1 as tf
 import wrapt
 
@@ -59,6 +61,92 @@ def get_variable_scope_name(value):
     raise ValueError("Not a variable scope: {}".format(value))
 
 
+# Name of the graph attribute holding a `_ScopeIndex` per collection.
+_SCOPE_INDICES_ATTR = "_sonnet_scope_indices"
+
+
+class _ScopeIndexNode(object):
+  """Node of a `_ScopeIndex`, corresponding to a single scope."""
+
+  __slots__ = ("children", "entries")
+
+  def __init__(self):
+    self.children = {}
+    # List of (position in collection, entry) of entries directly in the scope.
+    self.entries = []
+
+
+class _ScopeIndex(object):
+  """Trie of the entries of a graph collection, keyed by scope path.
+
+  The index keeps a copy of the indexed entries. On each lookup, the entries of
+  the collection are compared by identity with the copy: the index is updated
+  incrementally with the entries appended since the last lookup, and rebuilt if
+  any indexed entry was removed or replaced. Looking up a scope thus costs a
+  single identity comparison per entry, rather than a name match per entry.
+  """
+
+  def __init__(self):
+    self._reset(None)
+
+  def _reset(self, collection):
+    self._collection = collection
+    self._indexed = []
+    self._root = _ScopeIndexNode()
+
+  def _update(self, collection):
+    """Adds entries appended to `collection` since the last update."""
+    num_indexed = len(self._indexed)
+    if (collection is not self._collection or
+        len(collection) < num_indexed or
+        any(map(operator.is_not, self._indexed, collection))):
+      self._reset(collection)
+      num_indexed = 0
+
+    for position in range(num_indexed, len(collection)):
+      entry = collection[position]
+      try:
+        name = entry.name
+      except AttributeError:
+        # Entries without a name never match a scope, see `tf.get_collection`.
+        continue
+      node = self._root
+      for scope in name.split("/")[:-1]:
+        child = node.children.get(scope)
+        if child is None:
+          child = node.children[scope] = _ScopeIndexNode()
+        node = child
+      node.entries.append((position, entry))
+
+    self._indexed.extend(collection[num_indexed:])
+
+  def lookup(self, collection, scope_name):
+    """Returns the entries of `collection` inside the scope `scope_name`.
+
+    Args:
+      collection: The list of entries of the indexed collection.
+      scope_name: Non-empty name of the scope to look up.
+
+    Returns:
+      A tuple of entries, in the order in which they appear in `collection`.
+    """
+    self._update(collection)
+    node = self._root
+    for scope in scope_name.split("/"):
+      node = node.children.get(scope)
+      if node is None:
+        return ()
+
+    entries = []
+    nodes = [node]
+    while nodes:
+      node = nodes.pop()
+      entries.extend(node.entries)
+      nodes.extend(six.itervalues(node.children))
+    entries.sort(key=lambda position_and_entry: position_and_entry[0])
+    return tuple(entry for _, entry in entries)
+
+
 def get_variables_in_scope(
     scope, collection=tf.GraphKeys.TRAINABLE_VARIABLES):
   """Returns a tuple `tf.Variable`s in a scope for a given collection.
@@ -74,13 +162,25 @@ def get_variables_in_scope(
   """
   scope_name = get_variable_scope_name(scope)
 
-  if scope_name:
-    # Escape the name in case it contains any "." characters. Add a closing
-    # slash so we will not search any scopes that have this scope name as a
-    # prefix.
-    scope_name = re.escape(scope_name) + "/"
-
-  return tuple(tf.get_collection(collection, scope_name))
+  if not scope_name:
+    return tuple(tf.get_collection(collection))
+
+  # Rather than matching the scope name against every entry of the collection,
+  # look up the entries in the subtree of the scope in an index of the
+  # collection. This is equivalent to matching `re.escape(scope_name) + "/"`.
+  graph = tf.get_default_graph()
+  if collection not in graph.get_all_collection_keys():
+    return ()
+  # The indices are stored on the graph (rather than in a weak mapping keyed by
+  # graph) as they refer to the graph's variables, which refer to the graph.
+  graph_indices = getattr(graph, _SCOPE_INDICES_ATTR, None)
+  if graph_indices is None:
+    graph_indices = {}
+    setattr(graph, _SCOPE_INDICES_ATTR, graph_indices)
+  index = graph_indices.get(collection)
+  if index is None:
+    index = graph_indices[collection] = _ScopeIndex()
+  return index.lookup(graph.get_collection_ref(collection), scope_name)
 
 
 def get_variables_in_module(
@@ -429,7 +529,7 @@ def get_normalized_variable_map(
 
 
 def get_saver(scope, collections=(tf.GraphKeys.GLOBAL_VARIABLES,),  # pylint: disable=redefined-outer-name
-              context=None, **kwargs):
+              context=None, asynchronous=False, num_shards=4, **kwargs):
   """Builds a `tf.train.Saver` for the scope or module, with normalized names.
 
   The names of the variables are normalized to remove the scope prefix.
@@ -444,16 +544,27 @@ def get_saver(scope, collections=(tf.GraphKeys.GLOBAL_VARIABLES,),  # pylint: di
         averages variables as well as trainable variables.
     context: Scope or module, identical to or parent of `scope`. If given, this
         will be used as the stripped prefix.
-    **kwargs: Extra keyword arguments to pass to tf.train.Saver.
+    asynchronous: If `True`, returns an `snt.AsyncSaver`, which snapshots the
+        variables to host memory and writes the checkpoint shards in parallel
+        background threads.
+    num_shards: Maximum number of shards written in parallel, only used if
+        `asynchronous` is `True`.
+    **kwargs: Extra keyword arguments to pass to tf.train.Saver (or
+        `snt.AsyncSaver`, which supports `max_to_keep` and
+        `keep_checkpoint_every_n_hours`).
 
   Returns:
-      A `tf.train.Saver` object for Variables in the scope or module.
+      A `tf.train.Saver` (or `snt.AsyncSaver`) object for Variables in the scope
+      or module.
   """
 
   variable_map = {}
   for collection in collections:
     variable_map.update(get_normalized_variable_map(scope, collection, context))
 
+  if asynchronous:
+    return async_saver.AsyncSaver(
+        var_list=variable_map, num_shards=num_shards, **kwargs)
   return tf.train.Saver(var_list=variable_map, **kwargs)
 
 
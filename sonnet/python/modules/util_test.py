@@ -20,6 +20,7 @@ from __future__ import print_function
 import functools
 import itertools
 import os
+import re
 import tempfile
 
 # Dependency imports
@@ -79,6 +80,66 @@ class UtilTest(parameterized.TestCase, tf.test.TestCase):
     self.assertEqual(set(snt.get_variables_in_scope(s2.name)), {v2, v3})
     self.assertEqual(set(snt.get_variables_in_scope("")), {v1, v2, v3})
 
+  def testScopeQueryMatchesCollection(self):
+    scope_names = ["a", "a/b", "a/b/c", "a.b", "ab", "a/b_1", "d"]
+    for scope_name in scope_names:
+      with tf.variable_scope(scope_name):
+        tf.get_variable("v", shape=[1])
+        with tf.variable_scope("inner"):
+          tf.get_variable("w", shape=[1])
+
+    # Query before and after creating more variables, the index must be
+    # updated with the new variables.
+    for suffix in ("", "_new"):
+      for scope_name in scope_names:
+        with tf.variable_scope(scope_name):
+          tf.get_variable("x" + suffix, shape=[1])
+        expected = tuple(tf.get_collection(
+            tf.GraphKeys.TRAINABLE_VARIABLES, re.escape(scope_name) + "/"))
+        self.assertEqual(snt.get_variables_in_scope(scope_name), expected)
+    self.assertEmpty(snt.get_variables_in_scope("a/b/c/d"))
+    self.assertEmpty(snt.get_variables_in_scope("e"))
+
+  def testScopeQueryModifiedCollection(self):
+    with tf.variable_scope("prefix") as s1:
+      v1 = tf.get_variable("a", shape=[3, 4], collections=["test"])
+      v2 = tf.get_variable("b", shape=[3, 4], collections=["test"])
+    self.assertEqual(snt.get_variables_in_scope(s1, "test"), (v1, v2))
+
+    collection = tf.get_collection_ref("test")
+    collection.remove(v2)
+    self.assertEqual(snt.get_variables_in_scope(s1, "test"), (v1,))
+    collection[0] = v2
+    self.assertEqual(snt.get_variables_in_scope(s1, "test"), (v2,))
+    tf.get_default_graph().clear_collection("test")
+    self.assertEmpty(snt.get_variables_in_scope(s1, "test"))
+    tf.add_to_collection("test", v1)
+    self.assertEqual(snt.get_variables_in_scope(s1, "test"), (v1,))
+
+  def testScopeQueryEntryReplacedInPlace(self):
+    with tf.variable_scope("prefix") as s1:
+      v1 = tf.get_variable("a", shape=[1], collections=["test"])
+    with tf.variable_scope("other") as s2:
+      w1 = tf.get_variable("a", shape=[1], collections=["test"])
+    with tf.variable_scope("prefix"):
+      v2 = tf.get_variable("b", shape=[1], collections=["test"])
+    self.assertEqual(snt.get_variables_in_scope(s1, "test"), (v1, v2))
+
+    # Replacing an entry found by the lookup.
+    with tf.variable_scope("other"):
+      w2 = tf.get_variable("b", shape=[1])
+    collection = tf.get_collection_ref("test")
+    collection[0] = w2
+    self.assertEqual(snt.get_variables_in_scope(s1, "test"), (v2,))
+    self.assertEqual(snt.get_variables_in_scope(s2, "test"), (w2, w1))
+
+    # Replacing an entry of another scope.
+    with tf.variable_scope("prefix"):
+      v3 = tf.get_variable("c", shape=[1])
+    collection[1] = v3
+    self.assertEqual(snt.get_variables_in_scope(s1, "test"), (v3, v2))
+    self.assertEqual(snt.get_variables_in_scope(s2, "test"), (w2,))
+
   def testIsScopePrefix(self):
     self.assertTrue(util._is_scope_prefix("a/b/c", ""))
     self.assertTrue(util._is_scope_prefix("a/b/c", "a/b/c"))
@@ -245,6 +306,29 @@ class UtilTest(parameterized.TestCase, tf.test.TestCase):
       w = tf.identity(conv.w)
       self.assertAllEqual(sess.run(w), w_value)
 
+  @parameterized.parameters(True, False)
+  def testGetAsyncSaverPartitioned(self, partitioned):
+    path = os.path.join(tempfile.mkdtemp(), "ckpt")
+
+    # Save checkpoint asynchronously.
+    with self.test_session() as sess:
+      conv = self._create_conv(partitioned=partitioned, name="a")
+      saver = snt.get_saver(conv, asynchronous=True, num_shards=2)
+      self.assertIsInstance(saver, snt.AsyncSaver)
+      sess.run(tf.global_variables_initializer())
+      saver.save(sess, path)
+      saver.close()
+      w = tf.identity(conv.w)
+      w_value = sess.run(w)
+
+    # Restore checkpoint with a regular saver.
+    with self.test_session() as sess:
+      conv = self._create_conv(partitioned=not partitioned, name="b")
+      saver = snt.get_saver(conv)
+      saver.restore(sess, path)
+      w = tf.identity(conv.w)
+      self.assertAllEqual(sess.run(w), w_value)
+
   def testCollectionGetVariableInScope(self):
     with tf.variable_scope("prefix") as s1:
       tf.get_variable("a", shape=[1], collections=["test"], trainable=False)
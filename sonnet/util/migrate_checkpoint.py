@@ -13,76 +13,263 @@
 # limitations under the License.
 # ============================================================================
 
-"""Removes the ":0" suffix from names in a checkpoint."""
+"""Migrates a checkpoint, renaming, casting and resharding its tensors.
+
+By default removes the ":0" suffix from names in a checkpoint. For example, to
+also rename a scope and store float32 tensors as bfloat16:
+
+  migrate_checkpoint --source=/tmp/model.ckpt --target=/tmp/migrated.ckpt \\
+      --rename='^old_scope/=new_scope/' --cast=float32=bfloat16
+
+Tensors are streamed from the source checkpoint to the target one in shards of
+at most `--max_shard_bytes` bytes, each read, cast and written by a single
+session run, so peak memory is bounded by `--num_workers` shards rather than
+by the size of the checkpoint.
+"""
 
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+from multiprocessing import pool
+import os
+import re
+import uuid
+
 # Dependency imports
 import tensorflow.compat.v1 as tf
 
+from tensorflow.python.ops import io_ops  # pylint: disable=g-direct-tensorflow-import
+
 
 tf.app.flags.DEFINE_string("source", None, "Source checkpoint")
 tf.app.flags.DEFINE_string("target", None, "Target checkpoint")
 tf.app.flags.DEFINE_boolean("dry_run", False, "Whether to do a dry run")
+tf.app.flags.DEFINE_multi_string(
+    "rename", [],
+    "Rename rule PATTERN=REPLACEMENT, applied with `re.sub` to the names in "
+    "the checkpoint in the order given")
+tf.app.flags.DEFINE_multi_string(
+    "cast", [],
+    "Cast rule SOURCE_DTYPE=TARGET_DTYPE, e.g. float32=bfloat16")
+tf.app.flags.DEFINE_integer(
+    "max_shard_bytes", 1 << 30,
+    "Maximum size of a shard of the target checkpoint. A tensor larger than "
+    "this is written to its own shard")
+tf.app.flags.DEFINE_integer(
+    "num_workers", 4, "Number of shards migrated in parallel")
 
 FLAGS = tf.app.flags.FLAGS
 
 
-def _build_migrated_variables(checkpoint_reader, name_value_fn):
-  """Builds the TensorFlow variables of the migrated checkpoint.
+MigrationEntry = collections.namedtuple(
+    "MigrationEntry", ("name", "new_name", "dtype", "new_dtype", "num_bytes"))
+
+
+def remove_colon_zero(name):
+  return name[:-2] if name.endswith(":0") else name
+
+
+def _split_rule(rule):
+  """Splits a "LHS=RHS" command line rule."""
+  lhs, sep, rhs = rule.partition("=")
+  if not sep:
+    raise ValueError("Invalid rule '{}', expected LHS=RHS.".format(rule))
+  return lhs, rhs
+
+
+def rename_fn_from_rules(rules, names=None):
+  """Returns a function renaming tensors with regular expression rules.
 
   Args:
-    checkpoint_reader: A `tf.train.NewCheckPointReader` of the checkpoint to
-      be read from.
-    name_value_fn: Function taking two arguments, `name` and `value`, which
-      returns the pair of new name and value for that a variable of that name.
+    rules: Sequence of `(pattern, replacement)` pairs, applied with `re.sub`
+      in order, after removing any ":0" suffix.
+    names: Optional iterable of the names in the source checkpoint. If given,
+      each rule must match at least one of them, as renamed by the previous
+      rules.
 
   Returns:
-    Tuple of a dictionary with new variable names as keys and `tf.Variable`s as
-    values, and a dictionary that maps the old variable names to the new
-    variable names.
+    Function mapping a name in the source checkpoint to its new name.
+
+  Raises:
+    ValueError: If `names` is given and a rule matches none of them.
   """
+  rules = [(re.compile(pattern), replacement) for pattern, replacement in rules]
 
-  names_to_shapes = checkpoint_reader.get_variable_to_shape_map()
+  if names is not None:
+    names = [remove_colon_zero(name) for name in names]
+    for pattern, replacement in rules:
+      if not any(pattern.search(name) for name in names):
+        raise ValueError("Rename rule '{}={}' matches no tensor name.".format(
+            pattern.pattern, replacement))
+      names = [pattern.sub(replacement, name) for name in names]
+
+  def rename_fn(name):
+    name = remove_colon_zero(name)
+    for pattern, replacement in rules:
+      name = pattern.sub(replacement, name)
+    return name
+
+  return rename_fn
+
+
+def plan_migration(checkpoint_reader, rename_fn, cast_dtypes=None):
+  """Computes what each tensor of a checkpoint is migrated to.
+
+  Args:
+    checkpoint_reader: A `tf.train.NewCheckpointReader` of the checkpoint to
+      be read from.
+    rename_fn: Function mapping the name of a tensor in the checkpoint to its
+      new name, or to `None` to drop the tensor.
+    cast_dtypes: Optional dictionary mapping source `tf.DType`s to the dtypes
+      they are cast to.
+
+  Returns:
+    List of `MigrationEntry`s, sorted by name.
 
-  new_name_to_variable = {}
-  name_to_new_name = {}
+  Raises:
+    ValueError: If several tensors are renamed to the same name.
+  """
+  cast_dtypes = cast_dtypes or {}
+  names_to_shapes = checkpoint_reader.get_variable_to_shape_map()
+  names_to_dtypes = checkpoint_reader.get_variable_to_dtype_map()
 
-  for name in names_to_shapes:
-    value = checkpoint_reader.get_tensor(name)
-    new_name, new_value = name_value_fn(name, value)
+  entries = []
+  new_name_to_name = {}
+  for name in sorted(names_to_shapes):
+    new_name = rename_fn(name)
     if new_name is None:
       continue
+    if new_name in new_name_to_name:
+      raise ValueError("Both '{}' and '{}' are renamed to '{}'.".format(
+          new_name_to_name[new_name], name, new_name))
+    new_name_to_name[new_name] = name
 
-    name_to_new_name[name] = new_name
-    new_name_to_variable[new_name] = tf.Variable(new_value)
+    dtype = names_to_dtypes[name]
+    new_dtype = cast_dtypes.get(dtype, dtype)
+    num_elements = 1
+    for dim in names_to_shapes[name]:
+      num_elements *= dim
+    num_bytes = num_elements * max(dtype.size, new_dtype.size)
+    entries.append(MigrationEntry(name, new_name, dtype, new_dtype, num_bytes))
 
-  return new_name_to_variable, name_to_new_name
+  return entries
 
 
-def remove_colon_zero(name):
-  return name[:-2] if name.endswith(":0") else name
+def _assign_to_shards(entries, max_shard_bytes):
+  """Packs consecutive entries into shards of at most `max_shard_bytes`."""
+  shards = []
+  shard_bytes = 0
+  for entry in entries:
+    if not shards or shard_bytes + entry.num_bytes > max_shard_bytes:
+      shards.append([])
+      shard_bytes = 0
+    shards[-1].append(entry)
+    shard_bytes += entry.num_bytes
+  return shards
 
 
-def main(unused_args):
-  with tf.Graph().as_default():
-    reader = tf.train.NewCheckpointReader(FLAGS.source)
-    name_value_fn = lambda name, value: (remove_colon_zero(name), value)
-    variables, name_to_new_name = _build_migrated_variables(
-        reader, name_value_fn=name_value_fn)
+def _migrate_shard(source, shard_prefix, entries):
+  """Reads, casts and writes a shard of tensors in a single session run."""
+  with tf.Graph().as_default(), tf.device("/cpu:0"):
+    tensors = io_ops.restore_v2(
+        source,
+        [entry.name for entry in entries],
+        [""] * len(entries),
+        [entry.dtype for entry in entries])
+    tensors = [tf.cast(tensor, entry.new_dtype)
+               if entry.new_dtype != entry.dtype else tensor
+               for entry, tensor in zip(entries, tensors)]
+    save_op = io_ops.save_v2(
+        shard_prefix,
+        [entry.new_name for entry in entries],
+        [""] * len(entries),
+        tensors)
+    with tf.Session() as sess:
+      sess.run(save_op)
+
+
+def migrate_checkpoint(source, target, rename_fn=remove_colon_zero,
+                       cast_dtypes=None, max_shard_bytes=1 << 30,
+                       num_workers=4, dry_run=False):
+  """Migrates a checkpoint, streaming its tensors in bounded-size shards.
+
+  The checkpoint state file in the directory of `target` is updated to point
+  to the migrated checkpoint, see `tf.train.latest_checkpoint`.
 
-    if not FLAGS.dry_run:
-      init = tf.global_variables_initializer()
-      saver = tf.train.Saver(variables)
+  Args:
+    source: Prefix of the checkpoint to migrate.
+    target: Prefix of the migrated checkpoint.
+    rename_fn: Function mapping the name of a tensor in the checkpoint to its
+      new name, or to `None` to drop the tensor. By default removes any ":0"
+      suffix.
+    cast_dtypes: Optional dictionary mapping source `tf.DType`s to the dtypes
+      they are cast to.
+    max_shard_bytes: Maximum size of a shard of the migrated checkpoint. A
+      tensor larger than this is written to its own shard.
+    num_workers: Number of shards migrated in parallel. Peak memory usage is
+      roughly `num_workers * max_shard_bytes`.
+    dry_run: If `True`, only computes the new names.
+
+  Returns:
+    A dictionary that maps the old tensor names to the new tensor names.
+
+  Raises:
+    ValueError: If several tensors are renamed to the same name, or if there
+      is nothing to migrate.
+  """
+  reader = tf.train.NewCheckpointReader(source)
+  entries = plan_migration(reader, rename_fn, cast_dtypes)
+  name_to_new_name = {entry.name: entry.new_name for entry in entries}
+  if dry_run:
+    return name_to_new_name
+  if not entries:
+    raise ValueError("No tensors to migrate from '{}'.".format(source))
+
+  shards = _assign_to_shards(entries, max_shard_bytes)
+  temp_prefix = "{}_temp_{}/part".format(target, uuid.uuid4().hex)
+  shard_prefixes = ["{}-{:05d}-of-{:05d}".format(temp_prefix, i, len(shards))
+                    for i in range(len(shards))]
+  tf.logging.info("Migrating %d tensors from '%s' to '%s' in %d shards.",
+                  len(entries), source, target, len(shards))
 
-      with tf.Session() as sess:
-        sess.run(init)
-        saver.save(sess, FLAGS.target)
+  worker_pool = pool.ThreadPool(min(num_workers, len(shards)))
+  try:
+    worker_pool.map(lambda args: _migrate_shard(source, *args),
+                    zip(shard_prefixes, shards), chunksize=1)
+  finally:
+    worker_pool.close()
+    worker_pool.join()
+
+  with tf.Graph().as_default(), tf.device("/cpu:0"):
+    merge_op = io_ops.merge_v2_checkpoints(
+        shard_prefixes, target, delete_old_dirs=True)
+    with tf.Session() as sess:
+      sess.run(merge_op)
+  tf.train.update_checkpoint_state(os.path.dirname(target), target)
 
   return name_to_new_name
 
 
+def main(unused_args):
+  reader = tf.train.NewCheckpointReader(FLAGS.source)
+  rename_fn = rename_fn_from_rules(
+      [_split_rule(rule) for rule in FLAGS.rename],
+      names=reader.get_variable_to_shape_map())
+  cast_dtypes = {}
+  for rule in FLAGS.cast:
+    dtype, new_dtype = _split_rule(rule)
+    cast_dtypes[tf.as_dtype(dtype)] = tf.as_dtype(new_dtype)
+
+  return migrate_checkpoint(
+      FLAGS.source, FLAGS.target,
+      rename_fn=rename_fn,
+      cast_dtypes=cast_dtypes,
+      max_shard_bytes=FLAGS.max_shard_bytes,
+      num_workers=FLAGS.num_workers,
+      dry_run=FLAGS.dry_run)
+
+
 if __name__ == "__main__":
   tf.app.run()
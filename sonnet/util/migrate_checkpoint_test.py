@@ -0,0 +1,120 @@
+# Copyright 2019 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.util.migrate_checkpoint."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+# Dependency imports
+import numpy as np
+from sonnet.util import migrate_checkpoint
+import tensorflow.compat.v1 as tf
+
+
+class MigrateCheckpointTest(tf.test.TestCase):
+
+  def _save_checkpoint(self, values):
+    """Saves a checkpoint of variables with the given names and values."""
+    prefix = os.path.join(self.get_temp_dir(), "source.ckpt")
+    with tf.Graph().as_default():
+      variables = [tf.Variable(value, name=name)
+                   for name, value in sorted(values.items())]
+      saver = tf.train.Saver(variables)
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        saver.save(sess, prefix, write_meta_graph=False)
+    return prefix
+
+  def _read_checkpoint(self, prefix):
+    reader = tf.train.NewCheckpointReader(prefix)
+    names_to_dtypes = reader.get_variable_to_dtype_map()
+    return ({name: reader.get_tensor(name) for name in names_to_dtypes},
+            names_to_dtypes)
+
+  def testRenameAndCast(self):
+    source = self._save_checkpoint({
+        "old_scope/w": np.arange(6, dtype=np.float32).reshape([2, 3]) / 4,
+        "other/b": np.arange(3, dtype=np.int32),
+    })
+    target = os.path.join(self.get_temp_dir(), "target.ckpt")
+    rename_fn = migrate_checkpoint.rename_fn_from_rules(
+        [("^old_scope/", "new_scope/")],
+        names=tf.train.NewCheckpointReader(source).get_variable_to_shape_map())
+
+    name_to_new_name = migrate_checkpoint.migrate_checkpoint(
+        source, target, rename_fn=rename_fn,
+        cast_dtypes={tf.float32: tf.float16})
+
+    self.assertEqual(name_to_new_name,
+                     {"old_scope/w": "new_scope/w", "other/b": "other/b"})
+    values, dtypes = self._read_checkpoint(target)
+    self.assertEqual(dtypes, {"new_scope/w": tf.float16, "other/b": tf.int32})
+    self.assertEqual(values["new_scope/w"].dtype, np.float16)
+    self.assertAllEqual(
+        values["new_scope/w"],
+        np.arange(6, dtype=np.float16).reshape([2, 3]) / 4)
+    self.assertAllEqual(values["other/b"], np.arange(3, dtype=np.int32))
+    self.assertEqual(tf.train.latest_checkpoint(self.get_temp_dir()), target)
+
+  def testMultipleShards(self):
+    rng = np.random.RandomState(0)
+    source_values = {
+        "layer_{}/w".format(i): rng.randn(16, 8).astype(np.float32)
+        for i in range(5)}
+    source_values["step"] = np.array(7, dtype=np.int64)
+    source = self._save_checkpoint(source_values)
+    target = os.path.join(self.get_temp_dir(), "target.ckpt")
+    max_shard_bytes = 2 * 16 * 8 * 4
+
+    entries = migrate_checkpoint.plan_migration(
+        tf.train.NewCheckpointReader(source),
+        migrate_checkpoint.remove_colon_zero)
+    # pylint: disable=protected-access
+    shards = migrate_checkpoint._assign_to_shards(entries, max_shard_bytes)
+    # pylint: enable=protected-access
+    self.assertGreater(len(shards), 1)
+
+    migrate_checkpoint.migrate_checkpoint(
+        source, target, max_shard_bytes=max_shard_bytes, num_workers=2)
+
+    values, dtypes = self._read_checkpoint(target)
+    self.assertCountEqual(values, source_values)
+    for name, source_value in source_values.items():
+      self.assertEqual(dtypes[name], tf.as_dtype(source_value.dtype))
+      self.assertAllEqual(values[name], source_value)
+
+  def testRenameRuleMatchingNothing(self):
+    names = ["scope/w:0", "scope/b:0"]
+    with self.assertRaisesRegexp(ValueError, "matches no tensor name"):
+      migrate_checkpoint.rename_fn_from_rules([("^missing/", "new/")], names)
+    # A rule may match a name produced by the previous rules.
+    rename_fn = migrate_checkpoint.rename_fn_from_rules(
+        [("^scope/", "renamed/"), ("^renamed/w$", "renamed/kernel")], names)
+    self.assertEqual(rename_fn("scope/w:0"), "renamed/kernel")
+    self.assertEqual(rename_fn("scope/b:0"), "renamed/b")
+
+  def testNothingToMigrate(self):
+    source = self._save_checkpoint({"w": np.zeros([2], dtype=np.float32)})
+    target = os.path.join(self.get_temp_dir(), "target.ckpt")
+    with self.assertRaisesRegexp(ValueError, "No tensors to migrate"):
+      migrate_checkpoint.migrate_checkpoint(
+          source, target, rename_fn=lambda name: None)
+
+
+if __name__ == "__main__":
+  tf.test.main()